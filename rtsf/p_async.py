@@ -0,0 +1,176 @@
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.p_async
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:    lkf20031988@163.com
+    RCS:      rtsf.p_async,v 1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+
+======================================================================
+
+asyncio runner for the I/O-bound plugins, such as http runner. python3 only.
+
+'''
+
+import asyncio
+from rtsf.p_executer import Runner, Executor
+from rtsf import p_exception,p_fixture
+
+
+class AsyncRunner(Runner):
+    ''' same as Runner, but run_test is a coroutine.
+        TestRunner runs the cases of a suite on one event loop with AsyncExecutor if runner is subclass of AsyncRunner.
+    usage:
+        class HttpRunner(AsyncRunner):
+            async def run_test(self, testcase_dict, variables, driver_map):
+                ...
+                resp = await session.get(url)
+                ...
+
+        TestRunner(runner = HttpRunner, concurrency = 100).run("test.yaml")
+    '''
+
+    async def run_test(self, testcase_dict, variables, driver_map):
+        ''' define how to run a case. override this method
+        @param testcase_dice:  yaml case
+        @param driver_map:  device id map to a driver
+        '''
+        fn, _ = driver_map
+        reporter = self.tracers[fn]
+
+        parser = self.parser.fork(variables)
+
+        case_name = parser.eval_content_with_bind_actions(testcase_dict.get("name",u'rtsf'))
+        reporter.start(self.proj_info["module"], case_name, testcase_dict.get("responsible",u"rock feng"), testcase_dict.get("tester",u"rock feng"))
+        reporter.log_debug(u"===== run_test\n\t{}".format(testcase_dict))
+
+        reporter.section(u"------------section ok")
+        reporter.step(u"step ok")
+        reporter.normal(u"normal ok")
+        reporter.stop()
+
+        return reporter
+
+    def _run_case(self, testcase_dict, variables={}):
+        ''' run the coroutine in a new event loop, so that the serial mode and worker processes work as well
+        '''
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(self._run_case_async(testcase_dict, variables))
+        finally:
+            loop.close()
+
+    async def _run_case_async(self, testcase_dict, variables={}):
+        ''' same as Runner._run_case
+        @note:  should not override
+        '''
+        retries = self._case_retries(testcase_dict)
+        attempts = []
+        record = await self._run_attempt_async(testcase_dict, variables)
+        while record["status"] != "pass" and len(attempts) < retries:
+            attempts.append(self._retry_attempt(record, len(attempts) + 1, retries))
+            record = await self._run_attempt_async(testcase_dict, variables)
+        return self._attempts_record(record, attempts)
+
+    async def _run_attempt_async(self, testcase_dict, variables={}):
+        ''' same as Runner._run_attempt
+        @note:  should not override
+        '''
+        record = self._start_record(testcase_dict, variables)
+        self.parser.fixtures = self.parser.fixtures.new_case()
+        try:
+            timeout = self._case_timeout(testcase_dict)
+            try:
+                # the coroutine is cancelled on timeout, so it never blocks the loop
+                await asyncio.wait_for(self._run_test_async(testcase_dict, variables), timeout)
+            except asyncio.TimeoutError:
+                raise p_exception.CaseTimeoutError("Case timeout after {}s.".format(timeout))
+        except p_exception.CaseTimeoutError:
+            self._timeout_record(record, testcase_dict, variables)
+        except (Exception, p_exception.MyBaseError):
+            self._error_record(record)
+        self.parser.fixtures.case.teardown()
+        return self._stop_record(record)
+
+    async def _run_test_async(self, testcase_dict, variables={}):
+        ''' same as Runner._run_test, all drivers are awaited at the same time if not _local_driver
+        '''
+        if self._local_driver:
+            return await self._run_with_driver_async(testcase_dict, variables, self._default_drivers[0])
+
+        results = await asyncio.gather(*[self._run_with_driver_async(testcase_dict, variables, driver_map) for driver_map in self._default_drivers], return_exceptions = True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise errors[0]
+        return results
+
+    async def _run_with_driver_async(self, testcase_dict, variables, driver_map):
+        ''' same as Runner._run_with_driver, the driver is created in the default executor of the loop, so it does not block the others '''
+        if self._driver_pool is None:
+            return await self.run_test(testcase_dict, variables, driver_map)
+
+        device_id = driver_map[0]
+        driver = await asyncio.get_running_loop().run_in_executor(None, p_fixture.bound(self._checkout_driver), device_id)
+        try:
+            return await self.run_test(testcase_dict, variables, (device_id, driver))
+        finally:
+            self._checkin_driver(device_id, driver)
+
+class AsyncExecutor(Executor):
+    ''' schedule the cases of all TestSuites on one event loop, no more than `concurrency` cases are in flight at the same time.
+        the cases are one stream across the suites, the next suite starts while the last cases of the previous one are in flight.
+        each case runs with a fork of the suite runner, so that the tracer output and the report data are attributed per case.
+        a case waiting for its `resources` is deferred, the free slots are filled with the others.
+    '''
+
+    def __init__(self, concurrency = 10):
+        '''
+        @param concurrency: int type, max number of in-flight cases
+        '''
+        super(AsyncExecutor, self).__init__()
+        self._concurrency = max(int(concurrency), 1)
+
+    def run(self, task_suite, result):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self._run(task_suite, result))
+        finally:
+            loop.close()
+
+    async def _run(self, task_suite, result):
+        semaphore = asyncio.Semaphore(self._concurrency)
+        running, deferred = set(), []
+        tasks = self._iter_tasks(task_suite)
+        while not result.shouldStop:
+            await semaphore.acquire()
+            task = self._next_task(tasks, deferred)
+            if task is None:
+                semaphore.release()
+                if not deferred or not running:
+                    break
+                # wait for the resources released by a running case
+                await asyncio.wait(set(running), return_when = asyncio.FIRST_COMPLETED)
+                continue
+
+            future = asyncio.ensure_future(self._run_test(task[0], task[1], result, semaphore))
+            running.add(future)
+            future.add_done_callback(running.discard)
+
+        if running:
+            await asyncio.wait(running)
+
+    async def _run_test(self, suite, test, result, semaphore):
+        try:
+            result.startTest(test)
+            test_runner = suite.test_runner._fork()
+            record = await test_runner._run_case_async(test.testcase_dict, test.variables)
+            self._add_record(suite, test, record, result)
+        finally:
+            self.resources.release(test.testcase_dict)
+            semaphore.release()
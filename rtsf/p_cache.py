@@ -0,0 +1,174 @@
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.p_cache
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:    lkf20031988@163.com
+    RCS:      rtsf.p_cache,v 1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+
+======================================================================
+
+Memoize the deterministic and expensive keywords of preference.py, such as token generation and signing.
+the result is cached by the evaluated args and kwargs, so that ${sign($uid)} runs once for the same uid instead of for each occurrence.
+
+scopes:
+    run:    shared by all cases of the run; each worker process has its own if run with worker processes
+    case:   once per case execution, such as a nonce which is the same in one case but new in the next
+
+usage:
+    # preference.py
+    from rtsf.p_cache import cacheable
+
+    @cacheable(scope = "run", maxsize = 128, ttl = 300)
+    def sign(uid):
+        return expensive_sign(uid)
+
+'''
+
+import json,time,threading
+from collections import OrderedDict
+from rtsf import p_exception,p_compat
+
+SCOPES = ("run", "case")
+
+# (file name, qualified name) of the decorated keywords map to their CacheableKeyword,
+# a preference.py imported again once it is changed replaces its keywords instead of adding them
+_keywords = {}
+
+def cacheable(scope = "run", maxsize = 128, ttl = None):
+    ''' decorator of a keyword function in preference.py, its result is cached when it is called in the cases, e.g. ${sign($uid)}.
+        calling the function in python is not cached
+    @param scope: run or case
+    @param maxsize: int type, max number of results to keep, the least recently used one is dropped first
+    @param ttl: seconds a result is valid, default is None, no expiry
+    '''
+    if scope not in SCOPES:
+        raise p_exception.ParamsError("Invalid cache scope '{}', should be one of {}.".format(scope, ", ".join(SCOPES)))
+
+    def decorator(func):
+        keyword = func._rtsf_cache = CacheableKeyword(func, scope, maxsize, ttl)
+        key = (func.__code__.co_filename, getattr(func, "__qualname__", func.__name__))
+        previous = _keywords.get(key)
+        if previous is not None:
+            # the counts of this run so far are kept, the cached results of the old code are not
+            keyword.hits, keyword.misses = previous.hits, previous.misses
+        _keywords[key] = keyword
+        return func
+    return decorator
+
+def make_key(args, kwargs):
+    ''' @return: hashable key of the evaluated args and kwargs; the json of them if any is not hashable, such as a dict '''
+    key = (tuple(args), tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        key = json.dumps([args, kwargs], sort_keys = True, default = p_compat.str)
+    return key
+
+class LruCache(object):
+    ''' a bounded cache which drops the least recently used result, and the results older than ttl seconds '''
+
+    def __init__(self, maxsize = 128, ttl = None):
+        self.maxsize = max(int(maxsize), 1)
+        self.ttl = ttl
+        # key map to (stored_at, value), the most recently used one is the last
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        ''' @return: (True, value) if cached, otherwise (False, None) '''
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is None:
+                return False, None
+
+            if self.ttl is not None and time.time() - item[0] > self.ttl:
+                return False, None
+
+            self._items[key] = item
+            return True, item[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = (time.time(), value)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last = False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+class CacheableKeyword(object):
+    ''' the settings, the run scope cache and the hit/miss counts of a cacheable keyword '''
+
+    def __init__(self, func, scope, maxsize, ttl):
+        self.func = func
+        self.name = func.__name__
+        self.scope = scope
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = self.misses = 0
+        self.run_cache = LruCache(maxsize, ttl)
+        self._lock = threading.Lock()
+
+    def call(self, args, kwargs, case_caches):
+        ''' @return: the cached result of func(*args, **kwargs), call func if it is not cached
+        @param case_caches: dict type, CacheableKeyword map to the LruCache of the running case, see p_fixture.FixtureManager
+        '''
+        cache = self.run_cache
+        if self.scope == "case":
+            with self._lock:
+                cache = case_caches.get(self)
+                if cache is None:
+                    cache = case_caches[self] = LruCache(self.maxsize, self.ttl)
+
+        key = make_key(args, kwargs)
+        hit, value = cache.get(key)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if hit:
+            return value
+
+        value = self.func(*args, **kwargs)
+        cache.put(key, value)
+        return value
+
+def stats():
+    ''' @return: dict type, keyword name map to the counts of this process, e.g. {"sign": {"hits": 95, "misses": 5}} '''
+    results = {}
+    for keyword in _keywords.values():
+        if not keyword.hits and not keyword.misses:
+            continue
+        counts = results.setdefault(keyword.name, {"hits": 0, "misses": 0})
+        counts["hits"] += keyword.hits
+        counts["misses"] += keyword.misses
+    return results
+
+def merge_stats(*all_stats):
+    ''' @return: dict type, the sum of the counts of stats, such as of the worker processes '''
+    results = {}
+    for one_stats in all_stats:
+        for name, counts in one_stats.items():
+            merged = results.setdefault(name, {"hits": 0, "misses": 0})
+            merged["hits"] += counts["hits"]
+            merged["misses"] += counts["misses"]
+    return results
+
+def clear():
+    ''' drop the cached results and the counts once the run is finished '''
+    for keyword in _keywords.values():
+        keyword.run_cache.clear()
+        keyword.hits = keyword.misses = 0
@@ -39,6 +39,7 @@ import subprocess
 import json
 import inspect
 import hashlib
+import threading
 import socket
 import random
 import string
@@ -351,7 +352,12 @@ class FileSystemUtils(object):
     def mkdirs(dir_path):
         ''' make a directory if it not exists'''
         if not os.path.exists(dir_path):
-            os.makedirs(dir_path)
+            try:
+                os.makedirs(dir_path)
+            except OSError:
+                # made by another thread at the same time, such as the cases of p_dag
+                if not os.path.isdir(dir_path):
+                    raise
     
     @staticmethod
     def getFileMd5(filePath):
@@ -459,6 +465,14 @@ class ZipUtils(object):
  
 class ModuleUtils(object):
     
+    # seconds between the checks of the preference.py files of a directory, see search_conf_item
+    conf_check_interval = 1.0
+    # directory map to the index of the preference.py files of it and its ancestors
+    _conf_indexes = {}
+    # preference.py path map to (stamp, module)
+    _conf_modules = {}
+    _conf_lock = threading.RLock()
+    
     @staticmethod
     def get_callable_class_method_names(testClass):
         '''
@@ -503,13 +517,18 @@ class ModuleUtils(object):
         return importlib.import_module(module_name)
     
     @staticmethod
-    def get_imported_module_from_file(file_path):
+    def get_imported_module_from_file(file_path, module_name=None):
         """ import module from python file path and return imported module
+        @param module_name: name of the module, default is a distinct name of the file path, 
+            so that the modules of the files with the same name, such as preference.py, do not replace each other in sys.modules
         """
+        if module_name is None:
+            module_name = "rtsf_module_{}".format(hashlib.md5(os.path.abspath(file_path).encode("utf-8")).hexdigest())
+        
         if p_compat.is_py3:
-            imported_module = importlib.machinery.SourceFileLoader('module_name', file_path).load_module()
+            imported_module = importlib.machinery.SourceFileLoader(module_name, file_path).load_module()
         elif p_compat.is_py2:
-            imported_module = imp.load_source('module_name', file_path)
+            imported_module = imp.load_source(module_name, file_path)
         else:
             raise RuntimeError("Neither Python 3 nor Python 2.")
     
@@ -535,27 +554,76 @@ class ModuleUtils(object):
             item_name: function name or variable name
         e.g.
             search_conf_item('C:/Users/RockFeng/Desktop/s/preference.py','function','test_func')
+        @note: the preference.py files are imported once and indexed by directory, see get_conf_items
         """
-        dir_path = os.path.dirname(os.path.abspath(start_path))
-        target_file = os.path.join(dir_path, "preference.py")
+        items_dict = ModuleUtils.get_conf_items(start_path, item_type)
+        if item_name in items_dict:
+            return items_dict[item_name]
         
-        if os.path.isfile(target_file):
-            imported_module = ModuleUtils.get_imported_module_from_file(target_file)
-            items_dict = ModuleUtils.filter_module(imported_module, item_type)
-            if item_name in items_dict:
-                return items_dict[item_name]
-            else:
-                return ModuleUtils.search_conf_item(dir_path, item_type, item_name)
+        err_msg = "'{}' not found in recursive upward path!".format(item_name)
+        if item_type == "function":
+            raise p_exception.FunctionNotFound(err_msg)
+        else:
+            raise p_exception.VariableNotFound(err_msg)
     
-        if dir_path == start_path:
-            # system root path
-            err_msg = "'{}' not found in recursive upward path!".format(item_name)
-            if item_type == "function":
-                raise p_exception.FunctionNotFound(err_msg)
-            else:
-                raise p_exception.VariableNotFound(err_msg)
+    @staticmethod
+    def get_conf_items(start_path, item_type):
+        """ functions or variables of the preference.py files from the directory of start_path up to the root, the nearer one takes priority.
+            the index of a directory is built once, and rebuilt if any of the files is added, removed or modified,
+            which is checked by the mtime no more than once every `conf_check_interval` seconds.
+        @param
+            start_path: search start path
+            item_type: "function" or "variable"
+        @return: dict type, name map to the function or variable
+        """
+        dir_path = os.path.dirname(os.path.abspath(start_path))
+        index = ModuleUtils._conf_indexes.get(dir_path)
+        now = time.time()
+        if index is not None and now - index["checked_at"] < ModuleUtils.conf_check_interval:
+            return index[item_type]
+        
+        with ModuleUtils._conf_lock:
+            stamps = ModuleUtils._conf_stamps(dir_path)
+            if index is None or index["stamps"] != stamps:
+                index = {"stamps": stamps, "function": {}, "variable": {}}
+                # from the root down, so that the nearer one takes priority
+                for conf_file, stamp in reversed(stamps):
+                    if stamp is None:
+                        continue
+                    imported_module = ModuleUtils._get_conf_module(conf_file, stamp)
+                    index["function"].update(ModuleUtils.filter_module(imported_module, "function"))
+                    index["variable"].update(ModuleUtils.filter_module(imported_module, "variable"))
+            index["checked_at"] = now
+            ModuleUtils._conf_indexes[dir_path] = index
+        return index[item_type]
+    
+    @staticmethod
+    def _conf_stamps(dir_path):
+        """ @return: list of (preference.py path, (mtime, size) or None if not exists), from dir_path up to the root """
+        stamps = []
+        while True:
+            conf_file = os.path.join(dir_path, "preference.py")
+            try:
+                stat = os.stat(conf_file)
+                stamps.append((conf_file, (stat.st_mtime, stat.st_size)))
+            except OSError:
+                stamps.append((conf_file, None))
+            
+            parent_path = os.path.dirname(dir_path)
+            if parent_path == dir_path:
+                # system root path
+                return stamps
+            dir_path = parent_path
     
-        return ModuleUtils.search_conf_item(dir_path, item_type, item_name)
+    @staticmethod
+    def _get_conf_module(conf_file, stamp):
+        cached = ModuleUtils._conf_modules.get(conf_file)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        
+        imported_module = ModuleUtils.get_imported_module_from_file(conf_file)
+        ModuleUtils._conf_modules[conf_file] = (stamp, imported_module)
+        return imported_module
 
 class SetupUtils(object):
     
@@ -619,16 +687,20 @@ class CommonUtils(object):
             return []
         elif len(args) == 1:
             return args[0]
-                
-        product_list = []
+        
+        return list(CommonUtils.iter_cartesian_product(*args))
+    
+    @staticmethod
+    def iter_cartesian_product(*args):
+        """ same as gen_cartesian_product, but generate the items one by one, 
+            so the memory keeps flat no matter how large the product is
+        """
         for product_item_tuple in itertools.product(*args):
             product_item_dict = {}
             for item in product_item_tuple:
                 product_item_dict.update(item)
     
-            product_list.append(product_item_dict)
-    
-        return product_list
+            yield product_item_dict
     
     @staticmethod
     def convert_to_order_dict(map_list):
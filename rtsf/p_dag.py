@@ -0,0 +1,153 @@
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.p_dag
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:    lkf20031988@163.com
+    RCS:      rtsf.p_dag,v 1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+
+======================================================================
+
+Run the cases by the dependency graph of `depends_on` instead of the file order.
+
+'''
+
+import sys,time,traceback,threading
+from concurrent import futures
+from rtsf.p_applog import logger
+from rtsf.p_executer import Executor
+from rtsf.p_history import case_key
+from rtsf import p_scheduler,p_exception,p_fixture
+
+
+class DagExecutor(Executor):
+    ''' a case starts once the cases it depends on are passed, and is skipped if any of them is not passed.
+        the dependency is matched in the same data row, e.g. `login` of the row {"username": "test1"} waits for `register` of the same row.
+        the independent branches run at the same time in a thread pool of `workers`, each case with a fork of the suite runner.
+        a case which is ready but waits for its `resources` does not hold a worker, the next ready case takes it.
+        the critical path, the longest chain of dependent cases, is logged and shown in the html report.
+    usage:
+        yaml case:
+            - case:
+                name: register
+                steps: ...
+            - case:
+                name: login
+                depends_on: [register]
+                steps: ...
+
+        TestRunner(workers = 4).run("test.yaml")
+    @note: the skipped cases are not counted by max_failures, nor saved to the history
+    '''
+
+    def __init__(self, workers = 1):
+        super(DagExecutor, self).__init__()
+        self._workers = max(int(workers), 1)
+
+    def run(self, task_suite, result):
+        nodes = list(self._iter_tasks(task_suite))
+        node_keys = [(suite.file_path, test.key) for suite, test in nodes]
+        remaining = {}
+        for node_key in node_keys:
+            remaining[node_key] = remaining.get(node_key, 0) + 1
+
+        waiting = {}
+        for index, (suite, test) in enumerate(nodes):
+            names = suite.dependencies.get(test.testcase_dict["name"], [])
+            # the cases which are not selected, such as passed in the last run, are not waited for
+            waiting[index] = [node_key for node_key in ((suite.file_path, case_key(test.file_path, name, test.variables)) for name in names) if node_key in remaining]
+
+        failed, records = set(), {}
+        with futures.ThreadPoolExecutor(max_workers = self._workers) as pool:
+            running = {}
+            while waiting or running:
+                for index in sorted(waiting):
+                    if result.shouldStop or len(running) >= self._workers:
+                        break
+
+                    not_passed = [node_key for node_key in waiting[index] if node_key in failed]
+                    if not_passed:
+                        del waiting[index]
+                        self._skip(nodes[index][0], nodes[index][1], u"depends on a case not passed: {}".format(not_passed[0][1]), result)
+                        self._done(node_keys[index], False, remaining, failed)
+                    elif not [node_key for node_key in waiting[index] if remaining[node_key]] and self.resources.available(nodes[index][1].testcase_dict):
+                        del waiting[index]
+                        suite, test = nodes[index]
+                        self.resources.acquire(test.testcase_dict)
+                        result.startTest(test)
+                        running[pool.submit(self._run_case, suite.test_runner._fork(), test)] = index
+
+                if result.shouldStop:
+                    waiting.clear()
+                if not running:
+                    # the rest wait for the cases which are skipped in this loop
+                    continue
+
+                finished, _ = futures.wait(list(running), return_when = futures.FIRST_COMPLETED)
+                for future in finished:
+                    index = running.pop(future)
+                    suite, test = nodes[index]
+                    try:
+                        record = future.result()
+                    except (Exception, p_exception.MyBaseError):
+                        record = self._error_record(test)
+                    self.resources.release(test.testcase_dict)
+                    self._add_record(suite, test, record, result)
+                    records[node_keys[index]] = record
+                    self._done(node_keys[index], record["status"] == "pass", remaining, failed)
+
+        self._trace_critical_path(task_suite, records)
+
+    def _run_case(self, runner, test):
+        # each thread of the pool is a worker of the worker scope fixtures
+        with p_fixture.worker(threading.current_thread().name):
+            return runner._run_case(test.testcase_dict, test.variables)
+
+    def _error_record(self, test):
+        ''' the record of a case whose runner raises out of _run_case, the cases depending on it are skipped as the other errors
+            should be called in the except block
+        '''
+        now = time.time()
+        logger.log_error(u"Case raised out of its runner: {}".format(test.testcase_dict.get("name")))
+        return {
+            "name": test.testcase_dict.get("name"),
+            "key": test.key,
+            "status": "error",
+            "start_at": now,
+            "end_at": now,
+            "reports": [],
+            "error": traceback.format_exc(),
+            "exc_info": sys.exc_info(),
+            }
+
+    def _done(self, node_key, passed, remaining, failed):
+        remaining[node_key] -= 1
+        if not passed:
+            failed.add(node_key)
+
+    def _trace_critical_path(self, task_suite, records):
+        for suite in task_suite.tasks:
+            if not suite.dependencies:
+                continue
+
+            durations, dependencies, names = {}, {}, {}
+            for test in suite:
+                record = records.get((suite.file_path, test.key))
+                if record is None:
+                    continue
+
+                durations[test.key] = max(durations.get(test.key, 0.0), record["end_at"] - record["start_at"])
+                dependencies[test.key] = [case_key(test.file_path, name, test.variables) for name in suite.dependencies.get(test.testcase_dict["name"], [])]
+                names[test.key] = suite.test_runner._case_name(test.testcase_dict, test.variables)
+
+            seconds, path = p_scheduler.critical_path(durations, dependencies)
+            critical_path = {"seconds": round(seconds, 3), "cases": [names[key] for key in path]}
+            logger.log_info(u"Critical path of {}: {}s, {}".format(suite.file_path, critical_path["seconds"], u" -> ".join(critical_path["cases"])))
+            for tracer in suite.test_runner.tracers.values():
+                tracer.critical_path = critical_path
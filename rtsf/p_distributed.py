@@ -0,0 +1,368 @@
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.p_distributed
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:    lkf20031988@163.com
+    RCS:      rtsf.p_distributed,v 1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+
+======================================================================
+
+Coordinator and workers over plain TCP(multiprocessing.managers), to spread a run across several machines.
+the coordinator loads the testsets once and serves the expanded cases; each worker pulls the cases, runs them with its own Runner
+and streams the records back. a worker can run on the same box, or on a lab machine with its own attached devices.
+an authkey is required unless the coordinator is on the loopback address; the default "rtsf" is only accepted there.
+
+usage:
+    # coordinator
+    TestRunner(runner = Runner, coordinator = ("0.0.0.0", 50000), authkey = "secret").run("cases")
+
+    # each worker
+    python -m rtsf.p_distributed --address 192.168.0.10:50000 --authkey secret --runner mypackage.runners:AndroidRunner
+
+'''
+
+import os,sys,time,socket,argparse,threading,multiprocessing
+from multiprocessing.managers import BaseManager
+from rtsf.p_applog import logger
+from rtsf.p_common import ModuleUtils
+from rtsf.p_executer import Executor, init_test_runner
+from rtsf.p_testcase import YamlCaseLoader
+from rtsf import p_compat,p_fixture,p_exception
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+_tasks = queue.Queue()
+_records = queue.Queue()
+
+def _get_tasks():
+    return _tasks
+
+def _get_records():
+    return _records
+
+class CoordinatorManager(BaseManager):
+    ''' the server of the coordinator, which holds the queue of tasks and the queue of records '''
+
+CoordinatorManager.register("get_tasks", callable = _get_tasks)
+CoordinatorManager.register("get_records", callable = _get_records)
+
+class WorkerManager(BaseManager):
+    ''' the client of a worker '''
+
+WorkerManager.register("get_tasks")
+WorkerManager.register("get_records")
+
+def is_loopback(host):
+    return host == "localhost" or host == "::1" or host.startswith("127.")
+
+def _authkey(authkey, address):
+    ''' @return: authkey as bytes, the default "rtsf" if it is None and the address is loopback
+        @raise ParamsError: authkey is None and the address is reachable from other machines
+    '''
+    if authkey is None:
+        if not is_loopback(address[0]):
+            raise p_exception.ParamsError("An authkey is required for the address {}:{}, which is not loopback.".format(*address))
+        authkey = "rtsf"
+    return authkey if isinstance(authkey, p_compat.bytes) else p_compat.str(authkey).encode("utf-8")
+
+def parse_address(address):
+    ''' @param address: "host:port" string or (host, port) tuple
+        @return: (host, port)
+    '''
+    if isinstance(address, (list, tuple)):
+        return (address[0], int(address[1]))
+
+    host, _, port = address.rpartition(":")
+    return (host or "127.0.0.1", int(port))
+
+def _send_heartbeats(records, name, interval, stopped):
+    ''' tell the coordinator the worker is alive, also while a case is running, see DistributedExecutor.lost_grace '''
+    try:
+        while not stopped.wait(interval):
+            records.put(("heartbeat", None, name))
+    except (EOFError, IOError, OSError):
+        pass
+
+def run_worker(address, authkey, runner_cls, base_dir = None, name = None, connect_timeout = 30, heartbeat = 5):
+    ''' pull the cases from the coordinator, run them and send back the records, until the coordinator is gone.
+    @param address: address of the coordinator, see parse_address
+    @param authkey: the same authkey as the coordinator, None only for a loopback address
+    @param runner_cls: Runner or subclass of Runner, with the `_default_drivers` of this machine
+    @param base_dir: the project directory on this machine; the file path of the case is relative to the coordinator's if specified
+    @param name: worker name in the report, default is hostname-pid
+    @param connect_timeout: seconds to retry connecting to the coordinator
+    @param heartbeat: seconds between the heartbeats to the coordinator
+    '''
+    name = name or u"{}-{}".format(socket.gethostname(), os.getpid())
+    address = parse_address(address)
+    manager = WorkerManager(address = address, authkey = _authkey(authkey, address))
+
+    deadline = time.time() + connect_timeout
+    while True:
+        try:
+            manager.connect()
+            break
+        except (IOError, OSError):
+            if time.time() > deadline:
+                raise
+            time.sleep(0.5)
+
+    tasks, records = manager.get_tasks(), manager.get_records()
+    logger.log_info(u"Worker {} connected to {}:{}".format(name, *address))
+
+    stopped = threading.Event()
+    heartbeats = threading.Thread(target = _send_heartbeats, args = (records, name, heartbeat, stopped), name = "rtsf-worker-heartbeat")
+    heartbeats.daemon = True
+    heartbeats.start()
+
+    runners = {}
+    try:
+        while True:
+            try:
+                task = tasks.get(timeout = 1)
+            except queue.Empty:
+                continue
+
+            if task is None:
+                break
+
+            task_id, file_path, rel_path, project, testcase_dict, variables, timeout = task
+            if base_dir:
+                file_path = os.path.join(base_dir, rel_path)
+
+            records.put(("start", task_id, name))
+            test_runner = runners.get(file_path)
+            if test_runner is None:
+                # the api, suite and fixture definitions of this machine
+                YamlCaseLoader.load_dependencies(file_path)
+                test_runner = runners[file_path] = init_test_runner(runner_cls, file_path, project)
+                test_runner._timeout = timeout
+
+            record = test_runner._run_case(testcase_dict, variables)
+            record.pop("exc_info", None)
+            record["worker"] = name
+            records.put(("record", task_id, record))
+    except (EOFError, IOError, OSError):
+        # the coordinator is finished
+        pass
+    finally:
+        stopped.set()
+        for test_runner in runners.values():
+            test_runner._close()
+        p_fixture.teardown()
+    logger.log_info(u"Worker {} stopped".format(name))
+
+class DistributedExecutor(Executor):
+    ''' the coordinator. serve the cases of TaskSuite to the workers, and merge the records into the tracers of the suites.
+        the tracers of the devices which are only attached to the workers are created on demand, so each device still has its report.
+    @note: a worker which sends nothing, not even a heartbeat, for `lost_grace` seconds is lost, the cases it started are recorded as error.
+        a case pulled from the queue but not started `lost_grace` seconds later is recorded as error as well, its worker is lost before it started.
+        a case which is still not finished `timeout` + `lost_grace` seconds after it started is recorded as timeout.
+    @note: the coordinator warns every `wait_warning` seconds while no worker is connected; if still none after `connect_timeout` seconds,
+        such as local_workers = 0 and no remote worker, the cases not started are recorded as skip instead of waiting forever.
+    '''
+    lost_grace = 30
+    prefetch = 2
+    connect_timeout = 300
+    wait_warning = 10
+
+    def __init__(self, address = ("127.0.0.1", 0), authkey = None, local_workers = 0, runner_cls = None):
+        '''
+        @param address: address to listen, see parse_address. port 0 to pick a free one, see self.address after started
+        @param authkey: the key of the workers to connect, required unless the address is loopback
+        @param local_workers: int type, number of workers to start on this box, they run with runner_cls
+        @param runner_cls: Runner or subclass of Runner for the local workers
+        '''
+        super(DistributedExecutor, self).__init__()
+        self._address = parse_address(address)
+        self._authkey = _authkey(authkey, self._address)
+        self._local_workers = int(local_workers)
+        self._runner_cls = runner_cls
+        self.address = None
+
+    def run(self, task_suite, result):
+        manager = CoordinatorManager(address = self._address, authkey = self._authkey)
+        manager.start()
+        self.address = manager.address
+        logger.log_info(u"Coordinator is listening on {}:{}".format(*self.address))
+
+        local_workers = []
+        try:
+            tasks, records = manager.get_tasks(), manager.get_records()
+            for _ in range(self._local_workers):
+                worker = multiprocessing.Process(target = run_worker, args = (self.address, self._authkey, self._runner_cls))
+                worker.daemon = True
+                worker.start()
+                local_workers.append(worker)
+
+            self._serve(task_suite, result, tasks, records)
+        finally:
+            manager.shutdown()
+            for worker in local_workers:
+                worker.join(5)
+                if worker.is_alive():
+                    worker.terminate()
+
+    def _serve(self, task_suite, result, tasks, records):
+        pending, deferred = self._iter_tasks(task_suite), []
+        queued, started = {}, {}    # task id -> (suite, test)
+        pulled = {}                 # task id -> the time it is found pulled from the queue without "start"
+        workers = {}                # worker name -> the last time it is heard
+        task_id = 0
+        # since when no worker is connected, and when it is warned last
+        waiting_since = warned_at = time.time()
+
+        while True:
+            # keep a few cases in the queue, so that the workers do not wait, and the rest can be stopped by max_failures.
+            # the resources of a case are taken once it is queued, until its record is back
+            while not result.shouldStop and len(queued) < self.prefetch * max(len(workers), 1):
+                task = self._next_task(pending, deferred)
+                if task is None:
+                    break
+
+                suite, test = task
+                task_id += 1
+                queued[task_id] = task
+                tasks.put((task_id, os.path.abspath(suite.file_path), os.path.relpath(suite.file_path), suite.test_runner.proj_info,
+                           test.testcase_dict, test.variables, suite.test_runner._timeout))
+
+            if result.shouldStop:
+                self._drain(tasks, queued)
+                del deferred[:]
+
+            if not queued and not started and not deferred:
+                break
+
+            try:
+                message = records.get(timeout = 1)
+            except queue.Empty:
+                message = ("idle", None, None)
+
+            kind, message_id, data = message
+            if kind in ("start", "heartbeat"):
+                workers[data] = time.time()
+            elif kind == "record":
+                workers[data.get("worker")] = time.time()
+
+            if kind == "start" and message_id in queued:
+                pulled.pop(message_id, None)
+                suite, test = queued.pop(message_id)
+                started[message_id] = (suite, test, time.time(), data)
+                result.startTest(test)
+            elif kind == "record" and message_id in started:
+                suite, test, _, _ = started.pop(message_id)
+                self.resources.release(test.testcase_dict)
+                self._add_record(suite, test, data, result)
+            self._check_lost(started, workers, result)
+            self._check_pulled(tasks, queued, pulled, result)
+
+            now = time.time()
+            if workers or started:
+                waiting_since = warned_at = now
+            elif now - waiting_since >= self.connect_timeout:
+                self._skip_waiting(tasks, queued, pending, deferred, result)
+                pulled.clear()
+            elif now - warned_at >= self.wait_warning:
+                warned_at = now
+                logger.log_warning(u"Waiting for workers on {}:{}, no worker connected for {}s, {} case(s) queued.".format(
+                    self.address[0], self.address[1], int(now - waiting_since), len(queued)))
+
+    def _drain(self, tasks, queued):
+        # the cases not pulled yet are not run
+        while True:
+            try:
+                task = tasks.get_nowait()
+            except queue.Empty:
+                break
+            task = queued.pop(task[0], None)
+            if task is not None:
+                self.resources.release(task[1].testcase_dict)
+
+    def _skip_waiting(self, tasks, queued, pending, deferred, result):
+        # no worker to run the rest cases, they are recorded as skip
+        reason = u"no worker connected to the coordinator in {}s".format(self.connect_timeout)
+        logger.log_error(u"No worker connected in {}s, skip the cases not started.".format(self.connect_timeout))
+        waiting = list(queued.values())
+        self._drain(tasks, queued)
+        # pulled by a worker which is lost before it started them
+        for suite, test in queued.values():
+            self.resources.release(test.testcase_dict)
+        queued.clear()
+        for suite, test in waiting + deferred + list(pending):
+            self._skip(suite, test, reason, result)
+        del deferred[:]
+
+    def _check_pulled(self, tasks, queued, pulled, result):
+        # the queue is first in first out, the cases queued before the ones still in it are pulled by the workers
+        now = time.time()
+        message_ids = sorted(queued)
+        for message_id in message_ids[:max(len(message_ids) - tasks.qsize(), 0)]:
+            if now - pulled.setdefault(message_id, now) < self.lost_grace:
+                continue
+
+            pulled.pop(message_id)
+            suite, test = queued.pop(message_id)
+            self.resources.release(test.testcase_dict)
+            err_msg = u"A worker is lost before it started: {}".format(test.testcase_dict.get("name"))
+            logger.log_error(err_msg)
+            result.startTest(test)
+            record = suite.test_runner._start_record(test.testcase_dict, test.variables)
+            record.update({"status": "error", "error": err_msg})
+            suite.test_runner._trace_error(test.testcase_dict, test.variables, err_msg)
+            self._add_record(suite, test, suite.test_runner._stop_record(record), result)
+
+    def _check_lost(self, started, workers, result):
+        now = time.time()
+        for message_id, (suite, test, started_at, worker) in list(started.items()):
+            timeout = suite.test_runner._case_timeout(test.testcase_dict)
+            if now - workers.get(worker, started_at) >= self.lost_grace:
+                status, err_msg = "error", u"Worker {} is lost while running: {}".format(worker, test.testcase_dict.get("name"))
+            elif timeout and now - started_at >= timeout + self.lost_grace:
+                status, err_msg = "timeout", u"Worker {} is lost, case timeout after {}s: {}".format(worker, timeout, test.testcase_dict.get("name"))
+            else:
+                continue
+
+            started.pop(message_id)
+            self.resources.release(test.testcase_dict)
+            logger.log_error(err_msg)
+            record = suite.test_runner._start_record(test.testcase_dict, test.variables)
+            record.update({"status": status, "start_at": started_at, "error": err_msg})
+            if status == "timeout":
+                suite.test_runner._trace_timeout(test.testcase_dict, test.variables, err_msg)
+            self._add_record(suite, test, suite.test_runner._stop_record(record), result)
+
+        for worker, heard_at in list(workers.items()):
+            if now - heard_at >= self.lost_grace:
+                del workers[worker]
+
+def import_runner(path):
+    ''' @param path: "package.module:RunnerClass" '''
+    module_name, _, class_name = path.partition(":")
+    if not class_name:
+        raise ValueError("Invalid runner '{}', should be like 'package.module:RunnerClass'.".format(path))
+    return getattr(ModuleUtils.get_imported_module(module_name), class_name)
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "rtsf distributed worker, which runs the cases of a coordinator")
+    parser.add_argument("--address", required = True, help = "coordinator address, host:port")
+    parser.add_argument("--authkey", default = None, help = "the same authkey as the coordinator, required unless the address is loopback")
+    parser.add_argument("--runner", default = "rtsf.p_executer:Runner", help = "Runner class of this machine, package.module:RunnerClass")
+    parser.add_argument("--base-dir", default = None, help = "project directory on this machine, if it differs from the coordinator's")
+    parser.add_argument("--name", default = None, help = "worker name, default is hostname-pid")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.getcwd())
+    run_worker(args.address, args.authkey, import_runner(args.runner), base_dir = args.base_dir, name = args.name)
+
+if __name__ == "__main__":
+    main()
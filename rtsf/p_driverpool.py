@@ -0,0 +1,179 @@
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.p_driverpool
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:    lkf20031988@163.com
+    RCS:      rtsf.p_driverpool,v 1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+
+======================================================================
+
+Pool of warm drivers, such as browsers or app sessions, which are reused across the cases.
+
+'''
+
+import time,threading
+from rtsf.p_applog import logger
+
+
+class DriverPool(object):
+    ''' drivers per device id, created on demand and reused by the cases.
+        a driver is checked out for a case and checked in after it; it is destroyed if it is unhealthy, used too many times or idle too long.
+        the pool is thread-safe, so the grid threads and the forks of AsyncRunner can share it.
+    usage:
+        class WebRunner(Runner):
+            def __init__(self):
+                super(WebRunner, self).__init__()
+                self._driver_pool = DriverPool(factory = lambda device_id: webdriver.Chrome(),
+                                               health_check = lambda driver: bool(driver.window_handles),
+                                               destroy = lambda driver: driver.quit(),
+                                               max_uses = 50, max_idle = 300)
+
+            def run_test(self, testcase_dict, variables, driver_map):
+                device_id, driver = driver_map   # driver is checked out from the pool
+                ...
+    '''
+
+    def __init__(self, factory, health_check = None, destroy = None, max_size = None, max_uses = None, max_idle = None):
+        '''
+        @param factory: function, factory(device_id) create a new driver
+        @param health_check: function, health_check(driver) return False if the driver should not be reused. default is None, always healthy
+        @param destroy: function, destroy(driver) release the driver, such as driver.quit(). default is None, do nothing
+        @param max_size: int type, max number of drivers of a device, checkout waits for a checked in one if reached. default is None, no limit
+        @param max_uses: int type, destroy the driver after used for max_uses cases. default is None, no limit
+        @param max_idle: seconds, destroy the driver if it is not used for max_idle seconds. default is None, no limit
+        '''
+        self._factory = factory
+        self._health_check = health_check
+        self._destroy = destroy
+        self._max_size = max_size
+        self._max_uses = max_uses
+        self._max_idle = max_idle
+
+        self._condition = threading.Condition()
+        self._idle = {}        # device id -> [{"driver": driver, "uses": 1, "checkin_at": 1551755468.02}]
+        self._in_use = {}      # device id -> [entry]
+        self._stats = {}
+        self._closed = False
+
+    def checkout(self, device_id):
+        ''' @return: a healthy idle driver of device_id, or a new one '''
+        with self._condition:
+            while True:
+                self._evict_idle()
+                while self._idle.get(device_id):
+                    entry = self._idle[device_id].pop()
+                    if self._is_healthy(device_id, entry["driver"]):
+                        self._count(device_id, "reused")
+                        return self._lend(device_id, entry)
+                    self._discard(device_id, entry, "unhealthy")
+
+                if not self._max_size or len(self._in_use.get(device_id, [])) < self._max_size:
+                    break
+                self._condition.wait()
+
+            # reserve the place of the driver being created, so that max_size is kept
+            entry = {"driver": None, "uses": 0, "checkin_at": None}
+            self._lend(device_id, entry)
+
+        # create out of the lock, it may take seconds, such as starting a browser
+        try:
+            entry["driver"] = self._factory(device_id)
+        except Exception:
+            with self._condition:
+                self._in_use[device_id].remove(entry)
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._count(device_id, "created")
+        return entry["driver"]
+
+    def checkin(self, device_id, driver):
+        ''' give back the driver after the case, it is destroyed if used up. the health is checked at next checkout '''
+        with self._condition:
+            entries = [entry for entry in self._in_use.get(device_id, []) if entry["driver"] is driver]
+            if not entries:
+                logger.log_warning(u"Driver of {} is not checked out from the pool.".format(device_id))
+                return
+
+            entry = entries[0]
+            self._in_use[device_id].remove(entry)
+            entry["checkin_at"] = time.time()
+            if self._closed:
+                self._destroy_driver(device_id, driver)
+            elif self._max_uses and entry["uses"] >= self._max_uses:
+                self._discard(device_id, entry, "used_up")
+            else:
+                self._idle.setdefault(device_id, []).append(entry)
+            self._condition.notify()
+
+    def stats(self, device_id = None):
+        ''' @return: dict type, statistics of the device or all devices, e.g.
+                {"created": 1, "reused": 9, "unhealthy": 0, "used_up": 0, "idle_timeout": 0, "idle": 1, "in_use": 0}
+        '''
+        with self._condition:
+            device_ids = [device_id] if device_id is not None else set(self._stats) | set(self._idle) | set(self._in_use)
+            result = dict.fromkeys(("created", "reused", "unhealthy", "used_up", "idle_timeout", "idle", "in_use"), 0)
+            for did in device_ids:
+                for name, value in self._stats.get(did, {}).items():
+                    result[name] += value
+                result["idle"] += len(self._idle.get(did, []))
+                result["in_use"] += len(self._in_use.get(did, []))
+            return result
+
+    def close(self):
+        ''' destroy the idle drivers, the checked out ones are destroyed when checked in '''
+        with self._condition:
+            for device_id, entries in self._idle.items():
+                for entry in entries:
+                    self._destroy_driver(device_id, entry["driver"])
+            self._idle = {}
+            self._closed = True
+
+    def _lend(self, device_id, entry):
+        entry["uses"] += 1
+        self._in_use.setdefault(device_id, []).append(entry)
+        return entry["driver"]
+
+    def _evict_idle(self):
+        if not self._max_idle:
+            return
+
+        now = time.time()
+        for device_id, entries in self._idle.items():
+            expired = [entry for entry in entries if now - entry["checkin_at"] > self._max_idle]
+            for entry in expired:
+                entries.remove(entry)
+                self._discard(device_id, entry, "idle_timeout")
+
+    def _is_healthy(self, device_id, driver):
+        if self._health_check is None:
+            return True
+        try:
+            return bool(self._health_check(driver))
+        except Exception as e:
+            logger.log_warning(u"Health check of driver {} raise: {}".format(device_id, e))
+            return False
+
+    def _discard(self, device_id, entry, reason):
+        self._count(device_id, reason)
+        self._destroy_driver(device_id, entry["driver"])
+
+    def _destroy_driver(self, device_id, driver):
+        if self._destroy is None:
+            return
+        try:
+            self._destroy(driver)
+        except Exception as e:
+            logger.log_warning(u"Destroy driver {} raise: {}".format(device_id, e))
+
+    def _count(self, device_id, name):
+        stats = self._stats.setdefault(device_id, {})
+        stats[name] = stats.get(name, 0) + 1
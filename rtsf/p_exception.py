@@ -54,6 +54,12 @@ class ValidationError(MyBaseError):
 class InstanceTypeError(MyBaseError):
     pass
 
+class CaseExecutionError(MyBaseError):
+    pass
+
+class CaseTimeoutError(CaseExecutionError):
+    pass
+
 class NotFoundError(MyBaseError):
     pass
 
@@ -20,27 +20,41 @@ UI and Web Http automation frame for python.
 '''
 
 
-import unittest,sys,os
+import unittest,sys,os,time,traceback,copy,inspect
 import multiprocessing,threading
+from concurrent import futures
 from functools import partial
 from rtsf.p_applog import logger
 from rtsf.p_tracer import Tracer
+from rtsf.p_report import HtmlReporter
 from rtsf.p_testcase import YamlCaseLoader,parse_project_data
-from rtsf import p_testcase, p_compat,p_exception
+from rtsf.p_history import CaseHistory,case_key
+from rtsf.p_journal import Journal
+from rtsf import p_testcase, p_compat,p_exception,p_scheduler,p_fixture,p_cache
 
 class TestCase(unittest.TestCase):
     """ create a testcase.
     """
-    def __init__(self, test_runner, testcase_dict, variables):
+    def __init__(self, test_runner, testcase_dict, variables, file_path=None):
         super(TestCase, self).__init__()
         self.test_runner = test_runner
         self.testcase_dict = testcase_dict.copy()
         self.variables = variables
+        self.file_path = file_path
+    
+    @property
+    def key(self):
+        """ file name + case name + data row, see p_history.case_key
+        """
+        return case_key(self.file_path, self.testcase_dict.get("name"), self.variables)
 
     def runTest(self):
         """ run testcase and check result.
         """
-        self.test_runner._run_test(self.testcase_dict, self.variables)
+        self.record = self.test_runner._run_case(self.testcase_dict, self.variables)
+        exc_info = self.record.pop("exc_info", None)
+        if exc_info:
+            raise exc_info[1]
 
 
 class TestSuite(unittest.TestSuite):
@@ -53,6 +67,8 @@ class TestSuite(unittest.TestSuite):
                 "project": {
                     "name": "project name",
                     "module": "testset description"
+                    "retries": 0,    # optional, times to re-run a case which is not passed
+                    "resources": {},    # optional, resource name map to the max number of cases using it at the same time, e.g. {"db": 2}
                     "data":[
                                 {'csv': 'username_password.csv', 'by': 'Sequential'}, 
                                 {'csv': 'devices.csv', 'by': 'Sequential'}
@@ -64,6 +80,9 @@ class TestSuite(unittest.TestSuite):
                         "tester": "",    # optional
                         "responsible": "",    # optional
                         "pre_command": [],    # optional
+                        "depends_on": [],    # optional, names of the cases which should pass first
+                        "retries": 0,    # optional, takes priority over the one of project
+                        "resources": [],    # optional, names of the resources the case uses, see `resources` of the project
                         "steps": [],      
                         "post_command": {},     # optional
                         "verify": []         # optional
@@ -71,46 +90,119 @@ class TestSuite(unittest.TestSuite):
                     testcase12
                 ]
             }
+    (bool) lazy
+        if True, the test cases are not built up front but yielded on demand from the cartesian product of project data,
+        so the memory keeps flat no matter how large the product is, and the first case starts immediately.
     """            
-    def __init__(self, testset, runner_cls):
+    def __init__(self, testset, runner_cls, lazy=False):
         super(TestSuite, self).__init__()
          
-        file_path    = testset.get("file_path")
-        project      = testset.get("project")
-        testcases    = testset.get("cases", [])        
-        project_data = project.pop("data",[])
+        file_path    = self.file_path = testset.get("file_path")
+        # copy, the testsets of YamlCaseLoader are cached and may be loaded again, such as another shard
+        project      = dict(testset.get("project"))
+        testcases    = self._testcases = testset.get("cases", [])        
+        project_data = self._project_data = project.pop("data",[])
         
-        test_runner = self.test_runner = runner_cls()
-        if not isinstance(test_runner._default_devices, (list, tuple)):            
-            raise TypeError("_default_devices not a list or tuple.")
+        test_runner = self.test_runner = init_test_runner(runner_cls, file_path, project)
+        # case name map to the names of cases it depends on, see p_dag.DagExecutor
+        self.dependencies = p_scheduler.build_dependencies(testcases)
+        # the static data of the cases is not evaluated again, the marks are kept by the parser of the suite, see p_testcase.mark_static
+        for testcase_dict in testcases:
+            test_runner.parser.mark_static(testcase_dict)
+        self.lazy = lazy
+        self._predicates = []
+        self._order = None
+        if lazy:
+            return
         
-        test_runner.init_runner(parser = p_testcase.TestCaseParser(file_path = file_path), 
-                            tracers = {device:Tracer(device_id = device, dir_name = os.path.dirname(os.path.abspath(file_path))) for device in test_runner._default_devices},
-                            projinfo = project
-                            )
-        
-        for data_variables_dict in parse_project_data(project_data, file_path) or [{}]:
+        for data_variables_dict in self._iter_project_data():
             for testcase_dict in testcases:                        
                 self._add_test_to_suite(testcase_dict["name"], test_runner, testcase_dict, data_variables_dict)
                              
     def _add_test_to_suite(self, testcase_name, test_runner, testcase_dict, variables):
+        test = self._new_test(testcase_name, test_runner, testcase_dict, variables)
+        [self.addTest(test) for _ in range(int(testcase_dict.get("times", 1)))]        
+    
+    def _new_test(self, testcase_name, test_runner, testcase_dict, variables):
         if p_compat.is_py3:
             TestCase.runTest.__doc__ = testcase_name
         else:
             TestCase.runTest.__func__.__doc__ = testcase_name
         
-        test = TestCase(test_runner, testcase_dict, variables)
-        [self.addTest(test) for _ in range(int(testcase_dict.get("times", 1)))]        
+        return TestCase(test_runner, testcase_dict, variables, self.file_path)
+    
+    def _iter_project_data(self):
+        empty = True
+        for data_variables_dict in parse_project_data(self._project_data, self.file_path, lazy = True):
+            empty = False
+            yield data_variables_dict
         
+        if empty:
+            yield {}
+    
+    def _iter_tests(self):
+        for data_variables_dict in self._iter_project_data():
+            for testcase_dict in self._testcases:
+                test = self._new_test(testcase_dict["name"], self.test_runner, testcase_dict, data_variables_dict)
+                if not self._is_selected(test):
+                    continue
+                for _ in range(int(testcase_dict.get("times", 1))):
+                    yield test
+    
+    def _is_selected(self, test):
+        return all(predicate(test) for predicate in self._predicates)
+    
+    def select(self, predicate):
+        """ keep the cases which predicate(test) is True, such as the cases of a shard
+        @param predicate: function with a TestCase argument
+        """
+        self._predicates.append(predicate)
+        if not self.lazy:
+            self._tests = [test for test in self._tests if self._is_selected(test)]
+    
+    def order(self, key):
+        """ run the cases in the order of key(test), such as the priority of a budget run.
+            the lazy suite has to build up the selected cases to sort them
+        @param key: function with a TestCase argument
+        """
+        self._order = key
+        if not self.lazy:
+            self._tests.sort(key = key)
+    
+    def __iter__(self):
+        if self.lazy and self._order is not None:
+            return iter(sorted(self._iter_tests(), key = self._order))
+        elif self.lazy:
+            return self._iter_tests()
+        return super(TestSuite, self).__iter__()
+    
+    def _removeTestAtIndex(self, index):
+        # nothing to release for the lazy suite, the cases are dropped once they are run
+        if not self.lazy:
+            super(TestSuite, self)._removeTestAtIndex(index)
+    
+    def add_reports(self, reports):
+        """ merge the reports of a case into the tracers, the tracer of an unknown device is created on demand
+        @param reports: list of (device_id, report), see Runner._run_case
+        """
+        for device_id, report in reports:
+            tracer = self.test_runner.tracers.get(device_id)
+            if tracer is None:
+                # the device is only attached to a remote worker, see p_distributed
+                tracer = self.test_runner.tracers[device_id] = Tracer(device_id = device_id, dir_name = os.path.dirname(os.path.abspath(self.file_path)))
+            HtmlReporter.add_report_data(list_all = tracer.summary, **report)
+    
     @property
-    def tests(self):                
+    def tests(self):
+        if self.lazy:
+            return self._iter_tests()
         return self._tests
    
 class TaskSuite(unittest.TestSuite):
     """ create task suite with specified testcase path.
         each task suite may include one or several test suite.
     """
-    def __init__(self, testsets, runner_cls):
+    def __init__(self, testsets, runner_cls, lazy=False):
         """
         @params
             testsets (dict/list): testset or list of testset
@@ -128,8 +220,13 @@ class TaskSuite(unittest.TestSuite):
                 ]
             mapping (dict):
                 passed in variables mapping, it will override variables in config block
+            lazy (bool):
+                build the streaming TestSuite if True
         """
         super(TaskSuite, self).__init__()
+        self.executor = None
+        # (suite, test, reason) of the cases which are not run, such as out of the time budget. they are reported as skipped
+        self.skipped = []
 
         if not testsets:
             raise p_exception.TestcaseNotFound
@@ -139,39 +236,221 @@ class TaskSuite(unittest.TestSuite):
         
         self.suite_list = []
         for testset in testsets:
-            suite = TestSuite(testset, runner_cls)
+            suite = TestSuite(testset, runner_cls, lazy)
             self.addTest(suite)
             self.suite_list.append(suite)
 
+    def run(self, result, debug=False):
+        """ run with the executor if specified, such as p_parallel.ProcessExecutor; otherwise run one by one like unittest
+        """
+        if self.executor is None:
+            return super(TaskSuite, self).run(result, debug)
+        
+        self.executor.run(self, result)
+        for suite, test, reason in self.skipped:
+            self.executor._skip(suite, test, reason, result)
+        return result
+    
     @property
     def tasks(self):
         return self.suite_list
 
 
-def init_test_suite(path_or_testsets, runner_cls):
+class Executor(object):
+    ''' base class of the executors which run the cases of TaskSuite in their own way instead of one by one, 
+        such as p_parallel.ProcessExecutor and p_async.AsyncExecutor.
+        the records of cases are merged into the tracers of the suite, so that the html report is the same as serial mode.
+    @note: listeners are called with (test, record) once a case is finished, such as to update the history of cases
+    @note: no more case is scheduled once `max_failures` cases are not passed, the running ones are finished as usual
+    @note: the executors which run cases at the same time never exceed the limits of `resources`, see p_scheduler.ResourcePool
+    '''
+    
+    def __init__(self):
+        self.listeners = []
+        self.max_failures = None
+        self.failures = 0
+        self.resources = p_scheduler.ResourcePool()
+    
+    def run(self, task_suite, result):
+        ''' run the cases of task_suite and add the results to result
+        @param task_suite: instance of TaskSuite
+        @param result: instance of unittest.TestResult
+        '''
+        raise NotImplementedError
+    
+    def _iter_tasks(self, task_suite):
+        for suite in task_suite.tasks:
+            for test in suite:
+                yield suite, test
+    
+    def _next_task(self, tasks, deferred):
+        ''' take the next task whose resources are available and acquire them.
+            a task waiting for its resources is deferred, so that the free slot is filled with the others.
+        @param tasks: iterator of (suite, test)
+        @param deferred: list of the deferred tasks, which are taken first once their resources are released
+        @return: (suite, test), None if no task could start now
+        '''
+        for index, (suite, test) in enumerate(deferred):
+            if self.resources.available(test.testcase_dict):
+                self.resources.acquire(test.testcase_dict)
+                return deferred.pop(index)
+        
+        for suite, test in tasks:
+            if self.resources.available(test.testcase_dict):
+                self.resources.acquire(test.testcase_dict)
+                return suite, test
+            deferred.append((suite, test))
+        return None
+    
+    def _skip(self, suite, test, reason, result):
+        ''' trace the case as skipped without running it, it is not passed to the listeners '''
+        test_runner = suite.test_runner._fork()
+        record = test_runner._start_record(test.testcase_dict, test.variables)
+        record.update({"status": "skip", "error": None, "reason": reason})
+        test_runner._trace_skip(test.testcase_dict, test.variables, reason)
+        test.record = record = test_runner._stop_record(record)
+        suite.add_reports(record["reports"])
+        
+        logger.log_warning(u"Skip {}: {}".format(record["name"], reason))
+        result.startTest(test)
+        result.addSkip(test, reason)
+        result.stopTest(test)
+    
+    def _add_record(self, suite, test, record, result):
+        ''' merge the record of a case into the tracers of the suite, and add the result to unittest
+        '''
+        exc_info = record.pop("exc_info", None)
+        test.record = record
+        suite.add_reports(record["reports"])
+        
+        if record["error"]:
+            if not exc_info:
+                exc_info = (p_exception.CaseExecutionError, p_exception.CaseExecutionError(record["error"]), None)
+            result.addError(test, exc_info)
+        else:
+            result.addSuccess(test)
+        result.stopTest(test)
+        self._on_record(suite, test, record, result)
+    
+    def _on_record(self, suite, test, record, result):
+        record["key"] = test.key
+        for listener in self.listeners:
+            listener(test, record)
+        
+        if record["status"] == "pass":
+            return
+        
+        self.failures += 1
+        if self.max_failures and self.failures >= self.max_failures and not result.shouldStop:
+            logger.log_warning("{} case(s) not passed, stop scheduling the rest cases.".format(self.failures))
+            result.stop()
+
+class SerialExecutor(Executor):
+    ''' run the cases one by one in the main process, the same as unittest
+    '''
+    
+    def run(self, task_suite, result):
+        for suite, test in self._iter_tasks(task_suite):
+            if result.shouldStop:
+                break
+            
+            test(result)
+            record = getattr(test, "record", None)
+            if record is not None:
+                self._on_record(suite, test, record, result)
+
+def _async_raise(thread, exc_type):
+    ''' raise exc_type in the thread, best effort. '''
+    try:
+        import ctypes
+    except ImportError:
+        return False
+    
+    thread_id = ctypes.c_ulong(thread.ident) if p_compat.is_py3 else ctypes.c_long(thread.ident)
+    changed = ctypes.pythonapi.PyThreadState_SetAsyncExc(thread_id, ctypes.py_object(exc_type))
+    if changed > 1:
+        # should never happen, revert it
+        ctypes.pythonapi.PyThreadState_SetAsyncExc(thread_id, None)
+    return changed == 1
+
+def init_test_runner(runner_cls, file_path, project):
+    """ initialize a Runner with the testset config, so that each suite or worker has its own parser and tracers
+    @param runner_cls: Runner or subclass of Runner
+    @param file_path: testset file path
+    @param project: project info of the testset
+    """
+    test_runner = runner_cls()
+    if not isinstance(test_runner._default_devices, (list, tuple)):            
+        raise TypeError("_default_devices not a list or tuple.")
+    
+    test_runner.init_runner(parser = p_testcase.TestCaseParser(file_path = file_path), 
+                        tracers = {device:Tracer(device_id = device, dir_name = os.path.dirname(os.path.abspath(file_path))) for device in test_runner._default_devices},
+                        projinfo = project
+                        )
+    return test_runner
+
+def init_test_suite(path_or_testsets, runner_cls, lazy=False):
     if not p_testcase.is_testsets(path_or_testsets):
         YamlCaseLoader.load_dependencies(path_or_testsets)        
         testsets = YamlCaseLoader.load_files(path_or_testsets)
     else:
         testsets = path_or_testsets
 
-    return TaskSuite(testsets, runner_cls)
+    return TaskSuite(testsets, runner_cls, lazy)
 
 class TestRunner(object):
 
     def __init__(self, **kwargs):
         """ initialize test runner
-        @param (dict) kwargs: key-value arguments used to initialize TextTestRunner            
+        @param (dict) kwargs: key-value arguments used to initialize TextTestRunner
+            runner:  Runner or subclass of Runner, default is Runner
+            workers: int type, run cases in a pool of worker processes if greater than 1, default is 1.
+                if any case has `depends_on`, the cases are run by p_dag.DagExecutor in a pool of `workers` threads instead
+            concurrency: int type, max number of in-flight cases of a suite on the event loop if runner is a p_async.AsyncRunner, default is 10
+            lazy: bool type, yield cases on demand from the data-driven product instead of building all of them up front, default is False
+            timeout: seconds a case may run before it is aborted and recorded as timeout, the `timeout` key of a yaml case takes priority. default is None, no limit
+            max_failures: int type, stop scheduling the rest cases of all suites once the number of failed cases reaches it, default is None, no limit
+            failfast: bool type, same as max_failures = 1, default is False
+            coordinator: (host, port) or "host:port", serve the cases to the workers of p_distributed instead of running them here. default is None
+            authkey: the key of the workers to connect the coordinator, required unless the coordinator is on the loopback address. default is None
+            local_workers: int type, number of workers to start on this box for the coordinator, they run with `runner`. default is 0
+            load: dict type, run each case under load, see p_load.LoadSettings. e.g. {"concurrency": 20, "ramp_up": 10, "duration": 60, "warmup": 5}
+                the `load` key of a yaml case takes priority. default is None, each case runs once
+            resources: dict type, resource name map to the max number of cases using it at the same time, e.g. {"db": 2}.
+                it takes priority over the `resources` of the projects. default is None, only the limits of the projects
         """
         runner_cls = kwargs.pop("runner", Runner)
+        workers = int(kwargs.pop("workers", 1))
+        concurrency = int(kwargs.pop("concurrency", 10))
+        lazy = kwargs.pop("lazy", False)
+        timeout = kwargs.pop("timeout", None)
+        load = kwargs.pop("load", None)
+        coordinator = kwargs.pop("coordinator", None)
+        authkey = kwargs.pop("authkey", None)
+        local_workers = int(kwargs.pop("local_workers", 0))
+        resources = kwargs.pop("resources", None)
+        max_failures = kwargs.pop("max_failures", None)
+        # failfast of unittest only counts the errors, the failed cases are counted by the executor instead
+        if kwargs.pop("failfast", False):
+            max_failures = 1
         
         if not callable(runner_cls) and not isinstance(runner_cls(), Runner):
             raise p_exception.InstanceTypeError("Invalid runner, must be instance of Runner.")
         
         self._runner_cls = runner_cls
+        self._workers = workers
+        self._concurrency = concurrency
+        self._lazy = lazy
+        self._timeout = timeout
+        self._max_failures = max_failures
+        self._load = load
+        self._coordinator = coordinator
+        self._authkey = authkey
+        self._local_workers = local_workers
+        self._resources = resources
         self.runner = unittest.TextTestRunner(**kwargs)
 
-    def run(self, path_or_testsets):
+    def run(self, path_or_testsets, shard=None, only_failed=False, journal=None, resume=None, quarantine=None, budget_seconds=None, shard_history=None):
         """ start to run test with varaibles mapping
         @param path_or_testsets: YAML/JSON testset file path or testset list
             path: path could be in several type
@@ -185,17 +464,165 @@ class TestRunner(object):
                         testset_dict_1,
                         testset_dict_2
                     ]
+        @param shard: "i/n" string or (i, n) tuple, only run the i-th of n shards, i is 1-based. e.g. "2/4"
+            the shards are the stable hash of cases, or balanced by the durations of shard_history.
+            each case is in exactly one shard, and the same shard is selected on every node with the same files and shard_history.
+        @param only_failed: bool type, only run the cases and data rows which are not passed in the results.json of the last run
+        @param journal: journal file path, append each finished case to it and sync to disk at once, see p_journal.Journal
+        @param resume: journal file path of a crashed or stopped run, skip the cases finished in it and rebuild their reports,
+            the rest cases are appended to the same journal. the repeated `times` of a case are all skipped once it is finished
+        @param quarantine: "exclude" to skip the chronically flaky cases in the history, "only" to run them alone, such as a low priority run.
+            default is None, run all cases. a case is flaky if it passed on retry, see `retries` of the project or case
+        @param budget_seconds: wall time of the run, such as a pre-merge gate. only the most valuable cases which fit it by the duration history
+            are run, the failed, new, changed and failure-prone cases first; the rest are reported as skipped, see p_scheduler.select_budget
+        @param shard_history: path of a history file pinned for all nodes, such as the rtsf_history.json of an earlier run shared as a CI artifact.
+            default is None, the shards are not balanced by durations, since the history next to the testsets differs on each node once it runs
         """
                 
         try:
-            self._task_suite =init_test_suite(path_or_testsets, self._runner_cls)
+            self._task_suite =init_test_suite(path_or_testsets, self._runner_cls, self._lazy)
         except p_exception.TestcaseNotFound:
             logger.log_error("Testcases not found in {}".format(path_or_testsets))
             sys.exit(1)
-
-        self.text_test_result = self.runner.run(self._task_suite)        
+        
+        if self._timeout:
+            for suite in self._task_suite.tasks:
+                suite.test_runner._timeout = self._timeout
+        
+        if only_failed:
+            self._select_failed()
+        
+        self.history = CaseHistory()
+        if quarantine:
+            keys = p_scheduler.select_quarantine(self._task_suite, self.history, quarantine)
+            logger.log_info("{} chronically flaky case(s) quarantined, {} them.".format(len(keys), "skip" if quarantine == "exclude" else "only run"))
+        
+        if shard:
+            keys = p_scheduler.select_shard(self._task_suite, shard, CaseHistory(shard_history) if shard_history else None)
+            logger.log_info("Shard {}: {} case(s) selected.".format(shard, len(keys)))
+        
+        if resume:
+            self._resume(resume)
+        
+        if budget_seconds:
+            self._select_budget(budget_seconds)
+        
+        executor = self._task_suite.executor = self._init_executor()
+        executor.listeners.append(self._update_history)
+        executor.max_failures = self._max_failures
+        executor.resources = self._init_resources()
+        
+        self.journal = Journal(resume or journal) if resume or journal else None
+        if self.journal:
+            executor.listeners.append(self._append_journal)
+        
+        try:
+            self.text_test_result = self.runner.run(self._task_suite)
+        finally:
+            if self.journal:
+                self.journal.close()
+        self.history.save()
+        self._dump_results()
+        self._trace_caches(executor)
+        
+        for suite in self._task_suite.tasks:
+            suite.test_runner._close()
+        p_fixture.teardown()
+        p_cache.clear()
         return self
     
+    def _trace_caches(self, executor):
+        ''' the hit and miss counts of the cacheable keywords of this run, including the ones of worker processes '''
+        caches = p_cache.merge_stats(p_cache.stats(), getattr(executor, "caches", {}))
+        if not caches:
+            return
+        
+        logger.log_info(u"Keyword cache: {}".format(u"; ".join(u"{}: {} hits / {} misses".format(name, counts["hits"], counts["misses"]) for name, counts in sorted(caches.items()))))
+        for suite in self._task_suite.tasks:
+            for tracer in suite.test_runner.tracers.values():
+                tracer.caches = caches
+    
+    def _dump_results(self):
+        for suite in self._task_suite.tasks:
+            for tracer in suite.test_runner.tracers.values():
+                tracer.dump_results()
+    
+    def _select_failed(self):
+        for suite in self._task_suite.tasks:
+            failed = set()
+            results_list = [HtmlReporter.load_results(tracer.result_path) for tracer in suite.test_runner.tracers.values()]
+            if not [results for results in results_list if results is not None]:
+                logger.log_warning("No results of last run for {}, run all cases.".format(suite.file_path))
+                continue
+            
+            for results in results_list:
+                failed.update(key for key, result in (results or {}).items() if result["status"].lower() != "pass")
+            suite.select(lambda test, failed = failed: test.key in failed)
+            logger.log_info("{} failed case(s) of last run selected for {}.".format(len(failed), suite.file_path))
+    
+    def _resume(self, journal_path):
+        entries = {}
+        for entry in Journal.load(journal_path):
+            entries.setdefault(entry["suite"], []).append(entry)
+        
+        for suite in self._task_suite.tasks:
+            finished = entries.get(os.path.abspath(suite.file_path), [])
+            if not finished:
+                continue
+            
+            done = set(entry["key"] for entry in finished)
+            suite.select(lambda test, done = done: test.key not in done)
+            for entry in finished:
+                suite.add_reports(entry["reports"])
+            logger.log_info("{} finished case(s) in journal skipped for {}.".format(len(done), suite.file_path))
+    
+    def _select_budget(self, budget_seconds):
+        if not [suite for suite in self._task_suite.tasks if self.history.has_durations(suite.file_path)]:
+            logger.log_warning("No duration history for the time budget, all cases are estimated as 0s.")
+        
+        selected, skipped = p_scheduler.select_budget(self._task_suite, budget_seconds, self.history, self._workers)
+        self._task_suite.skipped.extend(skipped)
+        logger.log_info("Time budget {}s: {} case(s) selected, {} case(s) skipped.".format(budget_seconds, selected, len(skipped)))
+    
+    def _append_journal(self, test, record):
+        self.journal.append(Journal.entry(test, record))
+    
+    def _init_executor(self):
+        if self._coordinator is not None:
+            from rtsf.p_distributed import DistributedExecutor
+            executor = DistributedExecutor(self._coordinator, self._authkey, self._local_workers, self._runner_cls)
+        elif self._load is not None or [suite for suite in self._task_suite.tasks if [case for case in suite._testcases if "load" in case]]:
+            from rtsf.p_load import LoadExecutor
+            executor = LoadExecutor(self._load)
+        elif [suite for suite in self._task_suite.tasks if suite.dependencies]:
+            from rtsf.p_dag import DagExecutor
+            executor = DagExecutor(self._workers)
+        elif self._workers > 1:
+            from rtsf.p_parallel import ProcessExecutor
+            executor = ProcessExecutor(self._runner_cls, self._workers)
+            executor.history = self.history
+        elif p_compat.is_py3 and inspect.iscoroutinefunction(self._runner_cls.run_test):
+            from rtsf.p_async import AsyncExecutor
+            executor = AsyncExecutor(self._concurrency)
+        else:
+            executor = SerialExecutor()
+        return executor
+    
+    def _init_resources(self):
+        ''' the lower limit is kept for a resource limited by several projects, the `resources` of TestRunner takes priority '''
+        limits = {}
+        for suite in self._task_suite.tasks:
+            for resource, limit in p_scheduler.ResourcePool(suite.test_runner.proj_info.get("resources")).limits.items():
+                limits[resource] = min(limits.get(resource, limit), limit)
+        limits.update(p_scheduler.ResourcePool(self._resources).limits)
+        
+        if limits:
+            logger.log_info("Resource limits: {}".format(", ".join("{}={}".format(resource, limit) for resource, limit in sorted(limits.items()))))
+        return p_scheduler.ResourcePool(limits)
+    
+    def _update_history(self, test, record):
+        self.history.update(test.file_path, test.key, record)
+    
     def gen_html_report(self):
         html_report = []
         for suite in self._task_suite.tasks:
@@ -219,10 +646,23 @@ class Runner(object):
                             e.g.
                                 default ("", None) use to run case with a driver;
                                 [("192.168.0.1:5555":selenium_driver), ("192.168.0.2:5555":appium_driver), ...] use for multiple process to run case with specified drivers                      
+            _timeout -> seconds a case may run; the case is aborted and recorded as timeout by a watchdog. None means no limit.
+                            the `timeout` key of a yaml case takes priority over it.
+            _driver_pool -> p_driverpool.DriverPool or None; if set, the driver of each driver map is checked out from the pool for a case and checked in after it,
+                            so the warm drivers are reused across cases instead of created per case.
+            _grid_mode -> "thread" or "process"; how the drivers run a case if not _local_driver. 
+                            "process" runs each driver in a long-lived worker process pinned to its device, see _run_grid_multiprocess
+            _abort_grace -> seconds to wait for the thread of a timeout case to be aborted, see _run_with_watchdog
         '''
         self._default_devices = [""]
         self._default_drivers = [("",None)]
         self._local_driver = True
+        self._grid_mode = "thread"
+        self._timeout = None
+        self._abort_grace = 1
+        self._driver_pool = None
+        # device id map to p_parallel.DeviceWorker
+        self._device_workers = {}
     
     def init_runner(self, parser, tracers, projinfo):
         ''' initial some instances for preparing to run test case
@@ -251,8 +691,7 @@ class Runner(object):
         fn, _ = driver_map
         reporter = self.tracers[fn]
         
-        parser = self.parser
-        parser.update_binded_variables(variables)
+        parser = self.parser.fork(variables)
         
         case_name = parser.eval_content_with_bind_actions(testcase_dict.get("name",u'rtsf'))
         reporter.start(self.proj_info["module"], case_name, testcase_dict.get("responsible",u"rock feng"), testcase_dict.get("tester",u"rock feng"))
@@ -265,6 +704,201 @@ class Runner(object):
         
         return reporter
     
+    def _run_case(self, testcase_dict, variables={}):
+        ''' run a case and collect what the tracers reported for it
+        @note:  should not override
+        @param testcase_dict:  yaml case
+        @param variables: dict type; the variables for the data-driven test
+        @return: dict type, e.g.
+            {
+                "name": "case name",
+                "key": "file name::case name::data row",    # see p_history.case_key
+                "status": "pass",    # pass, fail, error or timeout
+                "start_at": 1551755467.51,
+                "end_at": 1551755468.02,
+                "reports": [("", {"module_name": "xxx", "raw_case_name": "xxx", "status": "pass", ...})],
+                "error": None,       # traceback message if error
+                "exc_info": None,    # sys.exc_info() if error, only for the local process
+                "attempts": 2,       # only if retried, see _case_retries
+                "flaky": True        # only if retried, True if passed on retry
+            }
+        '''
+        retries = self._case_retries(testcase_dict)
+        attempts = []
+        record = self._run_attempt(testcase_dict, variables)
+        while record["status"] != "pass" and len(attempts) < retries:
+            attempts.append(self._retry_attempt(record, len(attempts) + 1, retries))
+            record = self._run_attempt(testcase_dict, variables)
+        return self._attempts_record(record, attempts)
+    
+    def _run_attempt(self, testcase_dict, variables={}):
+        ''' run a case once, see _run_case
+        @note:  should not override
+        '''
+        record = self._start_record(testcase_dict, variables)
+        self.parser.fixtures = self.parser.fixtures.new_case()
+        try:
+            timeout = self._case_timeout(testcase_dict)
+            if timeout:
+                self._run_with_watchdog(timeout, self._run_test, testcase_dict, variables)
+            else:
+                self._run_test(testcase_dict, variables)
+        except p_exception.CaseTimeoutError:
+            self._timeout_record(record, testcase_dict, variables)
+        except (Exception, p_exception.MyBaseError):
+            self._error_record(record)
+        self.parser.fixtures.case.teardown()
+        return self._stop_record(record)
+    
+    def _case_retries(self, testcase_dict):
+        ''' @return: times to re-run a case which is not passed, the `retries` key of the case takes priority over the one of the project '''
+        return int(testcase_dict.get("retries", self.proj_info.get("retries", 0)) or 0)
+    
+    def _retry_attempt(self, record, attempt, retries):
+        ''' trace the attempt which is not passed, and summarize it before the next one
+        @return: dict type, e.g. {"status": "fail", "start_at": 1551755467.51, "end_at": 1551755468.02, "error": None}
+        '''
+        msg = u"attempt {} of {} is {}, retry: {}".format(attempt, retries + 1, record["status"], record["name"])
+        logger.log_warning(msg)
+        for tracer in self.tracers.values():
+            if getattr(tracer, "meta_data", None):
+                tracer.retry(u"{}\n{}".format(msg, record["error"]) if record["error"] else msg)
+        return dict((name, record[name]) for name in ("status", "start_at", "end_at", "error"))
+    
+    def _attempts_record(self, record, attempts):
+        ''' mark the record which is retried, the case is flaky if it passed on retry '''
+        if not attempts:
+            return record
+        
+        flaky = record["status"] == "pass"
+        record.update({"attempts": len(attempts) + 1, "flaky": flaky, "start_at": attempts[0]["start_at"]})
+        for device_id, report in record["reports"]:
+            report.update({"attempts": record["attempts"], "flaky": flaky})
+            tracer = self.tracers.get(device_id)
+            if tracer is not None:
+                HtmlReporter.add_report_data(list_all = tracer.summary, **report)
+        if flaky:
+            logger.log_warning(u"Flaky case passed on attempt {}: {}".format(record["attempts"], record["name"]))
+        return record
+    
+    def _case_timeout(self, testcase_dict):
+        ''' @return: seconds of the `timeout` key of the case, or the default _timeout; None if no limit '''
+        timeout = testcase_dict.get("timeout", self._timeout)
+        return float(timeout) if timeout else None
+    
+    def _run_with_watchdog(self, timeout, func, *args):
+        ''' run func in a watched thread, raise CaseTimeoutError if it does not return in time.
+            the thread is aborted by an async exception, which only works when it runs python code;
+            a thread which blocks in a system call is left behind as a daemon after _abort_grace seconds, so the next case is not stalled,
+            and its writes to the tracers are dropped, so they do not go to the report of the next case.
+        '''
+        outcome = {}
+        def target():
+            try:
+                outcome["result"] = func(*args)
+            except BaseException:
+                outcome["exc_info"] = sys.exc_info()
+        
+        thread = threading.Thread(target = p_fixture.bound(target), name = "rtsf-case-watchdog")
+        thread.daemon = True
+        thread.start()
+        thread.join(timeout)
+        
+        if thread.is_alive():
+            _async_raise(thread, p_exception.CaseTimeoutError)
+            thread.join(self._abort_grace)
+            if thread.is_alive():
+                for tracer in self.tracers.values():
+                    tracer._switch_off(thread)
+            raise p_exception.CaseTimeoutError("Case timeout after {}s.".format(timeout))
+        
+        if "exc_info" in outcome:
+            raise outcome["exc_info"][1]
+        return outcome.get("result")
+    
+    def _timeout_record(self, record, testcase_dict, variables):
+        ''' should be called in the except block of CaseTimeoutError '''
+        self._error_record(record)
+        record["status"] = "timeout"
+        self._trace_timeout(testcase_dict, variables, u"{}: {}".format(sys.exc_info()[1], testcase_dict.get("name")))
+    
+    def _trace_timeout(self, testcase_dict, variables, err_msg):
+        ''' record the timeout in the tracers which have not reported the case yet '''
+        for tracer in self.tracers.values():
+            if tracer.case_reports:
+                continue
+            
+            if not tracer.is_running():
+                tracer.start(self.proj_info["module"], self._case_name(testcase_dict, variables), testcase_dict.get("responsible",u"rock feng"), testcase_dict.get("tester",u"rock feng"))
+            tracer.timeout(err_msg)
+            tracer.stop()
+    
+    def _trace_error(self, testcase_dict, variables, err_msg):
+        ''' record the error in all tracers, such as the worker process running the case exits unexpectedly '''
+        for tracer in self.tracers.values():
+            tracer.start(self.proj_info["module"], self._case_name(testcase_dict, variables), testcase_dict.get("responsible",u"rock feng"), testcase_dict.get("tester",u"rock feng"))
+            tracer.error(err_msg)
+            tracer.stop()
+    
+    def _trace_skip(self, testcase_dict, variables, reason):
+        ''' record the skipped case in all tracers, such as the dependency is not passed '''
+        for tracer in self.tracers.values():
+            tracer.start(self.proj_info["module"], self._case_name(testcase_dict, variables), testcase_dict.get("responsible",u"rock feng"), testcase_dict.get("tester",u"rock feng"))
+            tracer.skip(reason)
+            tracer.stop()
+    
+    def _case_name(self, testcase_dict, variables):
+        name = testcase_dict.get("name",u'rtsf')
+        try:
+            return self.parser.fork(variables).eval_content_with_bind_actions(name)
+        except (Exception, p_exception.MyBaseError):
+            return name
+    
+    def _start_record(self, testcase_dict, variables=None):
+        key = case_key(self.parser.file_path, testcase_dict.get("name"), variables)
+        for tracer in self.tracers.values():
+            tracer.case_key = key
+        
+        return {
+            "name": testcase_dict.get("name"),
+            "key": key,
+            "status": "pass",
+            "start_at": time.time(),
+            "error": None,
+            }
+    
+    def _error_record(self, record):
+        ''' should be called in the except block '''
+        record["status"] = "error"
+        record["error"] = traceback.format_exc()
+        record["exc_info"] = sys.exc_info()
+    
+    def _stop_record(self, record):
+        record["end_at"] = time.time()
+        record["reports"] = self._pop_reports()
+        if record["status"] == "pass" and [report for _, report in record["reports"] if report["status"].lower() != "pass"]:
+            record["status"] = "fail"
+        return record
+    
+    def _fork(self):
+        ''' copy the runner for one case which runs at the same time with others, e.g. AsyncRunner
+            the copy shares drivers and bound functions, but has its own variable scope and tracers, so the report is attributed to the case
+        '''
+        runner = copy.copy(self)
+        runner.parser = self.parser.fork()
+        runner.tracers = {device_id: Tracer(device_id = device_id, dir_name = os.path.dirname(tracer.result_path)) for device_id, tracer in self.tracers.items()}
+        return runner
+    
+    def _pop_reports(self):
+        ''' pop the report data which the tracers record for the running case
+        @return: list of (device_id, report)
+        '''
+        reports = []
+        for device_id, tracer in self.tracers.items():
+            reports.extend((device_id, report) for report in tracer.case_reports)
+            tracer.case_reports = []
+        return reports
+    
     def _run_test(self, testcase_dict, variables={}):
         ''' guide the running case
         @param testcase_dice:  yaml case
@@ -273,36 +907,136 @@ class Runner(object):
                                 default {} use to run case without data-driven
                                 {"username":"test1","password":"123456"}
         '''
+        func = partial(self._run_with_driver, partial(self.run_test, testcase_dict, variables))
         if self._local_driver:
-            self.run_test(testcase_dict, variables, self._default_drivers[0])
+            func(self._default_drivers[0])
+        elif self._grid_mode == "process":
+            self._run_grid_multiprocess(testcase_dict, variables, self._default_drivers)
         else:
             self._drivers = []
-            self._run_grid_multithread(partial(self.run_test, testcase_dict, variables), self._default_drivers)
+            self._run_grid_multithread(func, self._default_drivers)
+    
+    def _run_with_driver(self, func, driver_map):
+        ''' call func with driver_map, the driver is checked out from _driver_pool if any '''
+        if self._driver_pool is None:
+            return func(driver_map)
+        
+        device_id = driver_map[0]
+        driver = self._checkout_driver(device_id)
+        try:
+            return func((device_id, driver))
+        finally:
+            self._checkin_driver(device_id, driver)
+    
+    def _checkout_driver(self, device_id):
+        return self._driver_pool.checkout(device_id)
+    
+    def _checkin_driver(self, device_id, driver):
+        self._driver_pool.checkin(device_id, driver)
+        tracer = self.tracers.get(device_id)
+        if tracer is not None:
+            tracer.pool(device_id, self._driver_pool.stats(device_id))
+    
+    def _close_driver_pool(self):
+        if self._driver_pool is not None:
+            self._driver_pool.close()
+    
+    def _close(self):
+        ''' release the driver pool and the device workers once the run is finished
+        @note:  should not override
+        '''
+        self._close_driver_pool()
+        for worker in list(self._device_workers.values()):
+            worker.stop()
+        self._device_workers.clear()
+        self.parser.fixtures.suite.teardown()
             
-    def _run_grid_multiprocess(self, func, iterables):
+    def _run_grid_multiprocess(self, testcase_dict, variables, driver_maps):
         ''' running case with mutil process to support selenium grid-mode(multiple web) and appium grid-mode(multiple devices). 
-        @param func:  function object
-        @param iterables:  iterable objects
+            each driver runs in a long-lived worker process pinned to its device, which keeps the driver and tracer across cases;
+            only the case is sent to the worker, and only the reports of its tracer are sent back.
+        @param testcase_dict:  yaml case
+        @param variables: dict type; the variables for the data-driven test
+        @param driver_maps:  list of (device_id, driver), such as self._default_drivers
         '''
+        from rtsf.p_parallel import DeviceWorker
+        
         multiprocessing.freeze_support()
-        pool = multiprocessing.Pool()        
-        pool_tracers = pool.map(func, iterables)
-        pool.close()
-        pool.join()
+        workers = []
+        with DeviceWorker.create_lock:
+            for driver_map in driver_maps:
+                worker = self._device_workers.get(driver_map[0])
+                if worker is None or not worker.is_alive():
+                    worker = self._device_workers[driver_map[0]] = DeviceWorker(type(self), self.parser.file_path, self.proj_info, driver_map[0])
+                workers.append(worker)
         
-        # 传递给 pool.map的 实例对象，内存地址发生变化， 因此，这里在运行结束后，重新定义 self.tracers 
-        self.tracers = dict(zip(self._default_devices, pool_tracers))
+        errors, locked = [], []
+        pending = list(workers)
+        try:
+            for worker in workers:
+                worker.lock.acquire()
+                locked.append(worker)
+                worker.send((testcase_dict, variables, self.tracers[worker.device_id].case_key))
+            
+            for worker in workers:
+                try:
+                    outcome = worker.recv()
+                except (EOFError, IOError, OSError) as e:
+                    outcome = {"reports": [], "timings": [], "pools": {}, "error": u"{}".format(e)}
+                pending.remove(worker)
+                
+                tracer = self.tracers[worker.device_id]
+                for report in outcome["reports"]:
+                    HtmlReporter.add_report_data(list_all = tracer.summary, **report)
+                    tracer.case_reports.append(report)
+                tracer.timings.extend(outcome["timings"])
+                tracer.pools.update(outcome["pools"])
+                if outcome["error"]:
+                    errors.append(outcome["error"])
+        finally:
+            # the worker of an aborted case may still run it, it is replaced by a new one for the next case
+            for worker in pending:
+                self._device_workers.pop(worker.device_id, None)
+                worker.kill()
+            for worker in locked:
+                worker.lock.release()
+        
+        if errors:
+            raise p_exception.CaseExecutionError(errors[0])
     
     def _run_grid_multithread(self, func, iterables):
-        ''' running case with mutil process to support selenium grid-mode(multiple web) and appium grid-mode(multiple devices). 
-        @param func:  function object
-        @param iterables:  iterable objects
+        ''' running case with mutil thread to support selenium grid-mode(multiple web) and appium grid-mode(multiple devices). 
+            all drivers run at the same time in a thread pool sized to _default_drivers, so a case takes as long as the slowest device.
+        @param func:  function object, called with each driver map of iterables
+        @param iterables:  iterable objects, such as self._default_drivers
+        @return: list of (driver_map, result, exc_info) in the order of iterables; exc_info is None if no exception
         '''
+        driver_maps = list(iterables)
+        if not driver_maps:
+            return []
+        
+        def run_driver(driver_map):
+            start_at = time.time()
+            try:
+                outcome = (driver_map, func(driver_map), None)
+            except (Exception, p_exception.MyBaseError):
+                outcome = (driver_map, None, sys.exc_info())
+            
+            tracer = self.tracers.get(driver_map[0])
+            if tracer is not None:
+                tracer.timing(driver_map[0], time.time() - start_at)
+            return outcome
+        
+        with futures.ThreadPoolExecutor(max_workers = max(len(self._default_drivers), 1)) as pool:
+            outcomes = list(pool.map(p_fixture.bound(run_driver), driver_maps))
+        
+        errors = [outcome for outcome in outcomes if outcome[2]]
+        for driver_map, _, exc_info in errors:
+            tracer = self.tracers.get(driver_map[0])
+            if tracer is not None:
+                tracer.log_error(u"driver {} raise: {}".format(driver_map[0], exc_info[1]))
         
-        f = lambda x: threading.Thread(target = func,args = (x,))
-        threads = map(f, iterables)
-        for thread in threads:
-            thread.setDaemon(True)
-            thread.start()
-            thread.join()
+        if errors:
+            raise errors[0][2][1]
+        return outcomes
             
\ No newline at end of file
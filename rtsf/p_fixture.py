@@ -0,0 +1,257 @@
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.p_fixture
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:    lkf20031988@163.com
+    RCS:      rtsf.p_fixture,v 1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+
+======================================================================
+
+Scoped fixtures. an expensive setup, such as a login or seeding a database, runs once per scope at the first use,
+and its result is a variable of the cases, e.g. $token. the teardowns run in reverse order when the scope is finished.
+
+scopes:
+    project:    once per run, shared by all testsets; each worker process has its own if run with worker processes
+    worker:     once per worker of the executor, such as a worker process or a thread of p_dag.DagExecutor; the main process in serial mode.
+                the threads started for a case, such as the watchdog of timeout, share the scope of the worker running the case
+    suite:      once per testset
+    case:       once per case execution
+
+usage:
+    # preference.py, the parameters are resolved as variables or other fixtures
+    from rtsf.p_fixture import fixture
+
+    @fixture(scope = "project")
+    def token(username, password):
+        session = login(username, password)
+        yield session.token
+        session.logout()
+
+    # dependencies/fixture/*.yaml
+    - fixture:
+        name: app
+        scope: worker
+        setup: ${install_app(demo.apk)}
+        teardown: ${uninstall_app($app)}
+
+'''
+
+import os,inspect,threading,contextlib
+from rtsf.p_applog import logger
+from rtsf.p_common import FileUtils,ModuleUtils
+from rtsf import p_exception
+
+SCOPES = ("project", "worker", "suite", "case")
+
+# fixture name map to YamlFixture, which is loaded from dependencies/fixture
+definitions = {}
+
+def fixture(scope = "case"):
+    ''' decorator of a fixture function in preference.py, the function name is the variable name.
+        the function returns the value, or yields it and tears down after the yield
+    @param scope: project, worker, suite or case
+    '''
+    if scope not in SCOPES:
+        raise p_exception.ParamsError("Invalid fixture scope '{}', should be one of {}.".format(scope, ", ".join(SCOPES)))
+
+    def decorator(func):
+        func._rtsf_fixture = {"scope": scope}
+        return func
+    return decorator
+
+class FunctionFixture(object):
+    ''' a fixture function of preference.py '''
+
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.scope = func._rtsf_fixture["scope"]
+
+    def setup(self, parser):
+        ''' @return: (value, teardown function or None) '''
+        try:
+            arg_names = inspect.getfullargspec(self.func).args
+        except AttributeError:
+            arg_names = inspect.getargspec(self.func).args
+        args = [parser.get_bind_variable(arg_name) for arg_name in arg_names]
+
+        if not inspect.isgeneratorfunction(self.func):
+            return self.func(*args), None
+
+        generator = self.func(*args)
+        return next(generator), lambda: next(generator, None)
+
+class YamlFixture(object):
+    ''' a fixture of dependencies/fixture, the setup and teardown are evaluated as the content of cases '''
+
+    def __init__(self, fixture_dict):
+        self.name = fixture_dict["name"]
+        self.scope = fixture_dict.get("scope", "case")
+        self.setup_content = fixture_dict.get("setup")
+        self.teardown_content = fixture_dict.get("teardown")
+        if self.scope not in SCOPES:
+            raise p_exception.ParamsError("Invalid scope '{}' of fixture {}.".format(self.scope, self.name))
+
+    def setup(self, parser):
+        value = parser.eval_content_with_bind_actions(self.setup_content)
+        if not self.teardown_content:
+            return value, None
+        return value, lambda: parser.fork({self.name: value}).eval_content_with_bind_actions(self.teardown_content)
+
+def load_fixture_file(file_path):
+    ''' load the fixture definitions of a yaml file into `definitions` '''
+    items = FileUtils.load_file(file_path)
+    if not isinstance(items, list):
+        raise p_exception.FileFormatError("Fixture format error: {}".format(file_path))
+
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get("fixture"), dict) or "name" not in item["fixture"]:
+            raise p_exception.FileFormatError("Fixture format error: {}".format(file_path))
+
+        yaml_fixture = YamlFixture(item["fixture"])
+        # a worker process reloads the same definitions, see p_parallel
+        if yaml_fixture.name in definitions and vars(definitions[yaml_fixture.name]) != vars(yaml_fixture):
+            logger.log_warning("Fixture definition duplicated: {}".format(yaml_fixture.name))
+        definitions[yaml_fixture.name] = yaml_fixture
+
+class FixtureScope(object):
+    ''' the fixture values of one scope, which are torn down in reverse order of the setup '''
+
+    def __init__(self, name):
+        self.name = name
+        self._values = {}
+        self._teardowns = []
+        self._lock = threading.RLock()
+
+    def get(self, definition, parser):
+        with self._lock:
+            if definition.name not in self._values:
+                logger.log_debug(u"Setup {} fixture: {}".format(self.name, definition.name))
+                value, teardown = definition.setup(parser)
+                self._values[definition.name] = value
+                if teardown is not None:
+                    self._teardowns.append((definition.name, teardown))
+            return self._values[definition.name]
+
+    def __getstate__(self):
+        # each process has its own values, such as a worker process
+        return {"name": self.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["name"])
+
+    def teardown(self):
+        with self._lock:
+            teardowns, self._teardowns, self._values = self._teardowns, [], {}
+
+        for name, teardown in reversed(teardowns):
+            try:
+                teardown()
+            except (Exception, p_exception.MyBaseError) as e:
+                logger.log_error(u"Teardown {} fixture {} failed: {}".format(self.name, name, e))
+
+_project_scope = FixtureScope("project")
+# worker id map to FixtureScope
+_worker_scopes = {}
+_worker_lock = threading.Lock()
+_worker_local = threading.local()
+
+def current_worker():
+    ''' @return: id of the executor worker of this thread, which is bound by `worker`; the process if it is not bound '''
+    return getattr(_worker_local, "worker_id", None) or "process-{}".format(os.getpid())
+
+@contextlib.contextmanager
+def worker(worker_id):
+    ''' run the cases in the with block as the executor worker worker_id, e.g. a thread of p_dag.DagExecutor '''
+    previous = getattr(_worker_local, "worker_id", None)
+    _worker_local.worker_id = worker_id
+    try:
+        yield
+    finally:
+        _worker_local.worker_id = previous
+
+def bound(func):
+    ''' @return: func which runs as the worker of the calling thread, for the threads started for a case,
+        such as the watchdog of timeout and the drivers of grid mode
+    '''
+    worker_id = current_worker()
+    def run(*args, **kwargs):
+        with worker(worker_id):
+            return func(*args, **kwargs)
+    return run
+
+def _worker_scope():
+    worker_id = current_worker()
+    with _worker_lock:
+        if worker_id not in _worker_scopes:
+            _worker_scopes[worker_id] = FixtureScope("worker")
+        return _worker_scopes[worker_id]
+
+def teardown():
+    ''' tear down the worker and project fixtures, once the run or the worker process is finished '''
+    with _worker_lock:
+        scopes = list(_worker_scopes.values())
+        _worker_scopes.clear()
+    for scope in reversed(scopes):
+        scope.teardown()
+    _project_scope.teardown()
+
+class FixtureManager(object):
+    ''' find and resolve the fixtures of a testset, see TestCaseParser.get_bind_variable.
+        the suite scope belongs to the manager, the case scope is renewed for each case execution by new_case.
+    '''
+
+    def __init__(self, file_path = None):
+        self.file_path = file_path
+        self.suite = FixtureScope("suite")
+        self.case = FixtureScope("case")
+        self._functions = {}
+        # p_cache.CacheableKeyword map to the cache of the case scope keyword, renewed with the case scope
+        self.keyword_caches = {}
+
+    def new_case(self):
+        ''' @return: a manager sharing the suite scope, with a new case scope '''
+        manager = FixtureManager(self.file_path)
+        manager.suite, manager._functions = self.suite, self._functions
+        return manager
+
+    def __getstate__(self):
+        # the cached results of keywords stay in this process
+        state = dict(self.__dict__)
+        state["keyword_caches"] = {}
+        return state
+
+    def find(self, name):
+        ''' @return: the fixture definition of name, None if it is not a fixture '''
+        if name in definitions:
+            return definitions[name]
+
+        if name not in self._functions:
+            self._functions[name] = None
+            if self.file_path is not None:
+                try:
+                    func = ModuleUtils.search_conf_item(self.file_path, "function", name)
+                except p_exception.FunctionNotFound:
+                    func = None
+                if getattr(func, "_rtsf_fixture", None):
+                    self._functions[name] = FunctionFixture(func)
+        return self._functions[name]
+
+    def get(self, definition, parser):
+        return self.scope(definition.scope).get(definition, parser)
+
+    def scope(self, name):
+        if name == "project":
+            return _project_scope
+        elif name == "worker":
+            return _worker_scope()
+        elif name == "suite":
+            return self.suite
+        return self.case
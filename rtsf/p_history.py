@@ -0,0 +1,161 @@
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.p_history
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:    lkf20031988@163.com
+    RCS:      rtsf.p_history,v 1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+
+======================================================================
+
+Local history of case executions, such as durations and status, used to schedule the cases.
+
+'''
+
+import os,io,json,time,hashlib
+from rtsf.p_applog import logger
+from rtsf import p_compat
+
+
+def case_key(file_path, case_name, variables = None, base_dir = None):
+    ''' the key of a case execution, which is file name + case name + data row.
+        the file is relative to base_dir, the directory where the key is stored; by default the directory of the testset,
+        where results.json and rtsf_history.json are, so the key is the file name and does not depend on the working directory.
+        the data row is the digest of the data-driven variables, so it keeps the same if the csv is fetched by Random.
+        e.g.
+            case_key("/cases/login.yaml", "/baidu_test_$username", {"username": "test1"})  # => "login.yaml::/baidu_test_$username::73942fac"
+            case_key("/cases/login.yaml", "/baidu_test")  # => "login.yaml::/baidu_test::0"
+            case_key("/cases/login.yaml", "/baidu_test", base_dir = "/")  # => "cases/login.yaml::/baidu_test::0"
+    '''
+    data_row = "0"
+    if variables:
+        content = json.dumps(variables, sort_keys = True, ensure_ascii = False, default = p_compat.str)
+        data_row = hashlib.md5(content.encode("utf-8")).hexdigest()[:8]
+    return u"{}::{}::{}".format(_relative_path(file_path, base_dir), case_name, data_row)
+
+def _relative_path(file_path, base_dir = None):
+    if not file_path:
+        return ""
+    
+    path = os.path.abspath(file_path)
+    try:
+        path = os.path.relpath(path, os.path.abspath(base_dir) if base_dir else os.path.dirname(path))
+    except ValueError:
+        # windows, the file is on another drive than base_dir
+        pass
+    return path.replace(os.sep, "/")
+
+class CaseHistory(object):
+    ''' history of case executions.
+        each testset directory has its own store file `rtsf_history.json`, which is next to the report directory.
+    usage:
+        history = CaseHistory()
+        history.update(file_path, key, record)
+        history.get_duration(file_path, key)
+        history.save()
+    '''
+    file_name = "rtsf_history.json"
+    max_durations = 5
+    # a case is chronically flaky if it passed on retry in 20% of its runs, after 5 runs at least
+    flaky_threshold = 0.2
+    flaky_min_runs = 5
+
+    def __init__(self, store_file = None):
+        '''
+        @param store_file: one history file for all testsets instead of the store file of each directory,
+            such as a snapshot pinned for the shards of CI nodes, see p_scheduler.partition
+        '''
+        self._stores = {}
+        self._store_file = store_file
+
+    def _store(self, file_path):
+        if self._store_file:
+            store_file = os.path.abspath(self._store_file)
+        else:
+            store_file = os.path.join(os.path.dirname(os.path.abspath(file_path)), self.file_name)
+        store = self._stores.get(store_file)
+        if store is None:
+            store = self._stores[store_file] = self._load(store_file)
+        return store
+
+    def _load(self, store_file):
+        store = {"file_path": store_file, "cases": {}, "changed": False}
+        if not os.path.isfile(store_file):
+            return store
+
+        try:
+            with io.open(store_file, encoding = 'utf-8') as f:
+                store["cases"] = json.load(f).get("cases", {})
+        except (ValueError, IOError, OSError) as e:
+            logger.log_warning(u"Ignore broken history file {}: {}".format(store_file, e))
+        return store
+
+    def _key(self, file_path, key):
+        ''' the key of a case in its store. the file name of the key is relative to the directory of store_file if specified,
+            so the testsets of the same file name in different directories are told apart in it, see p_history.case_key
+        '''
+        if not self._store_file:
+            return key
+        return u"{}::{}".format(_relative_path(file_path, os.path.dirname(os.path.abspath(self._store_file))), key.split("::", 1)[-1])
+
+    def get(self, file_path, key):
+        ''' @return: dict type or None. e.g. {"durations": [1.2, 1.3], "runs": 2, "fails": 0, "flaky": 1, "last_status": "pass", "last_run": 1551755467.51} '''
+        return self._store(file_path)["cases"].get(self._key(file_path, key))
+
+    def get_duration(self, file_path, key):
+        ''' @return: mean of the recent durations of the case, None if no history '''
+        case = self.get(file_path, key)
+        if not case or not case.get("durations"):
+            return None
+        return sum(case["durations"]) / float(len(case["durations"]))
+
+    def estimate_duration(self, file_path, key):
+        ''' @return: recent duration of the case; mean duration of the store if the case has no history; 0 if the store is empty '''
+        duration = self.get_duration(file_path, key)
+        if duration is not None:
+            return duration
+
+        durations = [sum(case["durations"]) / float(len(case["durations"])) for case in self._store(file_path)["cases"].values() if case.get("durations")]
+        return sum(durations) / float(len(durations)) if durations else 0.0
+
+    def is_flaky(self, file_path, key):
+        ''' @return: True if the case is chronically flaky, see flaky_threshold '''
+        case = self.get(file_path, key)
+        if not case or case["runs"] < self.flaky_min_runs:
+            return False
+        return case.get("flaky", 0) >= self.flaky_threshold * case["runs"]
+
+    def has_durations(self, file_path):
+        return bool([case for case in self._store(file_path)["cases"].values() if case.get("durations")])
+
+    def update(self, file_path, key, record):
+        ''' record the execution of a case
+        @param record: the record of Runner._run_case
+        '''
+        store = self._store(file_path)
+        case = store["cases"].setdefault(self._key(file_path, key), {"durations": [], "runs": 0, "fails": 0})
+        case["durations"] = (case["durations"] + [round(record["end_at"] - record["start_at"], 3)])[-self.max_durations:]
+        case["runs"] += 1
+        if record["status"] != "pass":
+            case["fails"] += 1
+        if record.get("flaky"):
+            case["flaky"] = case.get("flaky", 0) + 1
+        case["last_status"] = record["status"]
+        case["last_run"] = record.get("end_at", time.time())
+        store["changed"] = True
+
+    def save(self):
+        for store in self._stores.values():
+            if not store["changed"]:
+                continue
+
+            content = json.dumps({"cases": store["cases"]}, indent = 2, sort_keys = True, ensure_ascii = False)
+            with io.open(store["file_path"], 'w', encoding = 'utf-8') as f:
+                f.write(p_compat.str(content))
+            store["changed"] = False
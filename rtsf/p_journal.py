@@ -0,0 +1,92 @@
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.p_journal
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:    lkf20031988@163.com
+    RCS:      rtsf.p_journal,v 1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+
+======================================================================
+
+Append-only journal of the finished cases, one json per line, to resume a run after a crash.
+
+'''
+
+import os,io,json
+from rtsf.p_applog import logger
+from rtsf import p_compat
+
+
+class Journal(object):
+    ''' each finished case is appended and synced to disk at once, so that a crash or reboot loses no more than the running cases.
+    usage:
+        journal = Journal("run.jsonl")
+        journal.append(entry)
+        journal.close()
+
+        Journal.load("run.jsonl")
+    '''
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        dir_name = os.path.dirname(os.path.abspath(file_path))
+        if not os.path.isdir(dir_name):
+            os.makedirs(dir_name)
+        self._file = io.open(file_path, "a", encoding = "utf-8")
+        if self._file.tell() and not self._ends_with_newline(file_path):
+            # the last line was broken by a crash, do not append to it
+            self._file.write(u"\n")
+
+    def append(self, entry):
+        self._file.write(p_compat.str(json.dumps(entry, ensure_ascii = False, default = p_compat.str)) + u"\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    @staticmethod
+    def _ends_with_newline(file_path):
+        with open(file_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    @staticmethod
+    def entry(test, record):
+        ''' @return: dict type, the journal entry of a finished case
+        @param test: p_executer.TestCase
+        @param record: the record of Runner._run_case
+        '''
+        return {
+            "suite": os.path.abspath(test.file_path),
+            "key": test.key,
+            "name": record["name"],
+            "status": record["status"],
+            "start_at": record["start_at"],
+            "end_at": record["end_at"],
+            "reports": record["reports"],
+            }
+
+    @staticmethod
+    def load(file_path):
+        ''' @return: list of entries; a broken line, such as the last one written when the host is down, is skipped '''
+        entries = []
+        if not os.path.isfile(file_path):
+            return entries
+
+        with io.open(file_path, encoding = "utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    logger.log_warning(u"Skip broken line {} of journal {}".format(line_no, file_path))
+        return entries
@@ -0,0 +1,332 @@
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.p_load
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:    lkf20031988@163.com
+    RCS:      rtsf.p_load,v 1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+
+======================================================================
+
+Load and soak mode. run a case with concurrent users or at a target rate for a while, and summarize the latency.
+
+'''
+
+import math,time,threading
+from rtsf.p_applog import logger
+from rtsf.p_common import FileSystemUtils
+from rtsf.p_executer import Executor
+from rtsf import p_exception,p_fixture
+
+
+class LatencyHistogram(object):
+    ''' log-bucketed histogram of latency, the relative error of percentiles is less than 1%.
+        histograms of threads, processes or nodes are merged by adding the buckets.
+    usage:
+        histogram = LatencyHistogram()
+        histogram.record(0.25)
+        histogram.merge(other_histogram)
+        histogram.percentile(95)
+    '''
+    base = 1.02
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        seconds = max(float(seconds), 0.0)
+        index = self._index(seconds)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        return self
+
+    def percentile(self, percent):
+        ''' @return: seconds of the percentile, None if no record '''
+        if not self.count:
+            return None
+        if percent >= 100:
+            return self.max
+
+        rank = max(int(math.ceil(self.count * percent / 100.0)), 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self):
+        ''' @return: dict type, e.g. {"count": 100, "min": 0.1, "mean": 0.2, "max": 0.5, "p50": 0.2, "p95": 0.4, "p99": 0.5} '''
+        result = {"count": self.count, "min": self.min, "mean": self.mean, "max": self.max}
+        for percent in (50, 95, 99):
+            result["p{}".format(percent)] = self.percentile(percent)
+        return dict((name, round(value, 4) if isinstance(value, float) else value) for name, value in result.items())
+
+    def to_dict(self):
+        return {"buckets": [[index, count] for index, count in self.buckets.items()], "count": self.count, "total": self.total, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.buckets = dict((int(index), count) for index, count in data["buckets"])
+        histogram.count, histogram.total, histogram.min, histogram.max = data["count"], data["total"], data["min"], data["max"]
+        return histogram
+
+    def _index(self, seconds):
+        # microsecond resolution, index 0 holds everything below 1us
+        micros = seconds * 1e6
+        return int(math.floor(math.log(micros, self.base))) + 1 if micros >= 1 else 0
+
+    def _value(self, index):
+        # the middle of the bucket
+        return 0.0 if index == 0 else self.base ** (index - 0.5) / 1e6
+
+class LoadSettings(object):
+    ''' settings of the load mode
+        - concurrency:  number of users which run the case at the same time, default is 1
+        - rate:         target iterations per second of all users, default is None, each user runs the case back to back
+        - ramp_up:      seconds to start all users, or to reach the target rate, default is 0
+        - duration:     seconds of the load, including ramp_up, default is 10
+        - warmup:       number of the first iterations excluded from the statistics, default is 0
+    '''
+    defaults = {"concurrency": 1, "rate": None, "ramp_up": 0, "duration": 10, "warmup": 0}
+
+    def __init__(self, **kwargs):
+        unknown = set(kwargs) - set(self.defaults)
+        if unknown:
+            raise p_exception.ParamsError("Unknown load settings: {}".format(", ".join(sorted(unknown))))
+
+        settings = dict(self.defaults, **kwargs)
+        self.concurrency = max(int(settings["concurrency"]), 1)
+        self.rate = float(settings["rate"]) if settings["rate"] else None
+        self.ramp_up = float(settings["ramp_up"] or 0)
+        self.duration = float(settings["duration"])
+        self.warmup = int(settings["warmup"] or 0)
+
+    def start_delay(self, user):
+        ''' @return: seconds after the start of the load when the user starts '''
+        if self.rate:
+            return 0.0
+        return self.ramp_up * user / self.concurrency
+
+    def schedule(self, iteration):
+        ''' @return: seconds after the start of the load when the iteration should start in rate mode.
+            the rate grows linearly during ramp_up, so iterations are paced by the integral of the rate.
+        '''
+        ramp_iterations = self.rate * self.ramp_up / 2.0
+        if iteration < ramp_iterations:
+            return math.sqrt(2.0 * self.ramp_up * iteration / self.rate)
+        return self.ramp_up + (iteration - ramp_iterations) / self.rate
+
+class LoadExecutor(Executor):
+    ''' run each case under load instead of once. the settings of TestRunner are applied to all cases, the `load` key of a yaml case takes priority.
+        each user runs the case with a fork of the suite runner, so the tracers of the suite only get one report per case, with the latency summary.
+        the case log of an iteration is only written if it is one of the first failures of its user, and the case log of the case gets the latency summary;
+        the latency of the load cases of a module is merged into the summary of the report.
+        the case fails if any iteration is not passed. the users of a case are no more than the limits of its `resources`.
+    usage:
+        TestRunner(load = {"concurrency": 20, "ramp_up": 10, "duration": 60, "warmup": 5}).run("test.yaml")
+
+        yaml case:
+            - case:
+                name: login
+                load:
+                    rate: 50
+                    concurrency: 10
+                    duration: 300
+                steps: ...
+    '''
+
+    def __init__(self, settings = None):
+        '''
+        @param settings: dict type, see LoadSettings; None to run the cases without `load` key once
+        '''
+        super(LoadExecutor, self).__init__()
+        self._settings = settings
+        # module name map to the merged histogram of its load cases
+        self._histograms = {}
+
+    def run(self, task_suite, result):
+        for suite, test in self._iter_tasks(task_suite):
+            if result.shouldStop:
+                break
+
+            load = test.testcase_dict.get("load")
+            if load is None and self._settings is None:
+                test(result)
+                if getattr(test, "record", None) is not None:
+                    self._on_record(suite, test, test.record, result)
+                continue
+
+            result.startTest(test)
+            record = self._run_load(suite, test, LoadSettings(**dict(self._settings or {}, **(load or {}))))
+            self._add_record(suite, test, record, result)
+
+    def _run_load(self, suite, test, settings):
+        test_runner = suite.test_runner
+        capacity = self.resources.capacity(test.testcase_dict)
+        if capacity is not None and capacity < settings.concurrency:
+            # the users are the executions of the case at the same time, see p_scheduler.ResourcePool
+            logger.log_warning(u"Load of {}: {} users are limited to {} by its resources.".format(test.testcase_dict.get("name"), settings.concurrency, capacity))
+            settings.concurrency = capacity
+        lock = threading.Lock()
+        counter = {"iterations": 0}
+        stats = []
+        start_at = time.time()
+        stop_at = start_at + settings.duration
+
+        def next_iteration():
+            with lock:
+                iteration = counter["iterations"]
+                counter["iterations"] += 1
+            return iteration
+
+        def run_user(user):
+            runner = test_runner._fork()
+            for tracer in runner.tracers.values():
+                tracer.hold_case_log()
+            loop = None
+            if hasattr(runner, "_run_attempt_async"):
+                # p_async.AsyncRunner, each user awaits its iterations on its own event loop
+                import asyncio
+                loop = asyncio.new_event_loop()
+            try:
+                # each user is a worker of the worker scope fixtures
+                with p_fixture.worker(threading.current_thread().name):
+                    run_iterations(user, runner, loop)
+            finally:
+                if loop is not None:
+                    loop.close()
+
+        def run_attempt(runner, loop):
+            if loop is None:
+                return runner._run_attempt(test.testcase_dict, test.variables)
+            return loop.run_until_complete(runner._run_attempt_async(test.testcase_dict, test.variables))
+
+        def run_iterations(user, runner, loop):
+            histogram, user_stats = LatencyHistogram(), {"passed": 0, "failed": 0, "errors": []}
+            stats.append((histogram, user_stats))
+
+            time.sleep(settings.start_delay(user))
+            while time.time() < stop_at:
+                iteration = next_iteration()
+                if settings.rate:
+                    scheduled_at = start_at + settings.schedule(iteration)
+                    if scheduled_at >= stop_at:
+                        break
+                    time.sleep(max(scheduled_at - time.time(), 0))
+
+                # each iteration is counted, a failed one is not retried
+                record = run_attempt(runner, loop)
+                logged = False
+                if iteration >= settings.warmup:
+                    histogram.record(record["end_at"] - record["start_at"])
+                    if record["status"] == "pass":
+                        user_stats["passed"] += 1
+                    else:
+                        user_stats["failed"] += 1
+                        if len(user_stats["errors"]) < 3:
+                            user_stats["errors"].append(record["error"] or record["status"])
+                            logged = True
+
+                for tracer in runner.tracers.values():
+                    tracer.release_case_log(write = logged)
+
+        users = [threading.Thread(target = run_user, args = (user,), name = "rtsf-load-user-{}".format(user)) for user in range(settings.concurrency)]
+        for user in users:
+            user.daemon = True
+            user.start()
+        for user in users:
+            user.join()
+
+        histogram = LatencyHistogram()
+        passed, failed, errors = 0, 0, []
+        for user_histogram, user_stats in stats:
+            histogram.merge(user_histogram)
+            passed, failed = passed + user_stats["passed"], failed + user_stats["failed"]
+            errors.extend(user_stats["errors"])
+        record = self._load_record(test_runner, test, histogram, passed, failed, errors, start_at)
+        self._trace_load(test_runner, test, record)
+        self._merge_latency(test_runner, histogram)
+        return record
+
+    def _trace_load(self, test_runner, test, record):
+        ''' write the latency summary and the errors to the case log of the case, the report of the fork is dropped '''
+        runner = test_runner._fork()
+        case_name = runner._case_name(test.testcase_dict, test.variables)
+        for tracer in runner.tracers.values():
+            tracer.case_key = record["key"]
+            tracer.start(runner.proj_info["module"], case_name, test.testcase_dict.get("responsible", u"rock feng"), test.testcase_dict.get("tester", u"rock feng"))
+            tracer.section(u"Load")
+            tracer.normal(u"latency: {}".format(record["load"]))
+            if record["error"]:
+                tracer.normal(record["error"])
+            tracer.stop()
+
+    def _merge_latency(self, test_runner, histogram):
+        ''' merge the histogram of a case into the one of its module, whose summary is shown in the report, see HtmlReporter.generate_html_report '''
+        module_name = test_runner.proj_info["module"]
+        merged = self._histograms.setdefault(module_name, LatencyHistogram()).merge(histogram)
+        for tracer in test_runner.tracers.values():
+            tracer.latency[module_name] = merged.summary()
+
+    def _load_record(self, test_runner, test, histogram, passed, failed, errors, start_at):
+        end_at = time.time()
+        latency = histogram.summary()
+        latency.update({"passed": passed, "failed": failed, "rps": round(histogram.count / (end_at - start_at), 2)})
+        logger.log_info(u"Load of {}: {}".format(test.testcase_dict.get("name"), latency))
+
+        record = test_runner._start_record(test.testcase_dict, test.variables)
+        record.update({
+            "start_at": start_at,
+            "status": "fail" if failed else "pass",
+            "error": u"{} of {} iterations failed:\n{}".format(failed, passed + failed, "\n".join(errors)) if failed else None,
+            "load": latency,
+            })
+        if not histogram.count:
+            record.update({"status": "error", "error": u"No iteration is finished in the duration."})
+
+        record["end_at"] = end_at
+        record["reports"] = []
+        case_name = test_runner._case_name(test.testcase_dict, test.variables)
+        for device_id in test_runner.tracers:
+            record["reports"].append((device_id, {
+                "module_name": test_runner.proj_info["module"],
+                "raw_case_name": case_name,
+                "case_name": FileSystemUtils.get_legal_filename(case_name),
+                "case_key": record["key"],
+                "status": "pass" if record["status"] == "pass" else "Fail",
+                "resp_tester": test.testcase_dict.get("responsible", u"rock feng"),
+                "tester": test.testcase_dict.get("tester", u"rock feng"),
+                "start_at": start_at,
+                "end_at": end_at,
+                "latency": latency,
+                }))
+        return record
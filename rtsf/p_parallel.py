@@ -0,0 +1,316 @@
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.p_parallel
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:    lkf20031988@163.com
+    RCS:      rtsf.p_parallel,v 1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+
+======================================================================
+
+Run the cases of test suites in a pool of worker processes; and the long-lived device workers of the grid mode.
+
+'''
+
+import sys,time,threading,traceback
+import multiprocessing
+from functools import partial
+from rtsf.p_applog import logger
+from rtsf.p_executer import Executor, init_test_runner
+from rtsf.p_testcase import YamlCaseLoader
+from rtsf import p_fixture,p_cache,p_exception
+
+try:
+    from multiprocessing.connection import wait as wait_connections
+except ImportError:
+    def wait_connections(conns, timeout=None):
+        ''' python2 has no multiprocessing.connection.wait, poll the connections instead '''
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            ready = [conn for conn in conns if conn.poll()]
+            if ready or (deadline is not None and time.time() > deadline):
+                return ready
+            time.sleep(0.01)
+
+
+def _worker_main(runner_cls, conn):
+    ''' the loop of a worker process. receive task, run it and send back the record of the case
+    @note: each worker initializes its own Runner, TestCaseParser and Tracer for each testset.
+    @param runner_cls: Runner or subclass of Runner
+    @param conn: the child side of a multiprocessing.Pipe
+    '''
+    runners = {}
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+
+        if task is None:
+            break
+
+        file_path, project, testcase_dict, variables, timeout = task
+        test_runner = runners.get(file_path)
+        if test_runner is None:
+            # a spawned process does not inherit the api, suite and fixture definitions
+            YamlCaseLoader.load_dependencies(file_path)
+            test_runner = runners[file_path] = init_test_runner(runner_cls, file_path, project)
+            test_runner._timeout = timeout
+
+        record = test_runner._run_case(testcase_dict, variables)
+        record.pop("exc_info", None)
+        # the counts of this worker so far, see ProcessExecutor.caches
+        record["caches"] = p_cache.stats()
+        conn.send(record)
+
+    for test_runner in runners.values():
+        test_runner._close()
+    p_fixture.teardown()
+
+class ProcessWorker(object):
+    ''' a long-lived worker process which talks with the main process by pipe '''
+
+    def __init__(self, runner_cls):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target = _worker_main, args = (runner_cls, child_conn))
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+
+    def send(self, task):
+        self.conn.send(task)
+
+    def recv(self):
+        return self.conn.recv()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (IOError, OSError):
+            pass
+
+        self.process.join(5)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(5)
+        self.conn.close()
+
+def _device_worker_main(runner_cls, file_path, project, device_id, conn):
+    ''' the loop of a device worker. receive (testcase_dict, variables, case_key), run the case with its driver and send back
+        the reports, timings and pool statistics of its tracer, the driver and the tracer are kept across cases.
+    @param runner_cls: Runner or subclass of Runner, the runner and its drivers are built in this process
+    @param file_path: file path of the testset
+    @param project: proj_info of the runner
+    @param device_id: device of this worker, one of the `_default_drivers` of runner_cls
+    @param conn: the child side of a multiprocessing.Pipe
+    '''
+    YamlCaseLoader.load_dependencies(file_path)
+    runner = init_test_runner(runner_cls, file_path, project)
+    driver_map = [driver_map for driver_map in runner._default_drivers if driver_map[0] == device_id][0]
+    tracer = runner.tracers[device_id]
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+
+        if task is None:
+            break
+
+        testcase_dict, variables, case_key = task
+        # the reports are merged in the main process, nothing of the last case is kept here
+        tracer.case_key, tracer.case_reports, tracer.timings, tracer.summary, tracer.meta_data = case_key, [], [], [], {}
+        start_at, error = time.time(), None
+        try:
+            runner._run_with_driver(partial(runner.run_test, testcase_dict, variables), driver_map)
+        except (Exception, p_exception.MyBaseError):
+            error = traceback.format_exc()
+            tracer.log_error(u"driver {} raise: {}".format(device_id, sys.exc_info()[1]))
+        tracer.timing(device_id, time.time() - start_at)
+        conn.send({"reports": tracer.case_reports, "timings": tracer.timings, "pools": tracer.pools, "error": error})
+
+    runner._close_driver_pool()
+
+class DeviceWorker(object):
+    ''' a long-lived worker process pinned to one device of the grid mode, see Runner._run_grid_multiprocess.
+        only the case and the compact result are sent over the pipe, the runner and its driver are built in the process.
+    '''
+    # guard the creation of device workers, the runners forked for the cases share them
+    create_lock = threading.Lock()
+
+    def __init__(self, runner_cls, file_path, project, device_id):
+        '''
+        @param runner_cls: Runner or subclass of Runner
+        @param file_path: file path of the testset
+        @param project: proj_info of the runner
+        @param device_id: device id of a driver map of runner_cls
+        '''
+        self.device_id = device_id
+        self.lock = threading.Lock()
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target = _device_worker_main, args = (runner_cls, file_path, project, device_id, child_conn), name = "rtsf-device-{}".format(device_id))
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+
+    def send(self, task):
+        self.conn.send(task)
+
+    def recv(self, interval = 0.1):
+        ''' wait for the result in short polls, so that the thread can still be aborted by the watchdog of the case timeout '''
+        while not self.conn.poll(interval):
+            if not self.process.is_alive():
+                raise EOFError("Device worker {} exited unexpectedly.".format(self.device_id))
+        return self.conn.recv()
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (IOError, OSError):
+            pass
+
+        self.process.join(5)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(5)
+        self.conn.close()
+
+class ProcessExecutor(Executor):
+    ''' run the cases of each TestSuite across a pool of worker processes.
+        the records of cases are merged into the tracers of the main process, so that the html report is the same as serial mode.
+    usage:
+        task_suite.executor = ProcessExecutor(Runner, 4)
+        unittest.TextTestRunner().run(task_suite)
+    @note: a case with timeout is watched in the worker first; if the worker does not answer in `kill_grace` seconds more,
+        e.g. it blocks in a driver call, the worker is killed and replaced. the worker of a timeout case is replaced as well,
+        so that a stuck driver does not leak into the next case.
+    '''
+    kill_grace = 5
+
+    def __init__(self, runner_cls, workers):
+        '''
+        @param runner_cls: Runner or subclass of Runner
+        @param workers: int type, number of worker processes
+        '''
+        super(ProcessExecutor, self).__init__()
+        self._runner_cls = runner_cls
+        self._workers = max(int(workers), 1)
+        self.history = None
+        # the keyword cache counts of all workers, see p_cache.stats
+        self.caches = {}
+
+    def run(self, task_suite, result):
+        multiprocessing.freeze_support()
+
+        tasks = self._iter_tasks(task_suite)
+        workers = [ProcessWorker(self._runner_cls) for _ in range(self._workers)]
+        running, deferred = {}, []
+        worker_caches = {}
+
+        try:
+            while True:
+                for worker in workers:
+                    if worker in running or result.shouldStop:
+                        continue
+
+                    task = self._next_task(tasks, deferred)
+                    if task is None:
+                        break
+
+                    suite, test = task
+                    timeout = suite.test_runner._case_timeout(test.testcase_dict)
+                    deadline = time.time() + timeout + self.kill_grace if timeout else None
+                    result.startTest(test)
+                    worker.send((suite.file_path, suite.test_runner.proj_info, test.testcase_dict, test.variables, suite.test_runner._timeout))
+                    running[worker] = (suite, test, deadline)
+
+                if not running:
+                    break
+
+                deadlines = [deadline for _, _, deadline in running.values() if deadline is not None]
+                ready = wait_connections([worker.conn for worker in running], max(min(deadlines) - time.time(), 0) if deadlines else None)
+                for worker in list(running):
+                    suite, test, deadline = running[worker]
+                    if worker.conn in ready:
+                        try:
+                            record = worker.recv()
+                        except (EOFError, IOError, OSError):
+                            record = self._crashed_record(suite, test)
+                            self._replace_worker(workers, worker)
+                        else:
+                            if record["status"] == "timeout":
+                                self._replace_worker(workers, worker)
+                    elif deadline is not None and time.time() >= deadline:
+                        record = self._killed_record(suite, test)
+                        self._replace_worker(workers, worker)
+                    else:
+                        continue
+
+                    running.pop(worker)
+                    worker_caches[worker] = record.pop("caches", worker_caches.get(worker, {}))
+                    self.resources.release(test.testcase_dict)
+                    self._add_record(suite, test, record, result)
+        finally:
+            for worker in workers:
+                worker.stop()
+            self.caches = p_cache.merge_stats(*worker_caches.values())
+
+    def _iter_tasks(self, task_suite):
+        ''' order the cases longest-first (LPT) by the history of durations, so no slow case is left at the end of the run.
+            the cases keep the file order if there is no history, or the suites are lazy:
+            sorting would build up all the cases of a lazy suite before the first one starts.
+        '''
+        tasks = super(ProcessExecutor, self)._iter_tasks(task_suite)
+        history = self.history
+        if history is None or not [suite for suite in task_suite.tasks if history.has_durations(suite.file_path)]:
+            return tasks
+        
+        if [suite for suite in task_suite.tasks if suite.lazy]:
+            logger.log_info("Longest-first order skipped for the lazy suites, their cases are streamed in the file order.")
+            return tasks
+        
+        # sorted is stable, the cases with the same duration keep the file order
+        return iter(sorted(tasks, key = lambda task: -history.estimate_duration(task[1].file_path, task[1].key)))
+
+    def _replace_worker(self, workers, worker):
+        workers[workers.index(worker)] = ProcessWorker(self._runner_cls)
+        worker.kill()
+
+    def _killed_record(self, suite, test):
+        ''' the record of a case whose worker is killed after timeout, the timeout is traced in the tracers of the suite '''
+        test_runner = suite.test_runner
+        timeout = test_runner._case_timeout(test.testcase_dict)
+        err_msg = u"Worker process killed, case timeout after {}s: {}".format(timeout, test.testcase_dict.get("name"))
+        logger.log_error(err_msg)
+
+        record = test_runner._start_record(test.testcase_dict, test.variables)
+        record.update({"status": "timeout", "start_at": record["start_at"] - timeout - self.kill_grace, "error": err_msg})
+        test_runner._trace_timeout(test.testcase_dict, test.variables, err_msg)
+        return test_runner._stop_record(record)
+
+    def _crashed_record(self, suite, test):
+        ''' the record of a case whose worker exits unexpectedly, the error is traced in the tracers of the suite '''
+        test_runner = suite.test_runner
+        err_msg = u"Worker process exited unexpectedly while running: {}".format(test.testcase_dict.get("name"))
+        logger.log_error(err_msg)
+
+        record = test_runner._start_record(test.testcase_dict, test.variables)
+        record.update({"status": "error", "error": err_msg})
+        test_runner._trace_error(test.testcase_dict, test.variables, err_msg)
+        return test_runner._stop_record(record)
+
@@ -20,7 +20,7 @@ UI and Web Http automation frame for python.
 '''
 
 
-import os,time,codecs,io
+import os,time,codecs,io,json
 from jinja2 import Template
 from rtsf import p_compat
 from rtsf.p_applog import logger
@@ -28,6 +28,8 @@ from rtsf.p_common import FileSystemUtils,DateTimeUtils
 from rtsf import __about__
 
 class HtmlReporter(object):
+    results_file_name = "results.json"
+    
     def __init__(self,device_id="", dir_name = ''):       
         
         result_name = "report" if not device_id else "report_{}".format(device_id)
@@ -36,7 +38,17 @@ class HtmlReporter(object):
         self.result_path = os.path.join(result_path, result_name)
         self.case_log_path = os.path.join(self.result_path,"caselogs")
 #         self.screen_shot_path = os.path.join(self.result_path,"screenshots")  
-        self.summary = []      
+        self.summary = []
+        self.case_reports = []
+        self.case_key = None
+        # {"seconds": 12.3, "cases": ["case name", ...]}, see p_dag.DagExecutor
+        self.critical_path = None
+        # keyword name map to the cache counts, e.g. {"sign": {"hits": 95, "misses": 5}}, see p_cache
+        self.caches = {}
+        # module name map to the latency summary of its load cases, see p_load.LoadExecutor
+        self.latency = {}
+        # lines of the case log kept in memory instead of written, see hold_case_log
+        self.held_logs = None
                     
     def start_test(self,module_name,case_name, resp_tester, tester):
         '''
@@ -54,18 +66,23 @@ class HtmlReporter(object):
             "tester":tester,
             "start_at": time.time(),
             "end_at":"",            
+            "case_key": self.case_key,
             }
         
         FileSystemUtils.mkdirs(self.case_log_path)
 #         FileSystemUtils.mkdirs(self.screen_shot_path)
         
-        log_file = self.__get_log_file()
-        with codecs.open(log_file, "a", "utf-8") as f:
-            f.write(u"\n**************  %s [%s]  ***************\n" %(u"Case Log From Rock4 Test Service Framework",self.meta_data['case_name']))
+        self.__write_log(u"\n**************  %s [%s]  ***************\n" %(u"Case Log From Rock4 Test Service Framework",self.meta_data['case_name']))
+    
+    def is_running(self):
+        ''' @return: True if a case is started but not stopped '''
+        meta_data = getattr(self, "meta_data", None)
+        return bool(meta_data) and not meta_data["end_at"]
     
     def stop_test(self):
         self.meta_data["end_at"] = time.time()
         HtmlReporter.add_report_data(list_all = self.summary, **self.meta_data)
+        self.case_reports.append(dict(self.meta_data))
             
     def step_info(self, info, msg):
         
@@ -78,15 +95,41 @@ class HtmlReporter(object):
             unicode_msg = msg
         
         info = info.upper()
-        log_file = self.__get_log_file()
-        with codecs.open(log_file, "a", "utf-8") as f:
-            if info == "SECTION":      
-                f.write(u"\n%-20s\t%-10s\t%s\n" %(DateTimeUtils.get_stamp_datetime_coherent(),info, unicode_msg))
-            elif info in ["NORMAL","STEP","PASS"]:
-                f.write(u"%-20s\t%-10s\t%s\n" %(DateTimeUtils.get_stamp_datetime_coherent(),info,unicode_msg))
-            elif info in ["ERROR","FAIL"]:
-                f.write(u"%-20s\t%-10s\t%s\n" %(DateTimeUtils.get_stamp_datetime_coherent(),info,unicode_msg))
-                self.meta_data["status"] = "Fail"
+        if info == "SECTION":      
+            self.__write_log(u"\n%-20s\t%-10s\t%s\n" %(DateTimeUtils.get_stamp_datetime_coherent(),info, unicode_msg))
+        elif info in ["NORMAL","STEP","PASS"]:
+            self.__write_log(u"%-20s\t%-10s\t%s\n" %(DateTimeUtils.get_stamp_datetime_coherent(),info,unicode_msg))
+        elif info in ["ERROR","FAIL"]:
+            self.__write_log(u"%-20s\t%-10s\t%s\n" %(DateTimeUtils.get_stamp_datetime_coherent(),info,unicode_msg))
+            self.meta_data["status"] = "Fail"
+        elif info == "TIMEOUT":
+            self.__write_log(u"%-20s\t%-10s\t%s\n" %(DateTimeUtils.get_stamp_datetime_coherent(),info,unicode_msg))
+            self.meta_data["status"] = "Timeout"
+        elif info == "RETRY":
+            self.__write_log(u"%-20s\t%-10s\t%s\n" %(DateTimeUtils.get_stamp_datetime_coherent(),info,unicode_msg))
+        elif info == "SKIP":
+            self.__write_log(u"%-20s\t%-10s\t%s\n" %(DateTimeUtils.get_stamp_datetime_coherent(),info,unicode_msg))
+            self.meta_data["status"] = "Skip"
+    
+    def hold_case_log(self):
+        ''' keep the case log in memory from now on, it is written or dropped by release_case_log after each case.
+            e.g. the iterations of the load mode, only the failed ones are written, see p_load.LoadExecutor
+        '''
+        self.held_logs = []
+    
+    def release_case_log(self, write = True):
+        ''' write or drop the held case log of the last case, and keep holding the case log of the next one '''
+        held_logs, self.held_logs = self.held_logs, []
+        if held_logs and write:
+            with codecs.open(self.__get_log_file(), "a", "utf-8") as f:
+                f.write(u"".join(held_logs))
+    
+    def __write_log(self, text):
+        if self.held_logs is not None:
+            self.held_logs.append(text)
+            return
+        with codecs.open(self.__get_log_file(), "a", "utf-8") as f:
+            f.write(text)
        
     
     def __get_log_file(self):
@@ -101,6 +144,9 @@ class HtmlReporter(object):
         all_summary = HtmlReporter.get_summary(self.summary, proj_name = proj_name)
         
         for summary in all_summary:
+            summary["critical_path"] = self.critical_path
+            summary["caches"] = self.caches
+            summary["latency"] = self.latency.get(summary["module_name"])
             html_report = os.path.join(self.result_path, u"[{}]{}_{}.html".format(FileSystemUtils.get_legal_filename(summary["project_name"]),
                                                                                     FileSystemUtils.get_legal_filename(summary["module_name"]), 
                                                                                 DateTimeUtils.get_stamp_datetime_coherent(),
@@ -115,6 +161,48 @@ class HtmlReporter(object):
                 summary = {}
         return html_results
     
+    def dump_results(self):
+        ''' save the status of the cases to results.json in the report directory, which is machine-readable.
+            the results of the last run are kept for the cases not run this time, such as with only_failed or shard
+            e.g.
+                {"cases": {"login.yaml::/baidu_test::0": {"module_name": "xxx", "raw_case_name": "/baidu_test", "status": "pass", "end_at": 1551755468.02}}}
+        @return: results file path or None if no case to save
+        '''
+        cases = {}
+        for module in self.summary:
+            for case in module["TestCases"]:
+                if not case.get("case_key"):
+                    continue
+                cases[case["case_key"]] = {"module_name": module["Name"], "raw_case_name": case["raw_case_name"], "status": case["status"], "end_at": case["end_at"]}
+        
+        if not cases:
+            return None
+        
+        results = HtmlReporter.load_results(self.result_path) or {}
+        results.update(cases)
+        
+        FileSystemUtils.mkdirs(self.result_path)
+        results_file = os.path.join(self.result_path, self.results_file_name)
+        content = json.dumps({"cases": results}, indent = 2, sort_keys = True, ensure_ascii = False)
+        with io.open(results_file, 'w', encoding = 'utf-8') as f:
+            f.write(p_compat.str(content))
+        return results_file
+    
+    @staticmethod
+    def load_results(result_path):
+        ''' @return: dict type, case key map to the result saved by dump_results; None if no results file
+        '''
+        results_file = os.path.join(result_path, HtmlReporter.results_file_name)
+        if not os.path.isfile(results_file):
+            return None
+        
+        try:
+            with io.open(results_file, encoding = 'utf-8') as f:
+                return json.load(f).get("cases", {})
+        except (ValueError, IOError, OSError) as e:
+            logger.log_warning(u"Ignore broken results file {}: {}".format(results_file, e))
+            return None
+    
     @staticmethod
     def render_html(report_file_path, summary):        
         html_report_template = os.path.join(os.path.abspath(os.path.dirname(__file__)),"templates","default_report_template.html")
@@ -154,6 +242,8 @@ class HtmlReporter(object):
                         "total_case_num" : len(module["TestCases"]),
                         "pass_cases_num" : 0,
                         "fail_cases_num" : 0,
+                        "skip_cases_num" : 0,
+                        "flaky_cases_num" : 0,
                         "details" : []
                     }
                          
@@ -164,17 +254,24 @@ class HtmlReporter(object):
                 if case["status"].lower() == "pass":
                     summary["pass_cases_num"] += 1
                     case_detail["c_style"] = "tr_pass"
+                elif case["status"].lower() == "skip":
+                    summary["skip_cases_num"] += 1
+                    case_detail["c_style"] = "tr_skip"
                 else:
                     summary["fail_cases_num"] += 1
                     case_detail["c_style"] = "tr_fail"
                 
+                if case.get("flaky"):
+                    summary["flaky_cases_num"] += 1
+                
                 case_detail.update(case)
             
                 summary["details"].append(case_detail)                       
              
             try:
-                st = module["TestCases"][0].get("start_at")
-                et = module["TestCases"][-1].get("end_at")
+                # cases may be finished out of order if run in parallel
+                st = min(case.get("start_at") for case in module["TestCases"])
+                et = max(case.get("end_at") for case in module["TestCases"])
                 
                 summary["start_time"] = time.strftime("%Y-%m-%d %H:%M:%S",time.localtime(st))    
                 summary["end_time"] = time.strftime("%Y-%m-%d %H:%M:%S",time.localtime(et))        
@@ -194,7 +291,9 @@ class HtmlReporter(object):
             
     @staticmethod
     def add_report_data(list_all=[], module_name="TestModule", **kwargs):
-        ''' add report data to a list
+        ''' add report data to a list. the data of a case is merged into the row with the same raw_case_name and case_key:
+            the data rows of a data-driven case have different case keys, so each of them has its own row even if the case names are the same,
+            and results.json keeps the status of each data row, see dump_results; the data without case_key is merged by raw_case_name as before
             @param list_all: a list which save the report data
             @param module_name: test set name or test module name
             @param kwargs: such as
@@ -204,10 +303,15 @@ class HtmlReporter(object):
                 tester:      tester who execute the test
                 start_at:    tester run this case at time 
                 end_at:      tester stop this case at time
+                case_key:    file name + case name + data row, see p_history.case_key
+                latency:     latency summary of the load mode, see p_load.LatencyHistogram.summary
+                attempts:    times the case is run if retried
+                flaky:       True if the case passed on retry
         '''
         start_at = kwargs.get("start_at")        
         case_name = kwargs.get("case_name","TestCase")
         raw_case_name = kwargs.get("raw_case_name","TestCase")
+        case_key = kwargs.get("case_key")
                 
         exec_date_time = time.localtime(start_at)
         execdate = time.strftime("%Y-%m-%d",exec_date_time) 
@@ -223,14 +327,20 @@ class HtmlReporter(object):
                 'exec_time': exectime,
                 'start_at': start_at,
                 'end_at': kwargs.get("end_at"),
+                'case_key': case_key,
             }
+        if kwargs.get("latency"):
+            _case_report["latency"] = kwargs["latency"]
+        if kwargs.get("attempts"):
+            _case_report["attempts"] = kwargs["attempts"]
+            _case_report["flaky"] = kwargs.get("flaky", False)
                 
         for module in list_all:
             if module_name != module["Name"]:
                 continue
             
             for case in module["TestCases"]:
-                if raw_case_name == case["raw_case_name"]:
+                if raw_case_name == case["raw_case_name"] and case_key == case.get("case_key"):
                     case.update(_case_report)
                     return list_all
             
@@ -0,0 +1,324 @@
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.p_scheduler
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:    lkf20031988@163.com
+    RCS:      rtsf.p_scheduler,v 1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+
+======================================================================
+
+Select and partition the cases of a task suite before the run, such as the shards of CI nodes or a time budget;
+resolve the `depends_on` of cases; and limit the cases which share a resource at the same time.
+
+'''
+
+import os,re,hashlib
+from rtsf.p_history import case_key
+from rtsf import p_exception
+
+
+def parse_shard(shard):
+    ''' @param shard: "i/n" string or (i, n) tuple, i is 1-based. e.g. "2/4" is the second shard of 4
+        @return: (i, n)
+    '''
+    if isinstance(shard, (list, tuple)) and len(shard) == 2:
+        index, count = shard
+    else:
+        matched = re.match(r"^\s*(\d+)\s*/\s*(\d+)\s*$", str(shard))
+        if not matched:
+            raise p_exception.ParamsError("Invalid shard '{}', should be like '1/4'.".format(shard))
+        index, count = matched.groups()
+
+    index, count = int(index), int(count)
+    if count < 1 or not 1 <= index <= count:
+        raise p_exception.ParamsError("Invalid shard '{}', should be 1 <= i <= n.".format(shard))
+    return index, count
+
+def _stable_hash(key):
+    # hash() of python3 is salted per process, md5 is the same on every node
+    return int(hashlib.md5(key.encode("utf-8")).hexdigest(), 16)
+
+def partition(tests, count, history = None):
+    ''' partition the cases into `count` shards, the cases with the same file path and key are always in the same shard.
+        - if history has durations of the cases, the longest case goes to the least loaded shard first (LPT), so the shards take about the same time
+        - otherwise the shard of a case is the stable hash of its key
+    @param tests: list of p_executer.TestCase
+    @param history: p_history.CaseHistory or None. it must be the same on every node, such as a pinned snapshot;
+        the history next to the testsets is updated by each node's own run, the nodes would partition differently
+    @return: list of `count` sets of (file path, case key)
+    '''
+    nodes = set((test.file_path, test.key) for test in tests)
+
+    shards = [set() for _ in range(count)]
+    file_paths = set(file_path for file_path, _ in nodes)
+    if history is None or not [file_path for file_path in file_paths if history.has_durations(file_path)]:
+        for node in nodes:
+            # the key has the file name only, the file path may be absolute and differ on each node
+            shards[_stable_hash(node[1]) % count].add(node)
+        return shards
+
+    loads = [0.0] * count
+    # the key breaks the ties, so the order does not depend on the order of loading files
+    for duration, _, node in sorted((-history.estimate_duration(file_path, key), key, (file_path, key)) for file_path, key in nodes):
+        index = loads.index(min(loads))
+        shards[index].add(node)
+        loads[index] -= duration
+    return shards
+
+def select_shard(task_suite, shard, history = None):
+    ''' keep the cases of the shard in each suite of task_suite
+    @param task_suite: p_executer.TaskSuite
+    @param shard: "i/n" string or (i, n) tuple, see parse_shard
+    @param history: p_history.CaseHistory or None, the same on every node, see partition
+    @return: set of (file path, case key) of the shard
+    '''
+    index, count = parse_shard(shard)
+    tests = [test for suite in task_suite.tasks for test in suite]
+    nodes = partition(tests, count, history)[index - 1]
+    for suite in task_suite.tasks:
+        suite.select(lambda test: (test.file_path, test.key) in nodes)
+    return nodes
+
+def select_quarantine(task_suite, history, quarantine):
+    ''' keep the cases of task_suite by the flaky history, see p_history.CaseHistory.is_flaky
+    @param quarantine: "exclude" to keep the cases which are not chronically flaky;
+        "only" to keep the chronically flaky ones, such as a separate low priority run
+    @return: set of (file path, case key) of chronically flaky cases
+    '''
+    if quarantine not in ("exclude", "only"):
+        raise p_exception.ParamsError("Invalid quarantine '{}', should be 'exclude' or 'only'.".format(quarantine))
+
+    nodes = set((suite.file_path, test.key) for suite in task_suite.tasks for test in suite if history.is_flaky(test.file_path, test.key))
+    for suite in task_suite.tasks:
+        if quarantine == "exclude":
+            suite.select(lambda test, suite = suite: (suite.file_path, test.key) not in nodes)
+        else:
+            suite.select(lambda test, suite = suite: (suite.file_path, test.key) in nodes)
+    return nodes
+
+def budget_priority(history, test):
+    ''' @return: tuple type, the lower the earlier in a budget run, see select_budget '''
+    case = history.get(test.file_path, test.key)
+    if not case:
+        # a new case, as valuable as a changed one
+        return (1, 0, 0.0)
+
+    failed = case.get("last_status", "pass") != "pass"
+    changed = bool(test.file_path) and os.path.isfile(test.file_path) and os.path.getmtime(test.file_path) > case.get("last_run", 0)
+    return (0 if failed else 1, 0 if changed else 1, -case.get("fails", 0) / float(case.get("runs") or 1))
+
+def select_budget(task_suite, budget_seconds, history, workers = 1):
+    ''' keep the most valuable cases of task_suite which fit the time budget by the history of durations, and run them by priority:
+            1. the cases which were not passed in the last run
+            2. the new cases, and the cases whose file is changed since their last run
+            3. the higher failure rate
+            4. the shorter duration, so that more cases fit the budget
+        a case is selected together with the cases it depends on, or not at all.
+    @param budget_seconds: the wall time of the run, e.g. 600
+    @param history: p_history.CaseHistory
+    @param workers: int type, number of cases running at the same time, which share the budget
+    @return: (selected, skipped). selected is the number of the cases to run, including the repeated `times`;
+        skipped is the list of (suite, test, reason) of the cases out of the budget
+    '''
+    try:
+        budget = float(budget_seconds)
+    except (TypeError, ValueError):
+        budget = 0
+    if budget <= 0:
+        raise p_exception.ParamsError("Invalid budget_seconds '{}', should be a positive number.".format(budget_seconds))
+
+    # each case once, the repeated `times` of a case are counted in its duration
+    entries, nodes = [], {}
+    for suite in task_suite.tasks:
+        for test in suite:
+            node = (suite.file_path, test.key)
+            if node in nodes:
+                nodes[node]["duration"] += history.estimate_duration(test.file_path, test.key)
+                nodes[node]["times"] += 1
+                continue
+            nodes[node] = {"suite": suite, "test": test, "node": node, "index": len(entries), "duration": history.estimate_duration(test.file_path, test.key), "times": 1}
+            entries.append(nodes[node])
+
+    capacity, used, rank = budget * max(int(workers), 1), 0.0, {}
+    for entry in sorted(entries, key = lambda entry: budget_priority(history, entry["test"]) + (entry["duration"], entry["index"])):
+        if entry["node"] in rank:
+            continue
+
+        group = [member for member in _with_dependencies(entry, nodes) if member["node"] not in rank]
+        cost = sum(member["duration"] for member in group)
+        if used + cost <= capacity:
+            used += cost
+            for member in group:
+                rank[member["node"]] = len(rank)
+
+    first = {}
+    for (file_path, _), index in rank.items():
+        first[file_path] = min(first.get(file_path, index), index)
+    for suite in task_suite.tasks:
+        suite.select(lambda test, suite = suite: (suite.file_path, test.key) in rank)
+        suite.order(lambda test, suite = suite: rank[(suite.file_path, test.key)])
+    task_suite.tasks.sort(key = lambda suite: first.get(suite.file_path, len(rank)))
+
+    reason = u"out of the time budget of {}s, estimated {}s"
+    selected = sum(entry["times"] for entry in entries if entry["node"] in rank)
+    return selected, [(entry["suite"], entry["test"], reason.format(budget_seconds, round(entry["duration"], 3))) for entry in entries if entry["node"] not in rank]
+
+def _with_dependencies(entry, nodes):
+    ''' @return: list of the entry and the entries it depends on in the same data row, the dependencies first '''
+    group = []
+
+    def visit(entry):
+        if [member for member in group if member is entry]:
+            return
+        test = entry["test"]
+        for name in entry["suite"].dependencies.get(test.testcase_dict["name"], []):
+            dependency = nodes.get((entry["suite"].file_path, case_key(test.file_path, name, test.variables)))
+            if dependency is not None:
+                visit(dependency)
+        group.append(entry)
+
+    visit(entry)
+    return group
+
+def build_dependencies(testcases):
+    ''' the `depends_on` of the cases of a testset, checked when the testset is loaded
+    @param testcases: list of case dict, `depends_on` is a case name or a list of case names of the same testset
+    @return: dict type, case name map to the list of case names it depends on; empty if no case has depends_on
+    '''
+    names = set(testcase["name"] for testcase in testcases)
+    dependencies = {}
+    for testcase in testcases:
+        depends_on = testcase.get("depends_on") or []
+        if not isinstance(depends_on, (list, tuple)):
+            depends_on = [depends_on]
+
+        for name in depends_on:
+            if name not in names:
+                raise p_exception.ParamsError("Case '{}' depends on an unknown case '{}'.".format(testcase["name"], name))
+        if depends_on:
+            dependencies.setdefault(testcase["name"], [])
+            dependencies[testcase["name"]].extend(name for name in depends_on if name not in dependencies[testcase["name"]])
+
+    cycle = find_cycle(dependencies)
+    if cycle:
+        raise p_exception.ParamsError("Circular depends_on: {}".format(" -> ".join(cycle)))
+    return dependencies
+
+def find_cycle(dependencies):
+    ''' @param dependencies: dict type, node map to the nodes it depends on
+        @return: list of nodes of a cycle, the first one is repeated at the end, e.g. ["a", "b", "a"]; None if no cycle
+    '''
+    visiting, visited = [], set()
+
+    def visit(node):
+        if node in visited:
+            return None
+        if node in visiting:
+            return visiting[visiting.index(node):] + [node]
+
+        visiting.append(node)
+        for dependency in dependencies.get(node, []):
+            cycle = visit(dependency)
+            if cycle:
+                return cycle
+        visiting.pop()
+        visited.add(node)
+        return None
+
+    for node in sorted(dependencies):
+        cycle = visit(node)
+        if cycle:
+            return cycle
+    return None
+
+def critical_path(durations, dependencies):
+    ''' the longest chain of dependent nodes, which bounds the wall time however many workers there are
+    @param durations: dict type, node map to seconds, the nodes not in it are ignored
+    @param dependencies: dict type, node map to the nodes it depends on
+    @return: (seconds, [node, ...]) from the first node to the last one
+    '''
+    finish, previous = {}, {}
+
+    def visit(node):
+        if node not in finish:
+            longest, longest_node = 0.0, None
+            for dependency in dependencies.get(node, []):
+                if dependency in durations and visit(dependency) > longest:
+                    longest, longest_node = finish[dependency], dependency
+            finish[node], previous[node] = longest + durations[node], longest_node
+        return finish[node]
+
+    for node in durations:
+        visit(node)
+    if not finish:
+        return 0.0, []
+
+    node = max(sorted(finish), key = lambda node: finish[node])
+    seconds, path = finish[node], []
+    while node is not None:
+        path.insert(0, node)
+        node = previous[node]
+    return seconds, path
+
+
+def case_resources(testcase_dict):
+    ''' @return: list of the resource names of `resources` of a case, e.g. ["db", "payment_sandbox"] '''
+    resources = testcase_dict.get("resources") or []
+    if not isinstance(resources, (list, tuple)):
+        resources = [resources]
+    names = []
+    [names.append(str(resource)) for resource in resources if str(resource) not in names]
+    return names
+
+class ResourcePool(object):
+    ''' the concurrency limits of the resources shared by cases, such as a fragile backend.
+        a case declares `resources: [db, payment_sandbox]`, it takes one unit of each resource while it is running;
+        a resource without limit is not limited.
+    usage:
+        pool = ResourcePool({"db": 2})
+        if pool.available(testcase_dict):
+            pool.acquire(testcase_dict)
+            ...
+            pool.release(testcase_dict)
+    @note: not thread safe, it is used by the scheduling loop of the executors
+    '''
+
+    def __init__(self, limits = None):
+        '''
+        @param limits: dict type, resource name map to the max number of cases using it at the same time, e.g. {"db": 2}
+        '''
+        self.limits = {}
+        for resource, limit in (limits or {}).items():
+            try:
+                limit = int(limit)
+            except (TypeError, ValueError):
+                limit = 0
+            if limit < 1:
+                raise p_exception.ParamsError("Invalid limit of resource '{}': {}, should be a positive integer.".format(resource, limits[resource]))
+            self.limits[str(resource)] = limit
+        self.in_use = dict((resource, 0) for resource in self.limits)
+
+    def available(self, testcase_dict):
+        return not [resource for resource in case_resources(testcase_dict) if resource in self.limits and self.in_use[resource] >= self.limits[resource]]
+
+    def acquire(self, testcase_dict):
+        for resource in case_resources(testcase_dict):
+            if resource in self.limits:
+                self.in_use[resource] += 1
+
+    def release(self, testcase_dict):
+        for resource in case_resources(testcase_dict):
+            if resource in self.limits and self.in_use[resource] > 0:
+                self.in_use[resource] -= 1
+
+    def capacity(self, testcase_dict):
+        ''' @return: max number of executions of the case at the same time, such as the users of p_load; None if not limited '''
+        limits = [self.limits[resource] for resource in case_resources(testcase_dict) if resource in self.limits]
+        return min(limits) if limits else None
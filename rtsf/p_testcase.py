@@ -19,16 +19,26 @@ UI and Web Http automation frame for python.
 
 '''
 
-import os,re,random,ast
+import os,re,random,ast,copy
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
 from rtsf.p_applog import logger
 from rtsf import p_exception,p_compat
 from rtsf.p_common import FileSystemUtils,CommonUtils,ModuleUtils,FileUtils
-from rtsf.p_compat import numeric_types,builtin_str
+from rtsf.p_compat import numeric_types
+from rtsf.p_fixture import FixtureManager,load_fixture_file
 
 
 variable_regexp = r"\$([\w_]+)"
 function_regexp = r"\$\{([\w_]+\([\$\w\.\-_ =,]*\))\}"
 function_regexp_compile = re.compile(r"^([\w_]+)\(([\$\w\.\-_ =,]*)\)$")
+template_regexp_compile = re.compile("{}|{}".format(function_regexp, variable_regexp))
+
+# string map to the compiled nodes, see compile_template
+_template_cache = {}
+template_cache_size = 10000
 
 def extract_variables(content):
     """ extract all variable names from content, which is in format $variable
@@ -116,6 +126,113 @@ def parse_function(content):
 
     return function_meta
 
+def compile_template(content):
+    """ tokenize a string into the nodes of literal text, $variable and ${func()}, only once for each distinct string
+    @param (str) content
+    @return (tuple) nodes, each node is one of
+        ("text", literal)
+        ("variable", variable name)
+        ("function", function content, function meta of parse_function)
+
+    e.g.
+    print(compile_template("abc")); # => (('text', 'abc'),)
+    print(compile_template("/api/$uid?_t=${get_timestamp()}")); 
+    # => (('text', '/api/'), ('variable', 'uid'), ('text', '?_t='), ('function', 'get_timestamp()', {'func_name': 'get_timestamp', 'args': [], 'kwargs': {}}))
+    @note: the nodes are shared by all callers, do not modify them
+    """
+    nodes = _template_cache.get(content)
+    if nodes is not None:
+        return nodes
+
+    nodes, position = [], 0
+    for matched in template_regexp_compile.finditer(content):
+        if matched.start() > position:
+            nodes.append(("text", content[position:matched.start()]))
+
+        if matched.group(1) is not None:
+            nodes.append(("function", matched.group(1), parse_function(matched.group(1))))
+        else:
+            nodes.append(("variable", matched.group(2)))
+        position = matched.end()
+
+    if position < len(content):
+        nodes.append(("text", content[position:]))
+
+    nodes = tuple(nodes)
+    if len(_template_cache) >= template_cache_size:
+        # the strings built at run time would grow it without bound
+        _template_cache.clear()
+    _template_cache[content] = nodes
+    return nodes
+
+def substitute_template(content, get_variable=None, get_function=None):
+    """ substitute the variables and functions of a string in a single pass over the nodes of compile_template.
+        each variable is matched by its whole name, so $user never touches $username whatever the order of the variables.
+    @param (str) content
+    @param get_variable: function of a variable name, returns the value; None to keep the variables as they are
+    @param get_function: function of a function meta of parse_function, returns the value; 
+        None to keep the functions, but the variables in their args are substituted
+    @return: the value itself if content is one variable or one function, otherwise the string joined by the values
+
+    e.g.
+    print(substitute_template("$user/$username", {"user": "u", "username": "name"}.get)); # => "u/name"
+    print(substitute_template("${sign($uid)}", {"uid": 1000}.get)); # => "${sign(1000)}"
+    """
+    values = []
+    for node in compile_template(content):
+        if node[0] == "text":
+            values.append(node[1])
+        elif node[0] == "variable":
+            values.append("$" + node[1] if get_variable is None else get_variable(node[1]))
+        elif get_function is not None:
+            values.append(get_function(node[2]))
+        elif get_variable is not None:
+            values.append(u"${{{}}}".format(substitute_template(node[1], get_variable)))
+        else:
+            values.append("${" + node[1] + "}")
+
+    if len(values) == 1:
+        return values[0]
+    return u"".join(p_compat.str(value) for value in values)
+
+def mark_static(content, plans):
+    """ mark each dict and list of content as static or dynamic once it is loaded, see TestCaseParser.eval_content_with_bind_actions.
+        it is static if no key or value in it, at any depth, is to be evaluated, such as a large request body without $.
+    @param content: any data structure of a case
+    @param plans: dict type, id of a dict or list map to (the dict or list, static or not), such as TestCaseParser.static_plans.
+        the dict or list is kept, so that its id is not reused by another object while the plans are alive
+    @return (bool) True if content is static
+
+    e.g.
+    print(mark_static({"body": {"a": [1, 2]}}, {})); # => True
+    print(mark_static({"body": {"a": [1, 2]}, "url": "/api/$uid"}, {})); # => False, but its "body" is static
+    @note: a marked dict or list is evaluated to a shallow copy of itself, so the keys of the returned one may be updated or popped by a case;
+        the nested dicts and lists are shared by all executions of the testset, they should be treated as read-only
+    """
+    if isinstance(content, p_compat.basestring):
+        # the strings are stripped in evaluation
+        return "$" not in content and content == content.strip()
+
+    if isinstance(content, (list, tuple)):
+        # mark all children, not only the ones before the first dynamic one
+        static = all([mark_static(item, plans) for item in content])
+    elif isinstance(content, dict):
+        static = all([mark_static(key, plans) and mark_static(value, plans) for key, value in content.items()])
+    else:
+        return True
+
+    if isinstance(content, tuple):
+        # a tuple is evaluated to a list
+        return False
+
+    plans[id(content)] = (content, static)
+    return static
+
+def is_static(content, plans):
+    """ @return (bool) True if content is a dict or list marked as static in plans by mark_static """
+    plan = plans.get(id(content))
+    return plan is not None and plan[0] is content and plan[1]
+
 def substitute_variables_with_mapping(content, mapping):
     """ substitute variables in content with mapping
     e.g.
@@ -134,6 +251,7 @@ def substitute_variables_with_mapping(content, mapping):
                 'headers': {'token': '$token'}
             }
         }
+    @note: the keys of mapping are $variables, which are substituted in a single pass, see substitute_template
     """
     if isinstance(content, bool):
         return content
@@ -160,22 +278,13 @@ def substitute_variables_with_mapping(content, mapping):
         return substituted_data
 
     # content is in string format here
-    logger.log_debug(u"Will substitute: {} with {}".format(content, mapping))
-    for var, value in mapping.items():        
-        logger.log_debug(u"\t: {} - {}".format(content, {var:value}))
-        if content == var:
-            # content is a variable
-            content = value
-        else:
-            if not isinstance(value, str):
-                value = builtin_str(value)
-            
-            if isinstance(content, builtin_str):
-                content = content.replace(var, value)
+    if not isinstance(content, p_compat.basestring) or "$" not in content:
+        return content
 
-    return content
+    logger.log_debug(u"Will substitute: {} with {}".format(content, mapping))
+    return substitute_template(content, lambda name: mapping.get("$" + name, "$" + name))
 
-def parse_project_data(data, testset_path=None):
+def parse_project_data(data, testset_path=None, lazy=False):
     """ parse project data and generate cartesian product
     @param data: list type            
             e.g.
@@ -184,7 +293,8 @@ def parse_project_data(data, testset_path=None):
                     {'csv': 'devices.csv', 'by': 'Random'}
                 ]
     @param testset_path: testset file path, used for locating csv file
-    @return cartesian product in list
+    @param lazy: generate the cartesian product one by one if True
+    @return cartesian product in list, or in generator if lazy
     """
     testcase_parser = TestCaseParser(file_path=testset_path)
     
@@ -193,9 +303,68 @@ def parse_project_data(data, testset_path=None):
         if isinstance(da, dict) and da.get("csv"):
             csv_list_of_dict_data = testcase_parser.get_csv_data(da.get('csv'), fetch_method = da.get("by",'Sequential'))
             parsed_parameters_list.append(csv_list_of_dict_data)
-            
+    
+    if lazy:
+        return CommonUtils.iter_cartesian_product(*parsed_parameters_list) if parsed_parameters_list else iter([])
     return CommonUtils.gen_cartesian_product(*parsed_parameters_list)
 
+class VariableScope(MutableMapping):
+    """ layered variables of one execution, the first layer is searched first.
+        the layers below are shared and never changed, a variable set in the scope is written to its own top layer (copy-on-write),
+        so creating a scope for each case costs nothing but a small dict.
+    usage:
+        project = VariableScope({"host": "127.0.0.1"})
+        scope = project.new_child({"username": "test1"})
+        scope["token"] = "xxx"    # project is not changed
+        scope["host"]             # => "127.0.0.1"
+    """
+    
+    def __init__(self, *layers):
+        """
+        @param layers: dict or VariableScope, from the top to the bottom. None is skipped
+        """
+        self._local = {}
+        self._layers = [layer for layer in layers if layer is not None]
+    
+    def new_child(self, *layers):
+        """ @return: a new scope with layers above this scope """
+        return VariableScope(*(layers + (self,)))
+    
+    def __getitem__(self, key):
+        if key in self._local:
+            return self._local[key]
+        for layer in self._layers:
+            if key in layer:
+                return layer[key]
+        raise KeyError(key)
+    
+    def __setitem__(self, key, value):
+        self._local[key] = value
+    
+    def __delitem__(self, key):
+        # only the variables of its own layer can be deleted
+        del self._local[key]
+    
+    def __contains__(self, key):
+        return key in self._local or any(key in layer for layer in self._layers)
+    
+    def __iter__(self):
+        return iter(self.to_dict())
+    
+    def __len__(self):
+        return len(self.to_dict())
+    
+    def to_dict(self):
+        """ @return: dict type, the visible variables """
+        result = {}
+        for layer in reversed(self._layers):
+            result.update(layer)
+        result.update(self._local)
+        return result
+    
+    def __repr__(self):
+        return "VariableScope({!r})".format(self.to_dict())
+
 class TestCaseParser(object):
 #     def __init__(self, action_class_name, preference_action_file):        
 #         self._functions, self._variables = {}, {}
@@ -206,17 +375,42 @@ class TestCaseParser(object):
     
     def __init__(self, variables={}, functions={}, file_path=None):
         self._functions, self._variables = {}, {}
+        self._parent_scope = None
         self.update_binded_variables(variables)
         self.bind_functions(functions)
         self.file_path = file_path
+        # the fixtures are resolved as variables, see p_fixture
+        self.fixtures = FixtureManager(file_path)
+        # the static marks of the loaded cases, shared with the forks and released with the parser, see mark_static
+        self.static_plans = {}
                         
     def update_binded_variables(self, variables):
-        """ bind variables to current testcase parser
+        """ bind variables to current testcase parser, they replace the variables of the last binding,
+            but not the scope which the parser is forked from
         @param variable -> dict
             e.g.
             {"ip": "127.0.0.1"}
         """
-        self._variables = variables
+        self._variables = VariableScope(variables, self._parent_scope)
+    
+    def fork(self, variables=None, case_variables=None):
+        """ a parser for one execution, such as a case with a data row, which runs at the same time with the others.
+            the variables are searched by: data row -> case -> the variables of this parser(project) -> preference.py;
+            the bound functions and the file path are shared, the variables set in the fork are not seen by the others.
+        @param variables: dict type, variables of the data row
+        @param case_variables: dict type, variables of the case
+        @return: instance of TestCaseParser
+        """
+        parser = copy.copy(self)
+        parser._parent_scope = VariableScope(case_variables, self._variables) if case_variables else self._variables
+        parser.update_binded_variables(variables)
+        return parser
+
+    def mark_static(self, content):
+        """ mark the static dicts and lists of a loaded case, they are not evaluated again by this parser and its forks
+        @return (bool) True if content is static, see mark_static
+        """
+        return mark_static(content, self.static_plans)
 
     def bind_functions(self, functions):
         """ bind functions to current testcase parser
@@ -269,6 +463,10 @@ class TestCaseParser(object):
         elif item_type == "variable":
             if item_name in self._variables:
                 return self._variables[item_name]
+            
+            fixture = self.fixtures.find(item_name)
+            if fixture is not None:
+                return self.fixtures.get(fixture, self)
         else:
             raise p_exception.ParamsError("bind item should only be function or variable.")
 
@@ -284,11 +482,16 @@ class TestCaseParser(object):
         """ parse content recursively, each variable and function in content will be evaluated.
 
         @param content =>  any data structure with ${func} or $variable
+        @note: a static dict or list of the loaded cases is returned as a shallow copy, its nested ones are not copied, see mark_static
             
         """
         if content is None:
             return None
 
+        if is_static(content, self.static_plans):
+            # the static subtree of a loaded case, nothing to evaluate
+            return copy.copy(content)
+
         if isinstance(content, (list, tuple)):
             return [self.eval_content_with_bind_actions(item) for item in content]
 
@@ -305,72 +508,42 @@ class TestCaseParser(object):
 
             # content is in string format here
             content = content.strip()
-
-            # replace functions with evaluated value
-            # Notice: _eval_content_functions must be called before _eval_content_variables
-            content = self._eval_content_functions(content)
-
-            # replace variables with binding value
-            content = self._eval_content_variables(content)
+            if "$" in content:
+                content = self._eval_template(content, ("function", "variable"))
             
         return content
     
     def _eval_content_functions(self, content):
-        functions_list = extract_functions(content)
-        for func_content in functions_list:
-            function_meta = parse_function(func_content)
-            func_name = function_meta['func_name']
-            
-            args = function_meta.get('args', [])
-            kwargs = function_meta.get('kwargs', {})            
-            args = self.eval_content_with_bind_actions(args)
-            kwargs = self.eval_content_with_bind_actions(kwargs)
-
-            func = self.get_bind_function(func_name)
-            eval_value = func(*args, **kwargs)
-
-            func_content = "${" + func_content + "}"
-                            
-            if func_content == content:
-                
-                logger.log_debug(u"eval functions result: {} -> {}".format(func_content, eval_value))
-                
-                # content is a variable
-                content = eval_value
-            else:
-                tmp = content
-                
-                # content contains one or many variables
-                content = content.replace(
-                    func_content,
-                    p_compat.str(eval_value), 1
-                )
-                
-                logger.log_debug(u"eval functions result: {} -> {}".format(tmp, content))
-        
-        return content
+        if not isinstance(content, p_compat.basestring):
+            return content
+        return self._eval_template(content, ("function",))
     
     def _eval_content_variables(self, content):
-        variables_list = extract_variables(content)
+        if not isinstance(content, p_compat.basestring):
+            return content
+        return self._eval_template(content, ("variable",))
+    
+    def _eval_template(self, content, node_types):
+        """ walk the compiled nodes of content, see compile_template and substitute_template
+        @param node_types: the types of nodes to evaluate, the others are kept as they are
+        @return: the value itself if content is one function or one variable, otherwise the string joined by the values
+        """
+        result = substitute_template(content, 
+                                     self.get_bind_variable if "variable" in node_types else None, 
+                                     self._eval_function if "function" in node_types else None)
+        logger.log_debug(u"eval content result: {} -> {}".format(content, result))
+        return result
+    
+    def _eval_function(self, function_meta):
+        args = self.eval_content_with_bind_actions(function_meta.get('args', []))
+        kwargs = self.eval_content_with_bind_actions(function_meta.get('kwargs', {}))
+        func = self.get_bind_function(function_meta['func_name'])
         
-        for variable_name in variables_list:
-            variable_value = self.get_bind_variable(variable_name)
-                        
-            if "${}".format(variable_name) == content:
-                
-                logger.log_debug(u"eval variables result: ${} -> {}".format(variable_name, variable_value))
-                
-                # content is a variable                
-                content = variable_value
-            else:
-                tmp = content
-                                
-                # content contains one or several variables
-                content = content.replace("${}".format(variable_name),p_compat.str(variable_value), 1)
-                
-                logger.log_debug(u"eval variables result: {} -> {}".format(tmp, content))
-                
-        return content
+        keyword = getattr(func, "_rtsf_cache", None)
+        if keyword is not None:
+            # see p_cache.cacheable
+            return keyword.call(args, kwargs, self.fixtures.keyword_caches)
+        return func(*args, **kwargs)
 
 
 class YamlCaseLoader(object):
@@ -426,8 +599,8 @@ class YamlCaseLoader(object):
     
     @staticmethod
     def load_dependencies(path_or_yamlfile):
-        """ load all api and suite definitions.
-        @param path_or_yamlfile:  dir path or yamlfile path where have api folder and suite folder 
+        """ load all api, suite and fixture definitions.
+        @param path_or_yamlfile:  dir path or yamlfile path where have api folder, suite folder and fixture folder 
         """
         if os.path.isdir(path_or_yamlfile):
             # cases path
@@ -438,6 +611,7 @@ class YamlCaseLoader(object):
             
         api_def_folder = os.path.join(path, "api")
         suite_def_folder = os.path.join(path, "suite")
+        fixture_def_folder = os.path.join(path, "fixture")
                 
         # load api definitions
         for test_file in FileUtils.load_folder_files(api_def_folder):
@@ -454,6 +628,10 @@ class YamlCaseLoader(object):
             function_meta = parse_function(call_func)
             suite["function_meta"] = function_meta
             YamlCaseLoader.overall_def_dict["suite"][function_meta["func_name"]] = suite
+        
+        # load fixture definitions, see p_fixture
+        for fixture_file in FileUtils.load_folder_files(fixture_def_folder):
+            load_fixture_file(fixture_file)
     
     @staticmethod
     def load_api_file(file_path):
@@ -477,10 +655,11 @@ class YamlCaseLoader(object):
             function_meta = parse_function(api_def)
             func_name = function_meta["func_name"]
 
-            if func_name in YamlCaseLoader.overall_def_dict["api"]:
+            api_dict["function_meta"] = function_meta
+            # a worker process reloads the same definitions, see p_parallel
+            if func_name in YamlCaseLoader.overall_def_dict["api"] and YamlCaseLoader.overall_def_dict["api"][func_name] != api_dict:
                 logger.log_warning("API definition duplicated: {}".format(func_name))
 
-            api_dict["function_meta"] = function_meta
             YamlCaseLoader.overall_def_dict["api"][func_name] = api_dict
                     
     @staticmethod
@@ -19,7 +19,7 @@ UI and Web Http automation frame for python.
 
 '''
 
-
+import threading
 from rtsf.p_report import HtmlReporter
 from rtsf.p_applog import AppLog
 
@@ -27,70 +27,125 @@ from rtsf.p_applog import AppLog
 class Tracer(HtmlReporter, AppLog):
     def __init__(self, **kwargs):
         self.__clear = False
+        # the threads whose writes are dropped, such as the thread of a timeout case which could not be aborted
+        self.__muted = set()
+        self.timings = []
+        self.pools = {}
         HtmlReporter.__init__(self,device_id = kwargs.get('device_id',""), dir_name = kwargs.get('dir_name',""))
         
         AppLog.__init__(self, logger_name = kwargs.get('logger_name'))
     
     def start(self,module_name, case_name, resp_tester, tester):
-        if self.__clear:
+        if self.__is_off():
             return
         self.start_test(module_name, case_name, resp_tester, tester)        
         self.log_info(u"-------\n\t#### Starting test {}: {} {} {}".format(module_name, case_name, resp_tester, tester))
     
              
     def section(self,strs):
-        if self.__clear:
+        if self.__is_off():
             return        
         self.step_info("section", self.__deal_str(strs))
         #self.log_info(self.__deal_str(strs))
     
     
     def normal(self,strs):
-        if self.__clear:
+        if self.__is_off():
             return        
         self.step_info("normal", self.__deal_str(strs))
         self.log_info(self.__deal_str(strs))
     
     
     def step(self,strs):
-        if self.__clear:
+        if self.__is_off():
             return
         self.step_info("step", self.__deal_str(strs))
         self.log_info(self.__deal_str(strs))
     
     
     def ok(self,strs):
-        if self.__clear:
+        if self.__is_off():
             return
         self.step_info("pass", self.__deal_str(strs))
         self.log_info(self.__deal_str(strs))
     
     
     def fail(self,strs):
-        if self.__clear:
+        if self.__is_off():
             return
         self.step_info("fail", self.__deal_str(strs))
         self.log_info(self.__deal_str(strs))
     
     
     def error(self,strs):
-        if self.__clear:
+        if self.__is_off():
             return
         self.step_info("error", self.__deal_str(strs))
         self.log_error(self.__deal_str(strs))
     
     
+    def timeout(self,strs):
+        if self.__is_off():
+            return
+        self.step_info("timeout", self.__deal_str(strs))
+        self.log_error(self.__deal_str(strs))
+    
+    
+    def retry(self,strs):
+        if self.__is_off():
+            return
+        self.step_info("retry", self.__deal_str(strs))
+        self.log_warning(self.__deal_str(strs))
+    
+    
+    def skip(self,strs):
+        if self.__is_off():
+            return
+        self.step_info("skip", self.__deal_str(strs))
+        self.log_warning(self.__deal_str(strs))
+    
+    
     def stop(self):
-        if self.__clear:
+        if self.__is_off():
             return
         self.stop_test()
         self.log_info(u"\n\t## Stopped test")
     
-    def _switch_off(self):
-        self.__clear = True
+    def timing(self, name, seconds):
+        ''' record the wall-clock time, such as the time a driver takes to run a case
+        @param name: timing name, such as device id
+        @param seconds: float type
+        '''
+        case_name = getattr(self, "meta_data", {}).get("raw_case_name")
+        self.timings.append({"name": name, "case_name": case_name, "seconds": seconds})
+        self.log_info(u"timing {} [{}]: {:.3f}s".format(name, case_name, seconds))
+    
+    def pool(self, name, stats):
+        ''' record the statistics of a driver pool, see p_driverpool.DriverPool.stats
+        @param name: pool name, such as device id
+        @param stats: dict type
+        '''
+        self.pools[name] = stats
+        self.log_debug(u"pool {}: {}".format(name, stats))
+    
+    def _switch_off(self, thread = None):
+        ''' drop the writes of all threads, or only of the thread if specified '''
+        if thread is None:
+            self.__clear = True
+            return
+        self.__muted = set([muted for muted in self.__muted if muted.is_alive()] + [thread])
         
     def _switch_on(self):
         self.__clear = False
+    
+    def _tolog(self, level):
+        ''' the logs of a held case log are not logged either, see HtmlReporter.hold_case_log '''
+        if self.held_logs is not None:
+            return lambda msg: None
+        return AppLog._tolog(self, level)
+    
+    def __is_off(self):
+        return self.__clear or threading.current_thread() in self.__muted
             
     def __deal_str(self,strs):
         if isinstance(strs, str):
@@ -0,0 +1,113 @@
+#! python3
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.tests.test_p_async
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:     luokefeng@163.com
+    RCS:      rtsf.tests.test_p_async,  v1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+======================================================================
+
+Provide a function for the automation test
+
+'''
+
+import unittest,os,shutil,tempfile,time,asyncio
+from rtsf.p_executer import TestRunner, init_test_runner
+from rtsf.p_async import AsyncRunner, AsyncExecutor
+from rtsf import p_exception
+
+class SleepRunner(AsyncRunner):
+
+    async def run_test(self, testcase_dict, variables, driver_map):
+        fn, _ = driver_map
+        reporter = self.tracers[fn]
+        self.parser.update_binded_variables(variables)
+        case_name = self.parser.eval_content_with_bind_actions(testcase_dict["name"])
+
+        reporter.start(self.proj_info["module"], case_name, "", "")
+        await asyncio.sleep(0.2)
+        if variables.get("devices") == "android-1":
+            reporter.fail(u"fail on {}".format(case_name))
+        else:
+            reporter.ok(u"ok on {}".format(case_name))
+        reporter.stop()
+
+class GridRunner(AsyncRunner):
+
+    def __init__(self):
+        super(GridRunner, self).__init__()
+        self._default_devices = ["d1", "d2"]
+        self._default_drivers = [("d1", None), ("d2", "broken")]
+        self._local_driver = False
+
+    async def run_test(self, testcase_dict, variables, driver_map):
+        await asyncio.sleep(0.05)
+        if driver_map[1] == "broken":
+            raise p_exception.VariableNotFound("driver variable not found")
+        return driver_map[0]
+
+class TestAsyncExecutor(unittest.TestCase):
+
+    def setUp(self):
+        data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "testcases")
+        self.tmp_path = tempfile.mkdtemp()
+        for file_name in ("data_driver.yaml", "devices.csv", "username_password.csv"):
+            shutil.copyfile(os.path.join(data_path, file_name), os.path.join(self.tmp_path, file_name))
+        self.case = os.path.join(self.tmp_path, "data_driver.yaml")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+
+    def test_run_concurrently(self):
+        start_at = time.time()
+        runner = TestRunner(runner = SleepRunner, concurrency = 12).run(self.case)
+
+        self.assertLess(time.time() - start_at, 2)
+        self.assertIsInstance(runner._task_suite.executor, AsyncExecutor)
+        self.assertEqual(runner.text_test_result.testsRun, 12)
+
+        cases = runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"]
+        self.assertEqual(len(cases), 12)
+        for case in cases:
+            expected = "Fail" if case["raw_case_name"].endswith("android-1") else "pass"
+            self.assertEqual(case["status"], expected)
+
+    def test_run_across_suites(self):
+        testsets = [{"name": "suite_{}".format(i), "file_path": os.path.join(self.tmp_path, "suite_{}.yaml".format(i)),
+                     "project": {"name": "p", "module": "m"}, "cases": [{"name": "case_{}".format(i)}]} for i in range(10)]
+        start_at = time.time()
+        runner = TestRunner(runner = SleepRunner, concurrency = 10).run(testsets)
+
+        # one window for all suites, instead of 10 suites of 0.2s one after another
+        self.assertLess(time.time() - start_at, 1)
+        self.assertEqual(runner.text_test_result.testsRun, 10)
+
+    def test_run_case_in_serial(self):
+        suite_runner = TestRunner(runner = SleepRunner, concurrency = 1).run(self.case)._task_suite.tasks[0].test_runner
+        record = suite_runner._run_case({"name": "case_$devices"}, {"devices": "android-1"})
+        self.assertEqual(record["status"], "fail")
+        self.assertEqual(record["reports"][0][1]["raw_case_name"], "case_android-1")
+
+    def test_grid_rtsf_error(self):
+        runner = init_test_runner(GridRunner, os.path.join(self.tmp_path, "t.yaml"), {"name": "p", "module": "m"})
+        record = runner._run_case({"name": "grid case"}, {})
+        self.assertEqual(record["status"], "error")
+        self.assertIn("driver variable not found", record["error"])
+
+    def test_case_timeout(self):
+        runner = TestRunner(runner = SleepRunner, concurrency = 12, timeout = 0.05).run(self.case)
+        self.assertEqual(len(runner.text_test_result.errors), 12)
+
+        cases = runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"]
+        self.assertEqual(len(cases), 12)
+        self.assertEqual(set(case["status"] for case in cases), set(["Timeout"]))
+
+if __name__ == "__main__":
+    unittest.main(verbosity = 2)
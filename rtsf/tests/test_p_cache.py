@@ -0,0 +1,112 @@
+#! python3
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.tests.test_p_cache
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:     luokefeng@163.com
+    RCS:      rtsf.tests.test_p_cache,  v1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+======================================================================
+
+Provide a function for the automation test
+
+'''
+
+import unittest,os,shutil,tempfile,io,time
+from rtsf.p_executer import TestRunner, Runner
+from rtsf.p_cache import cacheable, make_key, LruCache
+from rtsf import p_exception,p_cache
+
+PREFERENCE = u'''
+from rtsf.p_cache import cacheable
+
+calls = []
+
+@cacheable(scope = "run")
+def token(user):
+    calls.append("token")
+    return "token-" + user
+
+@cacheable(scope = "case", maxsize = 4)
+def nonce():
+    calls.append("nonce")
+    return len(calls)
+'''
+
+class StepsRunner(Runner):
+
+    def run_test(self, testcase_dict, variables, driver_map):
+        reporter = self.tracers[driver_map[0]]
+        parser = self.parser.fork(variables)
+        reporter.start(self.proj_info["module"], self._case_name(testcase_dict, variables), "", "")
+        values = parser.eval_content_with_bind_actions(testcase_dict["steps"])
+        if values[0] != values[1] or values[2] != values[3]:
+            reporter.fail(u"not cached: {}".format(values))
+        reporter.stop()
+
+class TestKeywordCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp()
+        with io.open(os.path.join(self.tmp_path, "preference.py"), "w", encoding = "utf-8") as f:
+            f.write(PREFERENCE)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+
+    def test_lru_cache(self):
+        cache = LruCache(maxsize = 2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertEqual(cache.get("a"), (True, 1))
+        self.assertEqual(cache.get("b"), (False, None))
+        self.assertEqual(len(cache), 2)
+
+        cache = LruCache(ttl = 0.05)
+        cache.put("a", 1)
+        time.sleep(0.1)
+        self.assertEqual(cache.get("a"), (False, None))
+
+    def test_make_key(self):
+        self.assertEqual(make_key([1, "a"], {"b": 2, "c": 3}), make_key([1, "a"], {"c": 3, "b": 2}))
+        self.assertEqual(make_key([{"a": [1]}], {}), make_key([{"a": [1]}], {}))
+        self.assertNotEqual(make_key([1], {}), make_key(["1"], {}))
+        self.assertRaises(p_exception.ParamsError, cacheable, scope = "suite")
+
+    def test_import_again(self):
+        def import_preference():
+            @cacheable(scope = "run")
+            def sign(uid):
+                return "sign-" + uid
+            return sign
+
+        count = len(p_cache._keywords)
+        sign = import_preference()
+        sign._rtsf_cache.call(["a"], {}, {})
+        sign = import_preference()
+        self.assertEqual(len(p_cache._keywords), count + 1)
+        self.assertEqual(sign._rtsf_cache.misses, 1)
+        p_cache.clear()
+
+    def test_run_with_cache(self):
+        testsets = {"name": "cache", "file_path": os.path.join(self.tmp_path, "cache.yaml"), "project": {"name": "p", "module": "m"},
+                    "cases": [{"name": "case_{}".format(i), "steps": ["${token(admin)}", "${token(admin)}", "${nonce()}", "${nonce()}"]} for i in range(3)]}
+        runner = TestRunner(runner = StepsRunner).run(testsets)
+        self.assertEqual(len(runner.text_test_result.errors), 0)
+
+        tracer = runner._task_suite.tasks[0].test_runner.tracers[""]
+        self.assertEqual([case["status"] for case in tracer.summary[0]["TestCases"]], ["pass"] * 3)
+        self.assertEqual(tracer.caches, {"token": {"hits": 5, "misses": 1}, "nonce": {"hits": 3, "misses": 3}})
+        with open(runner.gen_html_report()[0], encoding = "utf-8") as f:
+            self.assertIn("token: 5 hits / 1 misses", f.read())
+
+if __name__ == "__main__":
+    unittest.main(verbosity = 2)
@@ -27,9 +27,9 @@ from rtsf.p_common import ZipUtils
 from rtsf.p_common import ModuleUtils
 from rtsf.p_common import SetupUtils
 from rtsf.p_common import ProgressBarUtils
-from rtsf import p_compat
+from rtsf import p_compat, p_exception
 
-import unittest,os,time
+import unittest,os,time,tempfile
 import shutil
 import types
 
@@ -55,6 +55,10 @@ class TestCommonUtils(unittest.TestCase):
         
         self.assertEqual(CommonUtils.gen_cartesian_product(a, b), expect_result)        
         
+        product = CommonUtils.iter_cartesian_product(a, b)
+        self.assertEqual(next(product), expect_result[0])
+        self.assertEqual(list(product), expect_result[1:])
+        
     def test_convert_to_order_dict(self):
                 
         dict1 = dict(zip(("a","b","c"),("A","B","C")))
@@ -349,6 +353,38 @@ def _test3():
         var_value = ModuleUtils.search_conf_item(self.file_module, "variable", "var1")        
         self.assertEqual(var_value, "value1")
     
+    def test_search_conf_item_index(self):
+        root_path = tempfile.mkdtemp()
+        sub_path = os.path.join(root_path, "sub")
+        os.makedirs(sub_path)
+        with open(os.path.join(root_path, "preference.py"), 'w') as f:
+            f.write("var1 = 'root'\ndef root_func():\n    return 'root'\n")
+        sub_file = os.path.join(sub_path, "preference.py")
+        with open(sub_file, 'w') as f:
+            f.write("var1 = 'sub'\n")
+        
+        try:
+            case_file = os.path.join(sub_path, "case.yaml")
+            self.assertEqual(ModuleUtils.search_conf_item(case_file, "variable", "var1"), "sub")
+            root_func = ModuleUtils.search_conf_item(case_file, "function", "root_func")
+            self.assertEqual(root_func(), "root")
+            self.assertRaises(p_exception.VariableNotFound, ModuleUtils.search_conf_item, case_file, "variable", "unknown")
+            # the same module, not imported again
+            self.assertIs(ModuleUtils.search_conf_item(case_file, "function", "root_func"), root_func)
+            # each preference.py has its own module name
+            self.assertNotEqual(ModuleUtils.get_imported_module_from_file(sub_file).__name__, root_func.__module__)
+            
+            with open(sub_file, 'w') as f:
+                f.write("var1 = 'modified'\n")
+            os.utime(sub_file, (time.time() + 10, time.time() + 10))
+            interval, ModuleUtils.conf_check_interval = ModuleUtils.conf_check_interval, 0
+            try:
+                self.assertEqual(ModuleUtils.search_conf_item(case_file, "variable", "var1"), "modified")
+            finally:
+                ModuleUtils.conf_check_interval = interval
+        finally:
+            shutil.rmtree(root_path, ignore_errors = True)
+    
     def tearDown(self):
         FileSystemUtils.force_delete_file(self.file_module)
 
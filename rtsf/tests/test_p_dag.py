@@ -0,0 +1,100 @@
+#! python3
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.tests.test_p_dag
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:     luokefeng@163.com
+    RCS:      rtsf.tests.test_p_dag,  v1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+======================================================================
+
+Provide a function for the automation test
+
+'''
+
+import unittest,os,shutil,tempfile,time
+from rtsf.p_executer import TestRunner, Runner
+from rtsf.p_dag import DagExecutor
+from rtsf import p_exception
+
+class SleepRunner(Runner):
+
+    def run_test(self, testcase_dict, variables, driver_map):
+        reporter = self.tracers[driver_map[0]]
+        reporter.start(self.proj_info["module"], self._case_name(testcase_dict, variables), "", "")
+        time.sleep(testcase_dict.get("sleep", 0))
+        if testcase_dict["name"] == "broken":
+            reporter.fail("fail")
+        reporter.stop()
+
+class RaiseRunner(SleepRunner):
+
+    def _run_case(self, testcase_dict, variables = {}):
+        if testcase_dict["name"] == "register":
+            raise p_exception.VariableNotFound("raised out of the runner")
+        return super(RaiseRunner, self)._run_case(testcase_dict, variables)
+
+class TestDagExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp()
+        self.testsets = {"name": "dag", "file_path": os.path.join(self.tmp_path, "dag.yaml"), "project": {"name": "p", "module": "m"},
+                         "cases": [
+                             {"name": "login", "depends_on": ["register"], "sleep": 0.1},
+                             {"name": "register", "sleep": 0.2},
+                             {"name": "order", "depends_on": "login", "sleep": 0.1},
+                             {"name": "search", "sleep": 0.3},
+                             {"name": "broken"},
+                             {"name": "refund", "depends_on": ["broken"]},
+                             {"name": "report", "depends_on": ["refund", "search"]},
+                             ]}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+
+    def test_run(self):
+        runner = TestRunner(runner = SleepRunner, workers = 3).run(self.testsets)
+        self.assertIsInstance(runner._task_suite.executor, DagExecutor)
+
+        result = runner.text_test_result
+        self.assertEqual(result.testsRun, 7)
+        self.assertEqual(len(result.failures + result.errors), 0)
+        self.assertEqual(sorted(test.testcase_dict["name"] for test, _ in result.skipped), ["refund", "report"])
+
+        tracer = runner._task_suite.tasks[0].test_runner.tracers[""]
+        cases = dict((case["raw_case_name"], case) for case in tracer.summary[0]["TestCases"])
+        self.assertEqual(cases["broken"]["status"], "Fail")
+        self.assertEqual(cases["report"]["status"], "Skip")
+        self.assertGreaterEqual(cases["login"]["start_at"], cases["register"]["end_at"])
+        self.assertGreaterEqual(cases["order"]["start_at"], cases["login"]["end_at"])
+        # search runs beside the chain of register
+        self.assertLess(cases["search"]["start_at"], cases["register"]["end_at"])
+
+        self.assertEqual(tracer.critical_path["cases"], ["register", "login", "order"])
+        self.assertGreaterEqual(tracer.critical_path["seconds"], 0.4)
+        with open(runner.gen_html_report()[0], encoding = "utf-8") as f:
+            content = f.read()
+        self.assertIn("register -> login -> order", content)
+        self.assertIn("SkipCases", content)
+
+    def test_run_raise(self):
+        runner = TestRunner(runner = RaiseRunner, workers = 3).run(self.testsets)
+
+        result = runner.text_test_result
+        self.assertEqual(result.testsRun, 7)
+        self.assertEqual(len(result.errors), 1)
+        self.assertIn("raised out of the runner", result.errors[0][1])
+        self.assertEqual(sorted(test.testcase_dict["name"] for test, _ in result.skipped), ["login", "order", "refund", "report"])
+
+    def test_cycle(self):
+        self.testsets["cases"][1]["depends_on"] = ["order"]
+        self.assertRaises(p_exception.ParamsError, TestRunner(runner = SleepRunner).run, self.testsets)
+
+if __name__ == "__main__":
+    unittest.main(verbosity = 2)
@@ -0,0 +1,199 @@
+#! python3
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.tests.test_p_distributed
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:     luokefeng@163.com
+    RCS:      rtsf.tests.test_p_distributed,  v1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+======================================================================
+
+Provide a function for the automation test
+
+'''
+
+import unittest,os,shutil,tempfile,socket,multiprocessing,time
+from rtsf.p_executer import TestRunner, Runner
+from rtsf.p_distributed import DistributedExecutor, WorkerManager, run_worker, parse_address, import_runner
+from rtsf import p_exception
+
+class DeviceRunner(Runner):
+
+    def __init__(self):
+        super(DeviceRunner, self).__init__()
+        self._default_devices = ["lab-device-1"]
+        self._default_drivers = [("lab-device-1", None)]
+
+class SleepRunner(Runner):
+
+    def run_test(self, testcase_dict, variables, driver_map):
+        reporter = self.tracers[driver_map[0]]
+        reporter.start(self.proj_info["module"], self._case_name(testcase_dict, variables), "", "")
+        time.sleep(0.2)
+        reporter.stop()
+
+class CrashRunner(Runner):
+
+    def run_test(self, testcase_dict, variables, driver_map):
+        if testcase_dict["name"] == "crash":
+            # the worker is gone without a record
+            os._exit(1)
+        return super(CrashRunner, self).run_test(testcase_dict, variables, driver_map)
+
+def pull_and_exit(address):
+    # pull a case and exit before it sends "start"
+    manager = WorkerManager(address = address, authkey = b"rtsf")
+    while True:
+        try:
+            manager.connect()
+            break
+        except (IOError, OSError):
+            time.sleep(0.1)
+    manager.get_tasks().get()
+    os._exit(1)
+
+def run_late_worker(address):
+    time.sleep(2)
+    run_worker(address, None, Runner, heartbeat = 0.2)
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+class TestDistributedExecutor(unittest.TestCase):
+
+    def setUp(self):
+        data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "testcases")
+        self.tmp_path = tempfile.mkdtemp()
+        for file_name in ("data_driver.yaml", "devices.csv", "username_password.csv"):
+            shutil.copyfile(os.path.join(data_path, file_name), os.path.join(self.tmp_path, file_name))
+        self.case = os.path.join(self.tmp_path, "data_driver.yaml")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address("10.0.0.1:50000"), ("10.0.0.1", 50000))
+        self.assertEqual(parse_address(":50000"), ("127.0.0.1", 50000))
+        self.assertEqual(parse_address(("", "1")), ("", 1))
+        self.assertIs(import_runner("rtsf.p_executer:Runner"), Runner)
+
+    def test_authkey(self):
+        self.assertRaises(p_exception.ParamsError, DistributedExecutor, ("0.0.0.0", 0))
+        self.assertRaises(p_exception.ParamsError, run_worker, "192.168.0.10:50000", None, Runner)
+        self.assertEqual(DistributedExecutor(("0.0.0.0", 0), "secret")._authkey, b"secret")
+        self.assertEqual(DistributedExecutor(("127.0.0.1", 0))._authkey, b"rtsf")
+
+    def test_lost_worker(self):
+        address = ("127.0.0.1", free_port())
+        workers = [multiprocessing.Process(target = run_worker, args = (address, None, CrashRunner), kwargs = {"heartbeat": 0.2}) for _ in range(2)]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+
+        testsets = {"name": "lost", "file_path": os.path.join(self.tmp_path, "lost.yaml"), "project": {"name": "p", "module": "m"},
+                    "cases": [{"name": "crash"}] + [{"name": "case_{}".format(i)} for i in range(3)]}
+        lost_grace, DistributedExecutor.lost_grace = DistributedExecutor.lost_grace, 2
+        try:
+            start_at = time.time()
+            # the case has no timeout, the coordinator still does not wait forever
+            runner = TestRunner(runner = Runner, coordinator = address).run(testsets)
+        finally:
+            DistributedExecutor.lost_grace = lost_grace
+        for worker in workers:
+            worker.join(10)
+
+        self.assertLess(time.time() - start_at, 20)
+        self.assertEqual(runner.text_test_result.testsRun, 4)
+        self.assertEqual(len(runner.text_test_result.errors), 1)
+        self.assertIn("is lost while running: crash", runner.text_test_result.errors[0][1])
+
+    def test_lost_before_start(self):
+        address = ("127.0.0.1", free_port())
+        workers = [multiprocessing.Process(target = target, args = (address,)) for target in (pull_and_exit, run_late_worker)]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+
+        testsets = {"name": "pulled", "file_path": os.path.join(self.tmp_path, "pulled.yaml"), "project": {"name": "p", "module": "m"},
+                    "cases": [{"name": "case_{}".format(i)} for i in range(4)]}
+        lost_grace, DistributedExecutor.lost_grace = DistributedExecutor.lost_grace, 3
+        try:
+            start_at = time.time()
+            runner = TestRunner(runner = Runner, coordinator = address).run(testsets)
+        finally:
+            DistributedExecutor.lost_grace = lost_grace
+        for worker in workers:
+            worker.join(10)
+
+        # the case pulled by the lost worker is not waited for forever, while the other worker is alive
+        self.assertLess(time.time() - start_at, 20)
+        self.assertEqual(runner.text_test_result.testsRun, 4)
+        self.assertEqual(len(runner.text_test_result.errors), 1)
+        self.assertIn("lost before it started: case_0", runner.text_test_result.errors[0][1])
+
+        cases = runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"]
+        self.assertEqual(len(cases), 4)
+
+    def test_no_worker(self):
+        connect_timeout, DistributedExecutor.connect_timeout = DistributedExecutor.connect_timeout, 2
+        try:
+            start_at = time.time()
+            runner = TestRunner(runner = Runner, coordinator = ("127.0.0.1", 0), local_workers = 0).run(self.case)
+        finally:
+            DistributedExecutor.connect_timeout = connect_timeout
+
+        # the coordinator gives up instead of polling forever
+        self.assertLess(time.time() - start_at, 20)
+        self.assertEqual(runner.text_test_result.testsRun, 12)
+        self.assertEqual(len(runner.text_test_result.skipped), 12)
+        self.assertIn("no worker connected", runner.text_test_result.skipped[0][1])
+
+    def test_local_workers(self):
+        runner = TestRunner(runner = Runner, coordinator = ("127.0.0.1", 0), local_workers = 2).run(self.case)
+
+        self.assertIsInstance(runner._task_suite.executor, DistributedExecutor)
+        self.assertEqual(runner.text_test_result.testsRun, 12)
+        self.assertEqual(runner.text_test_result.wasSuccessful(), True)
+        self.assertEqual(len(runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"]), 12)
+
+    def test_resources(self):
+        testsets = {"name": "resources", "file_path": os.path.join(self.tmp_path, "resources.yaml"), "project": {"name": "p", "module": "m"},
+                    "cases": [{"name": "db_{}".format(i), "resources": ["db"]} for i in range(4)] + [{"name": "other_{}".format(i)} for i in range(2)]}
+        runner = TestRunner(runner = SleepRunner, coordinator = ("127.0.0.1", 0), local_workers = 3, resources = {"db": 1}).run(testsets)
+        self.assertEqual(runner.text_test_result.testsRun, 6)
+        self.assertEqual(runner._task_suite.executor.resources.in_use, {"db": 0})
+
+        cases = runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"]
+        db_cases = [case for case in cases if case["raw_case_name"].startswith("db_")]
+        self.assertEqual(len(db_cases), 4)
+        for case in db_cases:
+            running = [other for other in db_cases if other["start_at"] <= case["start_at"] < other["end_at"]]
+            self.assertEqual(len(running), 1)
+
+    def test_remote_worker_devices(self):
+        address = ("127.0.0.1", free_port())
+        worker = multiprocessing.Process(target = run_worker, args = (address, "secret", DeviceRunner))
+        worker.daemon = True
+        worker.start()
+
+        runner = TestRunner(runner = Runner, coordinator = address, authkey = "secret").run(self.case)
+        worker.join(10)
+
+        self.assertEqual(runner.text_test_result.testsRun, 12)
+        tracers = runner._task_suite.tasks[0].test_runner.tracers
+        self.assertEqual(sorted(tracers), ["", "lab-device-1"])
+        self.assertEqual(len(tracers["lab-device-1"].summary[0]["TestCases"]), 12)
+        self.assertEqual(len(runner.gen_html_report()), 1)
+
+if __name__ == "__main__":
+    unittest.main(verbosity = 2)
@@ -0,0 +1,126 @@
+#! python3
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.tests.test_p_driverpool
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:     luokefeng@163.com
+    RCS:      rtsf.tests.test_p_driverpool,  v1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+======================================================================
+
+Provide a function for the automation test
+
+'''
+
+import unittest,os,shutil,tempfile,time,threading
+from rtsf.p_executer import TestRunner, Runner
+from rtsf.p_driverpool import DriverPool
+
+class Driver(object):
+
+    def __init__(self, device_id):
+        self.device_id = device_id
+        self.healthy = True
+        self.quited = False
+
+    def quit(self):
+        self.quited = True
+
+class PoolRunner(Runner):
+
+    def __init__(self):
+        super(PoolRunner, self).__init__()
+        self._driver_pool = DriverPool(factory = Driver, destroy = Driver.quit)
+
+    def run_test(self, testcase_dict, variables, driver_map):
+        assert isinstance(driver_map[1], Driver)
+        return super(PoolRunner, self).run_test(testcase_dict, variables, driver_map)
+
+class TestDriverPool(unittest.TestCase):
+
+    def test_reuse(self):
+        pool = DriverPool(factory = Driver)
+        self.assertEqual(pool.stats()["created"], 0)
+
+        driver = pool.checkout("a")
+        other = pool.checkout("a")
+        self.assertIsNot(driver, other)
+        pool.checkin("a", driver)
+        pool.checkin("a", other)
+
+        self.assertIn(pool.checkout("a"), (driver, other))
+        self.assertEqual(pool.checkout("b").device_id, "b")
+        self.assertEqual(pool.stats("a"), {"created": 2, "reused": 1, "unhealthy": 0, "used_up": 0, "idle_timeout": 0, "idle": 1, "in_use": 1})
+        self.assertEqual(pool.stats()["created"], 3)
+
+    def test_eviction(self):
+        pool = DriverPool(factory = Driver, health_check = lambda driver: driver.healthy, destroy = Driver.quit, max_uses = 2, max_idle = 0.1)
+
+        driver = pool.checkout("a")
+        driver.healthy = False
+        pool.checkin("a", driver)
+        self.assertIsNot(pool.checkout("a"), driver)
+        self.assertEqual(driver.quited, True)
+
+        driver = pool.checkout("b")
+        pool.checkin("b", driver)
+        pool.checkin("b", pool.checkout("b"))
+        self.assertEqual(driver.quited, True)
+
+        driver = pool.checkout("c")
+        pool.checkin("c", driver)
+        time.sleep(0.2)
+        self.assertIsNot(pool.checkout("c"), driver)
+        self.assertEqual(driver.quited, True)
+
+        stats = pool.stats()
+        self.assertEqual((stats["unhealthy"], stats["used_up"], stats["idle_timeout"]), (1, 1, 1))
+
+    def test_max_size(self):
+        pool = DriverPool(factory = Driver, max_size = 1)
+        driver = pool.checkout("a")
+        threading.Timer(0.2, pool.checkin, ("a", driver)).start()
+
+        start_at = time.time()
+        self.assertIs(pool.checkout("a"), driver)
+        self.assertGreaterEqual(time.time() - start_at, 0.1)
+
+    def test_close(self):
+        pool = DriverPool(factory = Driver, destroy = Driver.quit)
+        idle, in_use = pool.checkout("a"), pool.checkout("a")
+        pool.checkin("a", idle)
+
+        pool.close()
+        self.assertEqual((idle.quited, in_use.quited), (True, False))
+        pool.checkin("a", in_use)
+        self.assertEqual(in_use.quited, True)
+
+class TestRunnerWithDriverPool(unittest.TestCase):
+
+    def setUp(self):
+        data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "testcases")
+        self.tmp_path = tempfile.mkdtemp()
+        for file_name in ("data_driver.yaml", "devices.csv", "username_password.csv"):
+            shutil.copyfile(os.path.join(data_path, file_name), os.path.join(self.tmp_path, file_name))
+        self.case = os.path.join(self.tmp_path, "data_driver.yaml")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+
+    def test_run(self):
+        runner = TestRunner(runner = PoolRunner).run(self.case)
+        self.assertEqual(runner.text_test_result.wasSuccessful(), True)
+
+        test_runner = runner._task_suite.tasks[0].test_runner
+        stats = test_runner.tracers[""].pools[""]
+        self.assertEqual((stats["created"], stats["reused"], stats["in_use"]), (1, 11, 0))
+        self.assertEqual(test_runner._driver_pool.stats()["idle"], 0)
+
+if __name__ == "__main__":
+    unittest.main(verbosity = 2)
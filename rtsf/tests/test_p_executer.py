@@ -18,12 +18,13 @@ Provide a function for the automation test
 
 '''
 
-import unittest,os,shutil
-from rtsf.p_executer import TestRunner,Runner,TaskSuite, TestSuite, TestCase, init_test_suite
+import unittest,os,shutil,time,tempfile,threading
+from rtsf.p_executer import TestRunner,Runner,TaskSuite, TestSuite, TestCase, init_test_suite, init_test_runner
 from rtsf.p_report import HtmlReporter
 from rtsf.p_testcase import TestCaseParser
 from rtsf.p_common import FileSystemUtils
 from rtsf.p_applog import logger
+from rtsf import p_exception
 
 class TestTestRunner(unittest.TestCase):
     
@@ -143,6 +144,336 @@ class TestTestRunner(unittest.TestCase):
         self.assertEqual(os.path.isfile(html_report[0]), True)
         self.assertEqual(os.path.isfile(html_report[1]), True)    
         
+
+class GridRunner(Runner):
+    
+    def __init__(self):
+        super(GridRunner, self).__init__()
+        self._default_devices = ["d1", "d2", "d3"]
+        self._default_drivers = [("d1", None), ("d2", None), ("d3", "broken")]
+        self._local_driver = False
+    
+    def run_test(self, testcase_dict, variables, driver_map):
+        fn, driver = driver_map
+        time.sleep(0.3)
+        if driver == "broken":
+            raise ValueError("driver broken")
+        return fn
+
+class NotFoundGridRunner(GridRunner):
+    
+    def run_test(self, testcase_dict, variables, driver_map):
+        if driver_map[1] == "broken":
+            raise p_exception.VariableNotFound("driver variable not found")
+        return driver_map[0]
+
+class TestRunnerGrid(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp()
+        self.runner = init_test_runner(GridRunner, os.path.join(self.tmp_path, "t.yaml"), {"name": "p", "module": "m"})
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+    
+    def test_run_grid_multithread_concurrently(self):
+        # both drivers have to be running at the same time to pass the barrier
+        barrier = threading.Barrier(2, timeout = 5)
+        def run_driver(driver_map):
+            barrier.wait()
+            time.sleep(0.3)
+            return driver_map[0]
+        
+        start_at = time.time()
+        outcomes = self.runner._run_grid_multithread(run_driver, self.runner._default_drivers[:2])
+        # about one sleep, not one per driver
+        self.assertLess(time.time() - start_at, 0.55)
+        self.assertEqual([(result, exc_info) for _, result, exc_info in outcomes], [("d1", None), ("d2", None)])
+    
+    def test_run_grid_multithread_capture_exception(self):
+        start_at = time.time()
+        record = self.runner._run_case({"name": "grid case"}, {})
+        self.assertLess(time.time() - start_at, 0.8)
+        self.assertEqual(record["status"], "error")
+        self.assertIn("driver broken", record["error"])
+        
+        for device in self.runner._default_devices:
+            timings = self.runner.tracers[device].timings
+            self.assertEqual(len(timings), 1)
+            self.assertGreaterEqual(timings[0]["seconds"], 0.3)
+    
+    def test_run_grid_multithread_capture_rtsf_error(self):
+        runner = init_test_runner(NotFoundGridRunner, os.path.join(self.tmp_path, "t.yaml"), {"name": "p", "module": "m"})
+        record = runner._run_case({"name": "grid case"}, {})
+        self.assertEqual(record["status"], "error")
+        self.assertIn("driver variable not found", record["error"])
+
+class ProcessGridRunner(Runner):
+    
+    def __init__(self):
+        super(ProcessGridRunner, self).__init__()
+        self._default_devices = ["d1", "d2"]
+        # the driver knows the process which creates it
+        self._default_drivers = [("d1", os.getpid()), ("d2", os.getpid())]
+        self._local_driver = False
+        self._grid_mode = "process"
+    
+    def run_test(self, testcase_dict, variables, driver_map):
+        reporter = self.tracers[driver_map[0]]
+        if reporter.summary:
+            raise ValueError("reports kept in the device worker")
+        reporter.start(self.proj_info["module"], u"{} {}".format(testcase_dict["name"], driver_map[1]), "", "")
+        if testcase_dict["name"] == "broken":
+            raise ValueError("driver broken")
+        if testcase_dict["name"] == "not found":
+            raise p_exception.VariableNotFound("driver variable not found")
+        reporter.stop()
+
+class TestRunnerGridProcess(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp()
+        self.runner = init_test_runner(ProcessGridRunner, os.path.join(self.tmp_path, "t.yaml"), {"name": "p", "module": "m"})
+    
+    def tearDown(self):
+        self.runner._close()
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+    
+    def test_run_grid_multiprocess(self):
+        records = [self.runner._run_case({"name": name}, {}) for name in ("first", "second", "broken")]
+        self.assertEqual([record["status"] for record in records], ["pass", "pass", "error"])
+        self.assertIn("driver broken", records[2]["error"])
+
+        
+        for device in self.runner._default_devices:
+            pids = set(report["raw_case_name"].split()[1] for device_id, report in records[0]["reports"] + records[1]["reports"] if device_id == device)
+            # the same worker process runs all cases of a device, with the driver it creates
+            self.assertEqual(len(pids), 1)
+            self.assertNotEqual(pids, set([str(os.getpid())]))
+            self.assertEqual(len(self.runner.tracers[device].summary[0]["TestCases"]), 2)
+            self.assertEqual(len(self.runner.tracers[device].timings), 3)
+        
+        record = self.runner._run_case({"name": "not found"}, {})
+        self.assertEqual(record["status"], "error")
+        self.assertIn("driver variable not found", record["error"])
+        # the worker survives the rtsf error
+        self.assertEqual([worker.is_alive() for worker in self.runner._device_workers.values()], [True, True])
+        
+        workers = list(self.runner._device_workers.values())
+        self.runner._close()
+        self.assertEqual([worker.is_alive() for worker in workers], [False, False])
+
+class HangRunner(Runner):
+    
+    def run_test(self, testcase_dict, variables, driver_map):
+        if testcase_dict["name"].startswith("/163"):
+            self.tracers[driver_map[0]].start(self.proj_info["module"], self._case_name(testcase_dict, variables), "", "")
+            while True:
+                time.sleep(0.05)
+        return super(HangRunner, self).run_test(testcase_dict, variables, driver_map)
+
+class StuckRunner(Runner):
+    release = threading.Event()
+    
+    def run_test(self, testcase_dict, variables, driver_map):
+        reporter = self.tracers[driver_map[0]]
+        if testcase_dict["name"] == "stuck":
+            reporter.start(self.proj_info["module"], "stuck", "", "")
+            try:
+                # blocks in C, the async exception of the watchdog is not raised until it returns
+                self.release.wait()
+            finally:
+                reporter.step("late write of stuck")
+                reporter.stop()
+            return
+        
+        self.release.set()
+        time.sleep(0.2)
+        reporter.start(self.proj_info["module"], testcase_dict["name"], "", "")
+        reporter.stop()
+
+class TestCaseTimeout(unittest.TestCase):
+    
+    def setUp(self):
+        data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "testcases")
+        self.tmp_path = tempfile.mkdtemp()
+        for file_name in ("data_driver.yaml", "devices.csv", "username_password.csv"):
+            shutil.copyfile(os.path.join(data_path, file_name), os.path.join(self.tmp_path, file_name))
+        self.case = os.path.join(self.tmp_path, "data_driver.yaml")
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+    
+    def test_case_timeout_key(self):
+        runner = init_test_runner(HangRunner, self.case, {"name": "p", "module": "m"})
+        start_at = time.time()
+        record = runner._run_case({"name": "/163_hang", "timeout": 0.2})
+        
+        self.assertLess(time.time() - start_at, 1)
+        self.assertEqual(record["status"], "timeout")
+        self.assertIn("timeout", record["error"])
+        self.assertEqual(record["reports"][0][1]["status"], "Timeout")
+        self.assertEqual(runner._run_case({"name": "/baidu_ok", "timeout": 0.2})["status"], "pass")
+    
+    def test_case_timeout_stuck_thread(self):
+        runner = init_test_runner(StuckRunner, self.case, {"name": "p", "module": "m"})
+        runner._abort_grace = 0.1
+        record = runner._run_case({"name": "stuck", "timeout": 0.2})
+        self.assertEqual(record["status"], "timeout")
+        
+        # the stuck thread goes on while the next case runs
+        record = runner._run_case({"name": "next"})
+        self.assertEqual(record["status"], "pass")
+        self.assertEqual([report["raw_case_name"] for _, report in record["reports"]], ["next"])
+    
+    def test_TestRunner_timeout(self):
+        start_at = time.time()
+        runner = TestRunner(runner = HangRunner, timeout = 0.2).run(self.case)
+        
+        self.assertLess(time.time() - start_at, 6)
+        self.assertEqual(runner.text_test_result.testsRun, 12)
+        self.assertEqual(len(runner.text_test_result.errors), 6)
+        
+        cases = runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"]
+        self.assertEqual(sorted(set(case["status"] for case in cases)), ["Timeout", "pass"])
+
+class FailRunner(Runner):
+    
+    def run_test(self, testcase_dict, variables, driver_map):
+        reporter = self.tracers[driver_map[0]]
+        reporter.start(self.proj_info["module"], self._case_name(testcase_dict, variables), "", "")
+        if testcase_dict["name"].startswith("/163"):
+            reporter.fail("fail")
+        reporter.stop()
+
+class TestMaxFailures(unittest.TestCase):
+    
+    def setUp(self):
+        data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "testcases")
+        self.tmp_path = tempfile.mkdtemp()
+        for file_name in ("data_driver.yaml", "devices.csv", "username_password.csv"):
+            shutil.copyfile(os.path.join(data_path, file_name), os.path.join(self.tmp_path, file_name))
+        self.case = os.path.join(self.tmp_path, "data_driver.yaml")
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+    
+    def test_failfast(self):
+        runner = TestRunner(runner = FailRunner, failfast = True).run(self.case)
+        self.assertEqual(runner.text_test_result.testsRun, 2)
+        self.assertEqual(runner.text_test_result.shouldStop, True)
+        
+        html_report = runner.gen_html_report()
+        self.assertEqual(os.path.isfile(html_report[0]), True)
+    
+    def test_max_failures(self):
+        runner = TestRunner(runner = FailRunner, max_failures = 3).run(self.case)
+        self.assertEqual(runner.text_test_result.testsRun, 6)
+        
+        cases = runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"]
+        self.assertEqual(len([case for case in cases if case["status"] == "Fail"]), 3)
+        
+        runner = TestRunner(runner = FailRunner, max_failures = 100).run(self.case)
+        self.assertEqual(runner.text_test_result.testsRun, 12)
+
+class TestOnlyFailed(unittest.TestCase):
+    
+    def setUp(self):
+        data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "testcases")
+        self.tmp_path = tempfile.mkdtemp()
+        for file_name in ("data_driver.yaml", "devices.csv", "username_password.csv"):
+            shutil.copyfile(os.path.join(data_path, file_name), os.path.join(self.tmp_path, file_name))
+        self.case = os.path.join(self.tmp_path, "data_driver.yaml")
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+    
+    def test_only_failed(self):
+        runner = TestRunner(runner = FailRunner).run(self.case)
+        self.assertEqual(runner.text_test_result.testsRun, 12)
+        failed = set(test.key for test in runner._task_suite.tasks[0] if test.key.split("::")[1].startswith("/163"))
+        
+        runner = TestRunner(runner = FailRunner).run(self.case, only_failed = True)
+        self.assertEqual(set(test.key for test in runner._task_suite.tasks[0]), failed)
+        self.assertEqual(runner.text_test_result.testsRun, 6)
+        
+        # fixed
+        runner = TestRunner(runner = Runner).run(self.case, only_failed = True)
+        self.assertEqual(runner.text_test_result.testsRun, 6)
+        
+        runner = TestRunner(runner = Runner).run(self.case, only_failed = True)
+        self.assertEqual(runner.text_test_result.testsRun, 0)
+
+class RetryRunner(Runner):
+    
+    def __init__(self):
+        super(RetryRunner, self).__init__()
+        self.attempts = {}
+    
+    def run_test(self, testcase_dict, variables, driver_map):
+        name = testcase_dict["name"]
+        self.attempts[name] = self.attempts.get(name, 0) + 1
+        reporter = self.tracers[driver_map[0]]
+        reporter.start(self.proj_info["module"], name, "", "")
+        if self.attempts[name] <= testcase_dict.get("broken_attempts", 0):
+            reporter.fail("fail")
+        reporter.stop()
+
+class TestRetries(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp()
+        self.testsets = {"name": "retry", "file_path": os.path.join(self.tmp_path, "retry.yaml"), "project": {"name": "p", "module": "m", "retries": 1},
+                         "cases": [{"name": "stable"}, {"name": "flaky", "broken_attempts": 1}, {"name": "broken", "broken_attempts": 9, "retries": 2}]}
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+    
+    def test_retries(self):
+        runner = TestRunner(runner = RetryRunner).run(self.testsets)
+        test_runner = runner._task_suite.tasks[0].test_runner
+        self.assertEqual(test_runner.attempts, {"stable": 1, "flaky": 2, "broken": 3})
+        self.assertEqual(runner.text_test_result.testsRun, 3)
+        
+        records = dict((test.testcase_dict["name"], test.record) for test in runner._task_suite.tasks[0])
+        self.assertNotIn("attempts", records["stable"])
+        self.assertEqual((records["flaky"]["status"], records["flaky"]["attempts"], records["flaky"]["flaky"]), ("pass", 2, True))
+        self.assertEqual((records["broken"]["status"], records["broken"]["attempts"], records["broken"]["flaky"]), ("fail", 3, False))
+        
+        cases = dict((case["raw_case_name"], case) for case in test_runner.tracers[""].summary[0]["TestCases"])
+        self.assertEqual(len(cases), 3)
+        self.assertEqual((cases["flaky"]["status"], cases["flaky"]["flaky"]), ("pass", True))
+        self.assertEqual(runner.history.get(self.testsets["file_path"], records["flaky"]["key"])["flaky"], 1)
+        with open(runner.gen_html_report()[0], encoding = "utf-8") as f:
+            self.assertIn("(flaky, 2 attempts)", f.read())
+
+class TestLazySuite(unittest.TestCase):
+    
+    def setUp(self):
+        data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "testcases")
+        self.tmp_path = tempfile.mkdtemp()
+        for file_name in ("data_driver.yaml", "devices.csv", "username_password.csv"):
+            shutil.copyfile(os.path.join(data_path, file_name), os.path.join(self.tmp_path, file_name))
+        self.case = os.path.join(self.tmp_path, "data_driver.yaml")
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+    
+    def test_lazy_suite(self):
+        suite = init_test_suite(self.case, Runner, lazy = True).tasks[0]
+        self.assertEqual(suite._tests, [])
+        
+        tests = iter(suite)
+        self.assertIsInstance(next(tests), TestCase)
+        self.assertEqual(len(list(tests)), 11)
+        self.assertEqual(suite.countTestCases(), 12)
+    
+    def test_TestRunner_lazy(self):
+        runner = TestRunner(runner = Runner, lazy = True).run(self.case)
+        self.assertEqual(runner.text_test_result.testsRun, 12)
+        
+        summary = runner._task_suite.tasks[0].test_runner.tracers[""].summary
+        self.assertEqual(len(summary[0]["TestCases"]), 12)
         
 if __name__ == "__main__":
 #     logger.setup_logger("debug")
@@ -0,0 +1,129 @@
+#! python3
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.tests.test_p_fixture
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:     luokefeng@163.com
+    RCS:      rtsf.tests.test_p_fixture,  v1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+======================================================================
+
+Provide a function for the automation test
+
+'''
+
+import unittest,os,shutil,tempfile,io,threading,multiprocessing
+from rtsf.p_executer import TestRunner, Runner
+from rtsf.p_parallel import _worker_main
+from rtsf.p_fixture import fixture
+from rtsf import p_fixture, p_exception
+
+PREFERENCE = u'''
+import os
+from rtsf.p_fixture import fixture
+
+def log_event(event):
+    with open(os.path.join(os.path.dirname(__file__), "events.log"), "a") as f:
+        f.write(event + "\\n")
+
+def make_token():
+    log_event("setup token")
+    return "T"
+
+@fixture(scope = "project")
+def session():
+    log_event("setup session")
+    yield "S"
+    log_event("teardown session")
+
+@fixture(scope = "suite")
+def account(session):
+    log_event("setup account")
+    yield session + "A"
+    log_event("teardown account")
+
+@fixture(scope = "case")
+def order(account):
+    log_event("setup order")
+    yield account + "O"
+    log_event("teardown order")
+'''
+
+CASES = u'''
+- project:
+    name: fixture
+    module: fixture
+- case:
+    name: first-$order-$token
+- case:
+    name: second-$order-$token
+'''
+
+FIXTURES = u'''
+- fixture:
+    name: token
+    scope: worker
+    setup: ${make_token()}
+    teardown: ${log_event(teardown_$token)}
+'''
+
+class TestFixture(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.tmp_path, "dependencies", "fixture"))
+        for file_name, content in (("preference.py", PREFERENCE), ("fixture.yaml", CASES), (os.path.join("dependencies", "fixture", "token.yaml"), FIXTURES)):
+            with io.open(os.path.join(self.tmp_path, file_name), "w", encoding = "utf-8") as f:
+                f.write(content)
+
+    def tearDown(self):
+        p_fixture.definitions.clear()
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+
+    def test_scopes(self):
+        runner = TestRunner(runner = Runner).run(os.path.join(self.tmp_path, "fixture.yaml"))
+        self.assertEqual(runner.text_test_result.wasSuccessful(), True)
+
+        cases = runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"]
+        self.assertEqual([case["raw_case_name"] for case in cases], ["first-SAO-T", "second-SAO-T"])
+
+        with io.open(os.path.join(self.tmp_path, "events.log"), encoding = "utf-8") as f:
+            events = f.read().splitlines()
+        self.assertEqual(events, ["setup session", "setup account", "setup order", "setup token", "teardown order",
+                                  "setup order", "teardown order",
+                                  "teardown account", "teardown_T", "teardown session"])
+
+    def test_worker_scope_with_timeout(self):
+        runner = TestRunner(runner = Runner, timeout = 30).run(os.path.join(self.tmp_path, "fixture.yaml"))
+        self.assertEqual(runner.text_test_result.wasSuccessful(), True)
+
+        with io.open(os.path.join(self.tmp_path, "events.log"), encoding = "utf-8") as f:
+            events = f.read().splitlines()
+        # each case runs in a new watchdog thread of the same worker
+        self.assertEqual(events.count("setup token"), 1)
+        self.assertEqual(events.count("teardown_T"), 1)
+
+    def test_worker_loads_definitions(self):
+        # as a spawned worker process, which does not inherit the definitions
+        conn, child_conn = multiprocessing.Pipe()
+        worker = threading.Thread(target = _worker_main, args = (Runner, child_conn))
+        worker.start()
+        conn.send((os.path.join(self.tmp_path, "fixture.yaml"), {"name": "fixture", "module": "fixture"}, {"name": "first-$token"}, {}, None))
+        record = conn.recv()
+        conn.send(None)
+        worker.join()
+
+        self.assertEqual(record["status"], "pass")
+        self.assertEqual(record["reports"][0][1]["raw_case_name"], "first-T")
+
+    def test_invalid_scope(self):
+        self.assertRaises(p_exception.ParamsError, fixture, "module")
+
+if __name__ == "__main__":
+    unittest.main(verbosity = 2)
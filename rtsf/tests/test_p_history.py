@@ -0,0 +1,198 @@
+#! python3
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.tests.test_p_history
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:     luokefeng@163.com
+    RCS:      rtsf.tests.test_p_history,  v1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+======================================================================
+
+Provide a function for the automation test
+
+'''
+
+import unittest,os,shutil,tempfile
+from rtsf.p_executer import TestRunner, Runner, init_test_suite
+from rtsf.p_history import CaseHistory, case_key
+from rtsf.p_parallel import ProcessExecutor
+from rtsf.p_testcase import YamlCaseLoader
+from rtsf.p_scheduler import select_quarantine
+
+class FailRunner(Runner):
+
+    def run_test(self, testcase_dict, variables, driver_map):
+        if not testcase_dict["name"].startswith("/163"):
+            return super(FailRunner, self).run_test(testcase_dict, variables, driver_map)
+
+        reporter = self.tracers[driver_map[0]]
+        reporter.start(self.proj_info["module"], self._case_name(testcase_dict, variables), "", "")
+        reporter.fail(u"fail")
+        reporter.stop()
+
+class TestCaseHistory(unittest.TestCase):
+
+    def setUp(self):
+        data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "testcases")
+        self.tmp_path = tempfile.mkdtemp()
+        for file_name in ("data_driver.yaml", "devices.csv", "username_password.csv"):
+            shutil.copyfile(os.path.join(data_path, file_name), os.path.join(self.tmp_path, file_name))
+        self.case = os.path.join(self.tmp_path, "data_driver.yaml")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+
+    def test_case_key(self):
+        self.assertEqual(case_key(self.case, "login"), "data_driver.yaml::login::0")
+        self.assertEqual(case_key(os.path.join(self.tmp_path, "a", "login.yaml"), "login", base_dir = self.tmp_path), "a/login.yaml::login::0")
+        self.assertEqual(case_key(self.case, "login", {"a": 1, "b": 2}), case_key(self.case, "login", {"b": 2, "a": 1}))
+        self.assertNotEqual(case_key(self.case, "login", {"a": 1}), case_key(self.case, "login", {"a": 2}))
+
+    def test_update_save_load(self):
+        history = CaseHistory()
+        key = case_key(self.case, "login")
+        for duration in range(1, 8):
+            history.update(self.case, key, {"status": "fail" if duration == 7 else "pass", "start_at": 0, "end_at": duration})
+        history.save()
+
+        history = CaseHistory()
+        case = history.get(self.case, key)
+        self.assertEqual(case["durations"], [3, 4, 5, 6, 7])
+        self.assertEqual((case["runs"], case["fails"], case["last_status"]), (7, 1, "fail"))
+        self.assertEqual(history.get_duration(self.case, key), 5)
+        self.assertEqual(history.estimate_duration(self.case, "unknown"), 5)
+        self.assertEqual(CaseHistory().estimate_duration(os.path.join(tempfile.gettempdir(), "none.yaml"), "unknown"), 0)
+
+    def test_record_after_run(self):
+        runner = TestRunner(runner = Runner).run(self.case)
+        self.assertEqual(runner.text_test_result.testsRun, 12)
+        self.assertTrue(os.path.isfile(os.path.join(self.tmp_path, CaseHistory.file_name)))
+
+        history = CaseHistory()
+        keys = set(test.key for test in runner._task_suite.tasks[0])
+        self.assertEqual(len(keys), 12)
+        for key in keys:
+            self.assertEqual(history.get(self.case, key)["runs"], 1)
+
+    def test_same_file_name(self):
+        cases = []
+        for dir_name in ("a", "b"):
+            os.mkdir(os.path.join(self.tmp_path, dir_name))
+            for file_name in ("data_driver.yaml", "devices.csv", "username_password.csv"):
+                shutil.copyfile(os.path.join(self.tmp_path, file_name), os.path.join(self.tmp_path, dir_name, file_name))
+            cases.append(os.path.join(self.tmp_path, dir_name, "data_driver.yaml"))
+
+        task_suite = init_test_suite([testset for case in cases for testset in YamlCaseLoader.load_files(case)], Runner)
+        # one store file for both testsets, such as a pinned snapshot, the keys of the store are relative to its directory
+        store_file = os.path.join(self.tmp_path, CaseHistory.file_name)
+        history = CaseHistory(store_file)
+        for index, suite in enumerate(task_suite.tasks):
+            for test in suite:
+                history.update(test.file_path, test.key, {"status": "pass", "start_at": 0, "end_at": index + 1})
+        history.save()
+
+        history = CaseHistory(store_file)
+        self.assertEqual(len(history._store(self.case)["cases"]), 24)
+        for index, suite in enumerate(task_suite.tasks):
+            for test in suite:
+                self.assertEqual(history.get_duration(test.file_path, test.key), index + 1)
+
+    def test_only_failed_from_other_cwd(self):
+        cwd, other_path = os.getcwd(), tempfile.mkdtemp()
+        try:
+            os.chdir(self.tmp_path)
+            runner = TestRunner(runner = FailRunner).run(self.case)
+            self.assertEqual(runner.text_test_result.testsRun, 12)
+            failed = set(test.key for test in runner._task_suite.tasks[0] if test.testcase_dict["name"].startswith("/163"))
+            self.assertEqual(len(failed), 6)
+
+            # the keys are stored next to the testset, they match wherever the run starts
+            os.chdir(other_path)
+            runner = TestRunner(runner = FailRunner).run(self.case, only_failed = True)
+            self.assertEqual(runner.text_test_result.testsRun, 6)
+            self.assertEqual(set(test.key for test in runner._task_suite.tasks[0]), failed)
+            for key in failed:
+                self.assertEqual(CaseHistory().get(self.case, key)["runs"], 2)
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(other_path, ignore_errors = True)
+
+    def test_longest_first(self):
+        task_suite = init_test_suite(self.case, Runner)
+        tests = list(task_suite.tasks[0])
+        history = CaseHistory()
+        for index, test in enumerate(tests):
+            history.update(test.file_path, test.key, {"status": "pass", "start_at": 0, "end_at": index})
+
+        executor = ProcessExecutor(Runner, 2)
+        self.assertEqual([test for _, test in executor._iter_tasks(task_suite)], tests)
+
+        executor.history = history
+        self.assertEqual([test for _, test in executor._iter_tasks(task_suite)], tests[::-1])
+
+    def test_longest_first_lazy(self):
+        tests = list(init_test_suite(self.case, Runner).tasks[0])
+        history = CaseHistory()
+        for index, test in enumerate(tests):
+            history.update(test.file_path, test.key, {"status": "pass", "start_at": 0, "end_at": index})
+
+        task_suite = init_test_suite(self.case, Runner, lazy = True)
+        suite = task_suite.tasks[0]
+        built = []
+        new_test = suite._new_test
+        suite._new_test = lambda *args: built.append(args) or new_test(*args)
+
+        executor = ProcessExecutor(Runner, 2)
+        executor.history = history
+        tasks = executor._iter_tasks(task_suite)
+        # the first case starts before the rest are built
+        first = next(tasks)[1]
+        self.assertEqual(len(built), 1)
+        self.assertEqual(set([first.key] + [test.key for _, test in tasks]), set(test.key for test in tests))
+
+    def test_quarantine(self):
+        runner = TestRunner(runner = Runner).run(self.case)
+        flaky_key = [test.key for test in runner._task_suite.tasks[0]][0]
+
+        history = CaseHistory()
+        for flaky in (True, False, False, False, True):
+            history.update(self.case, flaky_key, {"status": "pass", "start_at": 0, "end_at": 1, "flaky": flaky})
+        self.assertEqual(history.is_flaky(self.case, flaky_key), True)
+        history.save()
+
+        runner = TestRunner(runner = Runner).run(self.case, quarantine = "exclude")
+        self.assertEqual(runner.text_test_result.testsRun, 11)
+        runner = TestRunner(runner = Runner).run(self.case, quarantine = "only")
+        self.assertEqual([test.key for test in runner._task_suite.tasks[0]], [flaky_key])
+        # still flaky, passed on retry in 2 of 7 runs
+        self.assertEqual(CaseHistory().is_flaky(self.case, flaky_key), True)
+        self.assertEqual(runner.history.get(self.case, flaky_key)["runs"], 7)
+
+    def test_quarantine_same_file_name(self):
+        testsets = []
+        for dir_name in ("a", "b"):
+            os.mkdir(os.path.join(self.tmp_path, dir_name))
+            for file_name in ("data_driver.yaml", "devices.csv", "username_password.csv"):
+                shutil.copyfile(os.path.join(self.tmp_path, file_name), os.path.join(self.tmp_path, dir_name, file_name))
+            testsets.extend(YamlCaseLoader.load_files(os.path.join(self.tmp_path, dir_name, "data_driver.yaml")))
+
+        task_suite = init_test_suite(testsets, Runner)
+        suite_a, suite_b = task_suite.tasks
+        flaky = list(suite_a)[0]
+        history = CaseHistory()
+        for _ in range(CaseHistory.flaky_min_runs):
+            history.update(flaky.file_path, flaky.key, {"status": "pass", "start_at": 0, "end_at": 1, "flaky": True})
+
+        self.assertEqual(select_quarantine(task_suite, history, "only"), set([(suite_a.file_path, flaky.key)]))
+        self.assertEqual([test.key for test in suite_a], [flaky.key])
+        # the case of the same name in b/data_driver.yaml is not quarantined
+        self.assertEqual(list(suite_b), [])
+
+if __name__ == "__main__":
+    unittest.main(verbosity = 2)
@@ -0,0 +1,71 @@
+#! python3
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.tests.test_p_journal
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:     luokefeng@163.com
+    RCS:      rtsf.tests.test_p_journal,  v1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+======================================================================
+
+Provide a function for the automation test
+
+'''
+
+import unittest,os,shutil,tempfile,io
+from rtsf.p_executer import TestRunner, Runner
+from rtsf.p_journal import Journal
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "testcases")
+        self.tmp_path = tempfile.mkdtemp()
+        for file_name in ("data_driver.yaml", "devices.csv", "username_password.csv"):
+            shutil.copyfile(os.path.join(data_path, file_name), os.path.join(self.tmp_path, file_name))
+        self.case = os.path.join(self.tmp_path, "data_driver.yaml")
+        self.journal = os.path.join(self.tmp_path, "journal", "run.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+
+    def test_load_broken_line(self):
+        journal = Journal(self.journal)
+        journal.append({"key": "a", "name": u"中文"})
+        journal.close()
+        with io.open(self.journal, "a", encoding = "utf-8") as f:
+            f.write(u'{"key": "b", "na')
+
+        self.assertEqual(Journal.load(self.journal), [{"key": "a", "name": u"中文"}])
+        self.assertEqual(Journal.load(os.path.join(self.tmp_path, "none.jsonl")), [])
+
+    def test_resume(self):
+        runner = TestRunner(runner = Runner).run(self.case, journal = self.journal)
+        entries = Journal.load(self.journal)
+        self.assertEqual(len(entries), 12)
+        self.assertEqual(set(entry["status"] for entry in entries), set(["pass"]))
+        self.assertEqual(len(set(entry["key"] for entry in entries)), 12)
+        self.assertEqual(entries[0]["suite"], self.case)
+
+        # crashed after 5 cases, while the 6th is being written
+        with io.open(self.journal, encoding = "utf-8") as f:
+            lines = f.readlines()
+        with io.open(self.journal, "w", encoding = "utf-8") as f:
+            f.writelines(lines[:5] + [lines[5][:20]])
+
+        runner = TestRunner(runner = Runner).run(self.case, resume = self.journal)
+        self.assertEqual(runner.text_test_result.testsRun, 7)
+        self.assertEqual(len(runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"]), 12)
+
+        keys = [entry["key"] for entry in Journal.load(self.journal)]
+        self.assertEqual(len(keys), 12)
+        self.assertEqual(sorted(keys), sorted(entry["key"] for entry in entries))
+
+if __name__ == "__main__":
+    unittest.main(verbosity = 2)
@@ -0,0 +1,170 @@
+#! python3
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.tests.test_p_load
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:     luokefeng@163.com
+    RCS:      rtsf.tests.test_p_load,  v1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+======================================================================
+
+Provide a function for the automation test
+
+'''
+
+import unittest,os,shutil,tempfile,asyncio,threading,time
+from rtsf.p_executer import TestRunner, Runner
+from rtsf.p_async import AsyncRunner
+from rtsf.p_load import LatencyHistogram, LoadSettings, LoadExecutor
+from rtsf import p_exception
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_percentile(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(50), None)
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000.0)
+
+        self.assertEqual(histogram.count, 1000)
+        self.assertAlmostEqual(histogram.percentile(50), 0.5, delta = 0.01)
+        self.assertAlmostEqual(histogram.percentile(95), 0.95, delta = 0.02)
+        self.assertAlmostEqual(histogram.percentile(99), 0.99, delta = 0.02)
+        self.assertEqual(histogram.percentile(100), 1.0)
+        self.assertEqual(histogram.summary()["min"], 0.001)
+
+    def test_merge(self):
+        whole, odd, even = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for ms in range(1, 101):
+            whole.record(ms / 1000.0)
+            (odd if ms % 2 else even).record(ms / 1000.0)
+
+        merged = LatencyHistogram.from_dict(odd.to_dict()).merge(even)
+        self.assertEqual(merged.summary(), whole.summary())
+
+class TestLoadSettings(unittest.TestCase):
+
+    def test_schedule(self):
+        settings = LoadSettings(rate = 10, ramp_up = 2)
+        self.assertEqual(settings.schedule(0), 0)
+        self.assertEqual(settings.schedule(10), 2)
+        self.assertEqual(settings.schedule(20), 3)
+        self.assertLess(settings.schedule(5), 1.5)
+
+        settings = LoadSettings(concurrency = 4, ramp_up = 2)
+        self.assertEqual([settings.start_delay(user) for user in range(4)], [0, 0.5, 1, 1.5])
+        self.assertRaises(p_exception.ParamsError, LoadSettings, users = 1)
+
+class FailAsyncRunner(AsyncRunner):
+
+    async def run_test(self, testcase_dict, variables, driver_map):
+        reporter = self.tracers[driver_map[0]]
+        reporter.start(self.proj_info["module"], testcase_dict["name"], "", "")
+        await asyncio.sleep(0.01)
+        reporter.fail("fail")
+        reporter.stop()
+
+class CountingRunner(Runner):
+    lock = threading.Lock()
+    # [running, max running]
+    counts = [0, 0]
+
+    def run_test(self, testcase_dict, variables, driver_map):
+        with self.lock:
+            self.counts[0] += 1
+            self.counts[1] = max(self.counts)
+        time.sleep(0.02)
+        with self.lock:
+            self.counts[0] -= 1
+
+class TestLoadExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp()
+        self.testsets = {"name": "load", "file_path": os.path.join(self.tmp_path, "load.yaml"), "project": {"name": "p", "module": "m"},
+                         "cases": [{"name": "once"}, {"name": "load", "load": {"concurrency": 2, "duration": 0.3}}]}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+
+    def test_case_load(self):
+        runner = TestRunner(runner = Runner).run(self.testsets)
+        self.assertIsInstance(runner._task_suite.executor, LoadExecutor)
+        self.assertEqual(runner.text_test_result.testsRun, 2)
+        self.assertEqual(runner.text_test_result.wasSuccessful(), True)
+
+        cases = dict((case["raw_case_name"], case) for case in runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"])
+        self.assertNotIn("latency", cases["once"])
+        latency = cases["load"]["latency"]
+        self.assertGreater(latency["count"], 2)
+        self.assertEqual((latency["passed"], latency["failed"]), (latency["count"], 0))
+        self.assertLessEqual(latency["p50"], latency["p99"])
+
+        html_report = runner.gen_html_report()
+        with open(html_report[0], encoding = "utf-8") as f:
+            self.assertIn("p95", f.read())
+
+    def test_rate(self):
+        runner = TestRunner(runner = Runner, load = {"rate": 20, "concurrency": 2, "duration": 0.5, "warmup": 2}).run(self.testsets)
+
+        cases = runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"]
+        self.assertEqual(len(cases), 2)
+        # about 10 iterations in 0.5s, the first 2 are not counted
+        self.assertTrue(6 <= cases[0]["latency"]["count"] <= 8, cases[0]["latency"])
+
+    def test_resources(self):
+        self.testsets["cases"][1].update({"resources": ["db"], "load": {"concurrency": 4, "duration": 0.3}})
+        runner = TestRunner(runner = CountingRunner, resources = {"db": 2}).run(self.testsets)
+        self.assertEqual(runner.text_test_result.wasSuccessful(), True)
+
+        cases = dict((case["raw_case_name"], case) for case in runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"])
+        self.assertGreater(cases["load"]["latency"]["count"], 2)
+        self.assertEqual(CountingRunner.counts[1], 2)
+
+    def test_async_runner(self):
+        runner = TestRunner(runner = FailAsyncRunner).run(self.testsets)
+        self.assertIsInstance(runner._task_suite.executor, LoadExecutor)
+
+        cases = dict((case["raw_case_name"], case) for case in runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"])
+        self.assertEqual(cases["once"]["status"], "Fail")
+        latency = cases["load"]["latency"]
+        # the coroutine of each iteration is awaited, instead of passing without running
+        self.assertGreater(latency["count"], 2)
+        self.assertEqual((latency["passed"], latency["failed"]), (0, latency["count"]))
+
+    def test_case_logs(self):
+        runner = TestRunner(runner = FailAsyncRunner).run(self.testsets)
+        latency = dict((case["raw_case_name"], case) for case in runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"])["load"]["latency"]
+        self.assertGreater(latency["failed"], 6)
+
+        case_logs = os.path.join(self.tmp_path, "report", "caselogs")
+        with open(os.path.join(case_logs, [name for name in os.listdir(case_logs) if name.startswith("load_")][0]), encoding = "utf-8") as f:
+            content = f.read()
+        # only the first 3 failures of each user, and the summary of the case
+        self.assertEqual(content.count("FAIL"), 3 * 2)
+        self.assertEqual(content.count("Case Log From"), 3 * 2 + 1)
+        self.assertIn("latency: ", content)
+
+    def test_module_latency(self):
+        self.testsets["cases"].append({"name": "load2", "load": {"concurrency": 1, "duration": 0.2}})
+        runner = TestRunner(runner = Runner).run(self.testsets)
+
+        tracer = runner._task_suite.tasks[0].test_runner.tracers[""]
+        cases = dict((case["raw_case_name"], case) for case in tracer.summary[0]["TestCases"])
+        latency = tracer.latency["m"]
+        self.assertEqual(latency["count"], cases["load"]["latency"]["count"] + cases["load2"]["latency"]["count"])
+        self.assertLessEqual(latency["p50"], latency["p95"])
+        self.assertLessEqual(latency["p95"], latency["p99"])
+
+        html_report = runner.gen_html_report()
+        with open(html_report[0], encoding = "utf-8") as f:
+            self.assertIn("LoadLatency", f.read())
+
+if __name__ == "__main__":
+    unittest.main(verbosity = 2)
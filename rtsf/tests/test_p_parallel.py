@@ -0,0 +1,154 @@
+#! python3
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.tests.test_p_parallel
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:     luokefeng@163.com
+    RCS:      rtsf.tests.test_p_parallel,  v1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+======================================================================
+
+Provide a function for the automation test
+
+'''
+
+import unittest,os,shutil,tempfile,time
+from rtsf.p_executer import TestRunner,Runner
+from rtsf.p_parallel import ProcessExecutor
+from rtsf.p_journal import Journal
+from rtsf import p_exception
+
+class ErrorRunner(Runner):
+
+    def run_test(self, testcase_dict, variables, driver_map):
+        if testcase_dict["name"].startswith("/163"):
+            raise ValueError("boom")
+        return super(ErrorRunner, self).run_test(testcase_dict, variables, driver_map)
+
+class NotFoundRunner(Runner):
+
+    def run_test(self, testcase_dict, variables, driver_map):
+        if testcase_dict["name"].startswith("/163"):
+            raise p_exception.VariableNotFound("no such variable")
+        return super(NotFoundRunner, self).run_test(testcase_dict, variables, driver_map)
+
+class SleepRunner(Runner):
+
+    def run_test(self, testcase_dict, variables, driver_map):
+        if testcase_dict["name"].startswith("/163"):
+            time.sleep(60)
+        return super(SleepRunner, self).run_test(testcase_dict, variables, driver_map)
+
+class CrashRunner(Runner):
+
+    def run_test(self, testcase_dict, variables, driver_map):
+        if testcase_dict["name"].startswith("/163"):
+            os._exit(1)
+        return super(CrashRunner, self).run_test(testcase_dict, variables, driver_map)
+
+class UnwatchedRunner(SleepRunner):
+
+    def _run_with_watchdog(self, timeout, func, *args):
+        # the worker hangs, the main process has to kill it
+        return func(*args)
+
+class TestProcessExecutor(unittest.TestCase):
+
+    def setUp(self):
+        data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "testcases")
+        self.tmp_path = tempfile.mkdtemp()
+        for file_name in ("data_driver.yaml", "devices.csv", "username_password.csv"):
+            shutil.copyfile(os.path.join(data_path, file_name), os.path.join(self.tmp_path, file_name))
+        self.case = os.path.join(self.tmp_path, "data_driver.yaml")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+
+    def test_run_with_workers(self):
+        runner = TestRunner(runner = Runner, workers = 2).run(self.case)
+
+        self.assertIsInstance(runner._task_suite.executor, ProcessExecutor)
+        self.assertEqual(runner.text_test_result.testsRun, 12)
+        self.assertEqual(runner.text_test_result.wasSuccessful(), True)
+
+        summary = runner._task_suite.tasks[0].test_runner.tracers[""].summary
+        self.assertEqual(len(summary), 1)
+        self.assertEqual(len(summary[0]["TestCases"]), 12)
+
+        html_report = runner.gen_html_report()
+        self.assertEqual(os.path.isfile(html_report[0]), True)
+
+    def test_run_with_workers_error(self):
+        runner = TestRunner(runner = ErrorRunner, workers = 2).run(self.case)
+
+        self.assertEqual(runner.text_test_result.testsRun, 12)
+        self.assertEqual(len(runner.text_test_result.errors), 6)
+        self.assertIn("boom", runner.text_test_result.errors[0][1])
+
+    def test_run_rtsf_error(self):
+        for workers in (1, 2):
+            journal = os.path.join(self.tmp_path, "journal_{}.jsonl".format(workers))
+            runner = TestRunner(runner = NotFoundRunner, workers = workers).run(self.case, journal = journal)
+
+            self.assertEqual(runner.text_test_result.testsRun, 12)
+            self.assertEqual(len(runner.text_test_result.errors), 6)
+            self.assertIn("no such variable", runner.text_test_result.errors[0][1])
+
+            # the errors are recorded as the other errors, instead of escaping the runner
+            statuses = [entry["status"] for entry in Journal.load(journal)]
+            self.assertEqual(sorted(statuses), ["error"] * 6 + ["pass"] * 6)
+
+    def test_run_with_workers_failfast(self):
+        runner = TestRunner(runner = ErrorRunner, workers = 2, failfast = True).run(self.case)
+
+        self.assertEqual(runner.text_test_result.shouldStop, True)
+        self.assertLess(runner.text_test_result.testsRun, 12)
+        self.assertGreaterEqual(len(runner.text_test_result.errors), 1)
+
+    def test_run_with_workers_timeout(self):
+        start_at = time.time()
+        runner = TestRunner(runner = SleepRunner, workers = 2, timeout = 0.5).run(self.case)
+
+        self.assertLess(time.time() - start_at, 30)
+        self.assertEqual(runner.text_test_result.testsRun, 12)
+        self.assertEqual(len(runner.text_test_result.errors), 6)
+
+        cases = runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"]
+        self.assertEqual(len([case for case in cases if case["status"] == "Timeout"]), 6)
+
+    def test_kill_hung_worker(self):
+        kill_grace, ProcessExecutor.kill_grace = ProcessExecutor.kill_grace, 0.2
+        try:
+            start_at = time.time()
+            runner = TestRunner(runner = UnwatchedRunner, workers = 2, timeout = 0.3).run(self.case)
+        finally:
+            ProcessExecutor.kill_grace = kill_grace
+
+        self.assertLess(time.time() - start_at, 30)
+        self.assertEqual(runner.text_test_result.testsRun, 12)
+        self.assertEqual(len(runner.text_test_result.errors), 6)
+        self.assertIn("killed", runner.text_test_result.errors[0][1])
+
+        cases = runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"]
+        self.assertEqual(len([case for case in cases if case["status"] == "Timeout"]), 6)
+
+    def test_crashed_worker(self):
+        runner = TestRunner(runner = CrashRunner, workers = 2).run(self.case)
+
+        self.assertEqual(runner.text_test_result.testsRun, 12)
+        self.assertEqual(len(runner.text_test_result.errors), 6)
+        self.assertIn("exited unexpectedly", runner.text_test_result.errors[0][1])
+
+        # the crashed cases are in the report as well
+        cases = runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"]
+        self.assertEqual(len(cases), 12)
+        self.assertEqual(len([case for case in cases if case["status"] == "Fail"]), 6)
+
+if __name__ == "__main__":
+    unittest.main(verbosity = 2)
@@ -19,7 +19,7 @@ Provide a function for the automation test
 '''
 
 
-import unittest, time
+import unittest, time, os, shutil, tempfile
 from rtsf.p_report import HtmlReporter
 
 class TestHtmlReport(unittest.TestCase):    
@@ -119,6 +119,48 @@ class TestHtmlReport(unittest.TestCase):
         self.assertEqual(len(reporter.generate_html_report(proj_name = "xxx系统", proj_module = "xxx功能模块1")), 1)
         self.assertEqual(len(reporter.generate_html_report(proj_name = "xxx系统", proj_module = "xxx功能模块2")), 1)
         self.assertEqual(len(reporter.generate_html_report(proj_name = "xxx系统")), 2)
+    
+    def test_add_report_data_by_case_key(self):
+        start_at = time.time()
+        result = []
+        for status in ("Fail", "Pass"):
+            result = HtmlReporter.add_report_data(result, raw_case_name = "login", status = status, start_at = start_at)
+        # merged by the case name without case_key
+        self.assertEqual([case["status"] for case in result[0]["TestCases"]], ["Pass"])
+        
+        result = []
+        for case_key, status in (("t.yaml::login::1", "Fail"), ("t.yaml::login::2", "Pass"), ("t.yaml::login::1", "Pass")):
+            result = HtmlReporter.add_report_data(result, raw_case_name = "login", case_key = case_key, status = status, start_at = start_at)
+        # one row for each data row of the same case name
+        self.assertEqual([(case["case_key"], case["status"]) for case in result[0]["TestCases"]], [("t.yaml::login::1", "Pass"), ("t.yaml::login::2", "Pass")])
+    
+    def test_dump_results(self):
+        tmp_path = tempfile.mkdtemp()
+        try:
+            reporter = HtmlReporter(dir_name = tmp_path)
+            for case_key, status in (("t.yaml::login::1", "pass"), ("t.yaml::login::2", "fail")):
+                reporter.case_key = case_key
+                reporter.start_test("m", "login", "", "")
+                reporter.step_info(status, status)
+                reporter.stop_test()
+            
+            # the same case name of different data rows are not merged
+            self.assertEqual(len(reporter.summary[0]["TestCases"]), 2)
+            self.assertEqual(reporter.dump_results(), os.path.join(reporter.result_path, "results.json"))
+            
+            reporter = HtmlReporter(dir_name = tmp_path)
+            reporter.case_key = "t.yaml::login::2"
+            reporter.start_test("m", "login", "", "")
+            reporter.stop_test()
+            reporter.dump_results()
+            
+            results = HtmlReporter.load_results(reporter.result_path)
+            self.assertEqual(sorted(results), ["t.yaml::login::1", "t.yaml::login::2"])
+            self.assertEqual(results["t.yaml::login::1"]["status"], "pass")
+            self.assertEqual(results["t.yaml::login::2"]["status"], "pass")
+            self.assertEqual(HtmlReporter.load_results(tmp_path), None)
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors = True)
         
         
         
@@ -0,0 +1,214 @@
+#! python3
+# -*- encoding: utf-8 -*-
+'''
+Current module: rtsf.tests.test_p_scheduler
+
+Rough version history:
+v1.0    Original version to use
+
+********************************************************************
+    @AUTHOR:  Administrator-Bruce Luo(罗科峰)
+    MAIL:     luokefeng@163.com
+    RCS:      rtsf.tests.test_p_scheduler,  v1.0 2026年10月16日
+    FROM:   2026年10月16日
+********************************************************************
+======================================================================
+
+Provide a function for the automation test
+
+'''
+
+import unittest,os,shutil,tempfile,time
+from rtsf.p_executer import TestRunner, Runner, init_test_suite
+from rtsf.p_history import CaseHistory
+from rtsf.p_testcase import YamlCaseLoader
+from rtsf.p_scheduler import parse_shard, partition, build_dependencies, critical_path, ResourcePool, budget_priority, select_budget
+from rtsf import p_exception
+
+class SleepRunner(Runner):
+
+    def run_test(self, testcase_dict, variables, driver_map):
+        reporter = self.tracers[driver_map[0]]
+        reporter.start(self.proj_info["module"], self._case_name(testcase_dict, variables), "", "")
+        time.sleep(0.2)
+        reporter.stop()
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "testcases")
+        self.tmp_path = tempfile.mkdtemp()
+        for file_name in ("data_driver.yaml", "devices.csv", "username_password.csv"):
+            shutil.copyfile(os.path.join(data_path, file_name), os.path.join(self.tmp_path, file_name))
+        self.case = os.path.join(self.tmp_path, "data_driver.yaml")
+        self.tests = list(init_test_suite(self.case, Runner).tasks[0])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path, ignore_errors = True)
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        self.assertEqual(parse_shard((1, 1)), (1, 1))
+        for shard in ("0/4", "5/4", "1/0", "a/b", "1"):
+            self.assertRaises(p_exception.ParamsError, parse_shard, shard)
+
+    def test_partition_by_hash(self):
+        shards = partition(self.tests, 3)
+        self.assertEqual(shards, partition(self.tests[::-1], 3))
+        self.assertEqual(sum(len(keys) for keys in shards), 12)
+        self.assertEqual(set.union(*shards), set((test.file_path, test.key) for test in self.tests))
+
+    def test_partition_by_history(self):
+        history = CaseHistory()
+        for index, test in enumerate(self.tests):
+            history.update(test.file_path, test.key, {"status": "pass", "start_at": 0, "end_at": 10 if index == 0 else 1})
+
+        shards = partition(self.tests, 2, history)
+        self.assertEqual(shards, partition(self.tests[::-1], 2, history))
+        self.assertEqual(set.union(*shards), set((test.file_path, test.key) for test in self.tests))
+        # the longest case is alone with the rest of the 1s balanced: 10 + 1 vs 10 * 1
+        self.assertEqual(sorted(len(keys) for keys in shards), [2, 10])
+
+    def test_partition_same_file_name(self):
+        testsets = []
+        for dir_name in ("a", "b"):
+            os.mkdir(os.path.join(self.tmp_path, dir_name))
+            for file_name in ("data_driver.yaml", "devices.csv", "username_password.csv"):
+                shutil.copyfile(os.path.join(self.tmp_path, file_name), os.path.join(self.tmp_path, dir_name, file_name))
+            testsets.extend(YamlCaseLoader.load_files(os.path.join(self.tmp_path, dir_name, "data_driver.yaml")))
+        task_suite = init_test_suite(testsets, Runner)
+
+        history = CaseHistory(os.path.join(self.tmp_path, "snapshot.json"))
+        for suite in task_suite.tasks:
+            for test in suite:
+                history.update(test.file_path, test.key, {"status": "pass", "start_at": 0, "end_at": 1})
+
+        # each case of both files is in exactly one shard, and the 24 cases of 1s are balanced
+        shards = partition([test for suite in task_suite.tasks for test in suite], 2, history)
+        self.assertEqual(sorted(len(nodes) for nodes in shards), [12, 12])
+        self.assertFalse(shards[0] & shards[1])
+
+    def test_run_shards(self):
+        keys = []
+        for shard in ("1/2", "2/2"):
+            runner = TestRunner(runner = Runner, lazy = shard == "2/2").run(self.case, shard = shard)
+            keys.append([test.key for test in runner._task_suite.tasks[0]])
+            self.assertEqual(runner.text_test_result.testsRun, len(keys[-1]))
+            # each CI node starts with the same history, nothing here
+            os.remove(os.path.join(self.tmp_path, CaseHistory.file_name))
+
+        self.assertFalse(set(keys[0]) & set(keys[1]))
+        self.assertEqual(len(keys[0]) + len(keys[1]), 12)
+
+    def test_run_shards_with_histories(self):
+        # the nodes have different local histories, such as node 2 which ran shard 1 before
+        history = CaseHistory()
+        for index, test in enumerate(self.tests):
+            history.update(test.file_path, test.key, {"status": "pass", "start_at": 0, "end_at": 10 if index == 0 else 1})
+        history.save()
+        snapshot = os.path.join(self.tmp_path, "snapshot.json")
+        shutil.copyfile(os.path.join(self.tmp_path, CaseHistory.file_name), snapshot)
+
+        for shard_history in (None, snapshot):
+            keys = []
+            for shard in ("1/2", "2/2"):
+                runner = TestRunner(runner = Runner).run(self.case, shard = shard, shard_history = shard_history)
+                keys.append(set(test.key for test in runner._task_suite.tasks[0]))
+
+            self.assertFalse(keys[0] & keys[1])
+            self.assertEqual(len(keys[0]) + len(keys[1]), 12)
+            if shard_history:
+                self.assertEqual(sorted(len(shard_keys) for shard_keys in keys), [2, 10])
+
+    def test_build_dependencies(self):
+        testcases = [{"name": "a"}, {"name": "b", "depends_on": "a"}, {"name": "c", "depends_on": ["a", "b"]}]
+        self.assertEqual(build_dependencies(testcases), {"b": ["a"], "c": ["a", "b"]})
+        self.assertEqual(build_dependencies([{"name": "a"}]), {})
+
+        testcases[0]["depends_on"] = ["c"]
+        self.assertRaises(p_exception.ParamsError, build_dependencies, testcases)
+        self.assertRaises(p_exception.ParamsError, build_dependencies, [{"name": "a", "depends_on": ["x"]}])
+        self.assertRaises(p_exception.ParamsError, build_dependencies, [{"name": "a", "depends_on": ["a"]}])
+
+    def test_critical_path(self):
+        durations = {"a": 1.0, "b": 2.0, "c": 1.0, "d": 3.5}
+        self.assertEqual(critical_path(durations, {"b": ["a"], "c": ["b", "d"]}), (4.5, ["d", "c"]))
+        self.assertEqual(critical_path(durations, {"c": ["b"], "b": ["a"]}), (4.0, ["a", "b", "c"]))
+        self.assertEqual(critical_path({}, {}), (0.0, []))
+
+    def test_resource_pool(self):
+        pool = ResourcePool({"db": 2})
+        case = {"name": "a", "resources": ["db", "payment_sandbox"]}
+        self.assertTrue(pool.available(case))
+        pool.acquire(case)
+        pool.acquire({"name": "b", "resources": "db"})
+        self.assertFalse(pool.available(case))
+        self.assertTrue(pool.available({"name": "c", "resources": ["payment_sandbox"]}))
+        self.assertTrue(pool.available({"name": "d"}))
+
+        pool.release(case)
+        self.assertTrue(pool.available(case))
+        self.assertRaises(p_exception.ParamsError, ResourcePool, {"db": 0})
+
+    def test_run_with_resources(self):
+        testsets = {"name": "resources", "file_path": os.path.join(self.tmp_path, "resources.yaml"),
+                    "project": {"name": "p", "module": "m", "resources": {"db": 3}},
+                    "cases": [{"name": "db_{}".format(i), "resources": ["db"]} for i in range(6)] + [{"name": "other_{}".format(i)} for i in range(2)]}
+        runner = TestRunner(runner = SleepRunner, workers = 4, resources = {"db": 2}).run(testsets)
+        self.assertEqual(runner.text_test_result.testsRun, 8)
+
+        cases = runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"]
+        db_cases = [case for case in cases if case["raw_case_name"].startswith("db_")]
+        for case in db_cases:
+            running = [other for other in db_cases if other["start_at"] <= case["start_at"] < other["end_at"]]
+            self.assertLessEqual(len(running), 2)
+        # the other cases fill the free workers instead of waiting for the db cases
+        others = [case for case in cases if case["raw_case_name"].startswith("other_")]
+        self.assertLess(max(case["start_at"] for case in others), min(case["end_at"] for case in db_cases))
+
+    def test_budget_priority(self):
+        history, test = CaseHistory(), self.tests[0]
+        self.assertEqual(budget_priority(history, test), (1, 0, 0.0))
+
+        now = time.time()
+        history.update(self.case, test.key, {"status": "fail", "start_at": now, "end_at": now + 1})
+        history.update(self.case, test.key, {"status": "pass", "start_at": now, "end_at": now + 1})
+        self.assertEqual(budget_priority(history, test), (1, 1, -0.5))
+        os.utime(self.case, (now + 10, now + 10))
+        self.assertEqual(budget_priority(history, test), (1, 0, -0.5))
+
+    def test_select_budget(self):
+        testsets = {"name": "budget", "file_path": os.path.join(self.tmp_path, "budget.yaml"), "project": {"name": "p", "module": "m"},
+                    "cases": [{"name": "a"}, {"name": "b", "depends_on": "a"}, {"name": "c"}]}
+        task_suite = init_test_suite(testsets, Runner)
+        history = CaseHistory()
+        for test, status, duration in zip(task_suite.tasks[0], ("pass", "fail", "pass"), (3, 1, 1)):
+            history.update(test.file_path, test.key, {"status": status, "start_at": 0, "end_at": duration})
+
+        selected, skipped = select_budget(task_suite, 4, history)
+        self.assertEqual(selected, 2)
+        self.assertEqual([test.testcase_dict["name"] for test in task_suite.tasks[0]], ["a", "b"])
+        self.assertEqual([test.testcase_dict["name"] for _, test, _ in skipped], ["c"])
+        self.assertRaises(p_exception.ParamsError, select_budget, task_suite, 0, history)
+
+    def test_run_with_budget(self):
+        history = CaseHistory()
+        for index, test in enumerate(self.tests):
+            history.update(self.case, test.key, {"status": "fail" if index in (7, 9) else "pass", "start_at": 0, "end_at": 10 if index == 0 else 1})
+        history.save()
+
+        runner = TestRunner(runner = Runner).run(self.case, budget_seconds = 4.5)
+        result = runner.text_test_result
+        self.assertEqual(result.testsRun, 12)
+        self.assertEqual(len(result.skipped), 8)
+        # the cases failed in the last run first, the data rows may be read in random order
+        keys = [test.key for test in runner._task_suite.tasks[0]]
+        self.assertEqual(len(keys), 4)
+        self.assertEqual(set(keys[:2]), set([self.tests[7].key, self.tests[9].key]))
+        self.assertNotIn(self.tests[0].key, keys)
+
+        cases = runner._task_suite.tasks[0].test_runner.tracers[""].summary[0]["TestCases"]
+        self.assertEqual(len([case for case in cases if case["status"] == "Skip"]), 8)
+
+if __name__ == "__main__":
+    unittest.main(verbosity = 2)
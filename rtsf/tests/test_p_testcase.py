@@ -18,10 +18,11 @@ Provide a function for the automation test
 
 '''
 
-import unittest, shutil,os
-from rtsf.p_testcase import YamlCaseLoader, TestCaseParser, substitute_variables_with_mapping,parse_project_data
+import unittest, shutil,os,gc,weakref
+from rtsf.p_testcase import YamlCaseLoader, TestCaseParser, VariableScope, substitute_variables_with_mapping,parse_project_data,compile_template,substitute_template,mark_static
 from rtsf.p_common import FileSystemUtils
 from rtsf.p_applog import logger
+from rtsf import p_exception
 
 class TestPublicFuction(unittest.TestCase):
     
@@ -38,6 +39,28 @@ class TestPublicFuction(unittest.TestCase):
         print(result)
         expected = {'request': {'url': '/api/users/1000', 'headers': {'token': '$token', 'username': 'luokefeng', 'uid': 1000}}}
         self.assertEqual(result, expected)
+    
+    def test_substitute_variables_boundary(self):
+        mapping = {"$user": "u", "$username": "name", "$uid": 1000}
+        for items in (list(mapping.items()), list(mapping.items())[::-1]):
+            self.assertEqual(substitute_variables_with_mapping("$username/$user/$users", dict(items)), "name/u/$users")
+        self.assertEqual(substitute_variables_with_mapping("${sign($uid, $user)}", mapping), "${sign(1000, u)}")
+        self.assertEqual(substitute_variables_with_mapping(["$uid", 1, None], mapping), [1000, 1, None])
+        self.assertEqual(substitute_template("$user-${f($user)}", {"user": "u"}.get), "u-${f(u)}")
+    
+    def test_compile_template(self):
+        nodes = compile_template("/api/$uid?_t=${get_timestamp()}&sign=${sign($uid, 1)}")
+        self.assertEqual(nodes, (
+            ("text", "/api/"), 
+            ("variable", "uid"), 
+            ("text", "?_t="), 
+            ("function", "get_timestamp()", {"func_name": "get_timestamp", "args": [], "kwargs": {}}),
+            ("text", "&sign="),
+            ("function", "sign($uid, 1)", {"func_name": "sign", "args": ["$uid", 1], "kwargs": {}}),
+            ))
+        self.assertIs(compile_template("/api/$uid?_t=${get_timestamp()}&sign=${sign($uid, 1)}"), nodes)
+        self.assertEqual(compile_template("abc"), (("text", "abc"),))
+        self.assertEqual(compile_template(""), ())
         
     def test_parse_project_data(self):
         file_path = r'data\testcases\data_driver.yaml'
@@ -257,11 +280,101 @@ class TestTestCaseParser(unittest.TestCase):
             }
         actual = parser.eval_content_with_bind_actions(dict_struct)
         self.assertEqual(actual, expect)       
+    
+    def test_variable_scope(self):
+        project = {"host": "127.0.0.1", "user": "admin"}
+        scope = VariableScope({"user": "test1"}, project)
+        scope["token"] = "abc"
+        
+        self.assertEqual(scope["user"], "test1")
+        self.assertEqual(scope["host"], "127.0.0.1")
+        self.assertEqual(scope.to_dict(), {"host": "127.0.0.1", "user": "test1", "token": "abc"})
+        self.assertEqual(project, {"host": "127.0.0.1", "user": "admin"})
+        self.assertEqual("token" in scope.new_child({}), True)
+        self.assertRaises(KeyError, scope.__delitem__, "host")
+    
+    def test_fork(self):
+        parser = TestCaseParser(variables = self._variables, 
+                                functions= self._functions,
+                                file_path= os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "testcases", "preference.py"))
+        fork1 = parser.fork({"v1": "row1"}, case_variables = {"v2": "case"})
+        fork2 = parser.fork({"v1": "row2"})
+        fork1._variables["v5"] = "set in fork1"
+        
+        self.assertEqual(fork1.eval_content_with_bind_actions("$v1 $v2 $v3 $test_var ${f1()}"), "row1 case 123 hello world f1")
+        self.assertEqual(fork2.eval_content_with_bind_actions("$v1 $v2"), "row2 world")
+        self.assertRaises(p_exception.VariableNotFound, fork2.get_bind_variable, "v5")
+        self.assertEqual(parser.get_bind_variable("v1"), "hello")
+        self.assertIs(fork2._functions, parser._functions)
+        
+        # binding the data row of a fork keeps the project variables
+        fork2.update_binded_variables({"v1": "row3"})
+        self.assertEqual(fork2.eval_content_with_bind_actions("$v1 $v4"), "row3 0.1234")
+    
+    def test_eval_compiled_template(self):
+        functions = {"add": lambda a, b: a + b, "items": lambda: [1, 2]}
+        parser = TestCaseParser(variables = {"a": 1, "user": "u", "username": "name"}, functions = functions)
+        
+        self.assertEqual(parser.eval_content_with_bind_actions("${add($a, 2)}"), 3)
+        self.assertEqual(parser.eval_content_with_bind_actions("${items()}"), [1, 2])
+        self.assertEqual(parser.eval_content_with_bind_actions("$username-$user: ${add($a, 2)}"), "name-u: 3")
+        self.assertEqual(parser.eval_content_with_bind_actions("cost $ 5"), "cost $ 5")
+        self.assertEqual(parser._eval_content_functions("${add($a, 2)} $a"), "3 $a")
+        self.assertEqual(parser._eval_content_variables("${add($a, 2)} $a"), "${add(1, 2)} 1")
+    
+    def test_eval_static_subtree(self):
+        parser = TestCaseParser(variables = {"uid": 1000})
+        case = {"name": "case", "request": {"url": "/api/$uid", "body": {"items": [1, 2, {"a": "b"}]}, "headers": [" x "]}}
+        self.assertEqual(parser.mark_static(case), False)
+        self.assertEqual(mark_static(case["request"]["body"], {}), True)
+        
+        result = parser.eval_content_with_bind_actions(case)
+        self.assertEqual(result, {"name": "case", "request": {"url": "/api/1000", "body": {"items": [1, 2, {"a": "b"}]}, "headers": ["x"]}})
+        self.assertIsNot(result["request"], case["request"])
+        # a shallow copy of the static body, its nested list is not evaluated again
+        self.assertIsNot(result["request"]["body"], case["request"]["body"])
+        self.assertIs(result["request"]["body"]["items"], case["request"]["body"]["items"])
+        # not marked, evaluated to a copy
+        body = {"items": [1, 2]}
+        self.assertIsNot(parser.eval_content_with_bind_actions(body), body)
+        
+        # the marks are shared with the forks, but not with the other parsers
+        self.assertIs(parser.fork({"uid": 1}).eval_content_with_bind_actions(case)["request"]["body"]["items"], case["request"]["body"]["items"])
+        self.assertIsNot(TestCaseParser(variables = {"uid": 1000}).eval_content_with_bind_actions(case)["request"]["body"]["items"], case["request"]["body"]["items"])
+    
+    def test_eval_static_subtree_updated_by_case(self):
+        parser = TestCaseParser()
+        case = {"name": "case_$row", "body": {"user": "u", "token": "t"}}
+        parser.mark_static(case)
+        
+        # a case pops and updates the static body of its data row
+        body = parser.fork({"row": 1}).eval_content_with_bind_actions(case)["body"]
+        body.pop("token")
+        body.update({"user": "changed"})
+        
+        # the next data row still has the body as loaded
+        self.assertEqual(parser.fork({"row": 2}).eval_content_with_bind_actions(case), {"name": "case_2", "body": {"user": "u", "token": "t"}})
+        self.assertEqual(case["body"], {"user": "u", "token": "t"})
+    
+    def test_static_marks_released_with_suite(self):
+        from rtsf.p_executer import init_test_suite, Runner
+        testset = {"name": "static", "file_path": os.path.abspath("static.yaml"), "project": {"name": "p", "module": "m"},
+                   "cases": [{"name": "case", "body": {"items": [1, 2]}}]}
+        suite = init_test_suite(testset, Runner).tasks[0]
+        parser = suite.test_runner.parser
+        self.assertIs(parser.eval_content_with_bind_actions(testset["cases"][0])["body"], testset["cases"][0]["body"])
+        
+        # built without TestRunner.run, such as a plain unittest run, the marks are gone with the suite
+        parser_ref = weakref.ref(parser)
+        del suite, parser
+        gc.collect()
+        self.assertIsNone(parser_ref())
 
 if __name__ == '__main__':
 #     logger.setup_logger("debug")
     unittest.main(verbosity=2)
- #     suite = unittest.TestSuite()
+ 
+#     suite = unittest.TestSuite()
 #     #suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestYamlCaseLoader))
 #     suite.addTest(TestYamlCaseLoader("test_load_dependencies_from_file"))    
 #     runner = unittest.TextTestRunner(verbosity=2)
@@ -33,6 +33,7 @@ install_requires = [
     "colorama",
     "colorlog",
     "urllib3",
+    'futures; python_version < "3"',
 ]
 
 class UploadCommand(Command):